@@ -1,5 +1,7 @@
-from flask_app import app     # Aquí estamos importando la variable 'app' desde el paquete 'flask_app'.
-                              # 'app' normalmente es la aplicación Flask que configuraste en otro archivo.
+from flask_app import create_app     # Aquí estamos importando la "fábrica" de la aplicación desde el paquete 'flask_app'.
+
+app = create_app()                    # create_app arma la aplicación Flask: configuración, rutas (Blueprints),
+                                      # sesiones y comandos. gunicorn y `flask --app app` usan esta variable 'app'.
 
 if __name__ == "__main__":    # Esta línea verifica si este archivo se está ejecutando directamente.
                               # Es decir, si lo ejecutas como: python nombre_del_archivo.py
@@ -0,0 +1,196 @@
+import argparse, json, os, random, statistics, sys, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+# ----------------------------------------------------------------------
+# Benchmark de las rutas principales
+# Uso (desde la carpeta examen, con un MySQL 8.0 o más nuevo local; MariaDB no
+# sirve: esquema.sql usa la colación utf8mb4_0900_ai_ci y los índices VISIBLE):
+#     python -m benchmarks.benchmark --tamanos 1000,10000 --repeticiones 50
+# Variables: MYSQL_HOST/PORT/USER/PASSWORD para el servidor y
+# BENCH_MYSQL_DB para la base de prueba (se borra y se crea en cada corrida).
+#
+# Para cada tamaño de datos mide la latencia (p50/p95/máx) y el rendimiento
+# de cada ruta usando el cliente de pruebas de Flask, y cuenta las consultas
+# SQL de cada petición (cabecera X-Consultas-DB). Si una ruta hace más
+# consultas que su presupuesto, o aparece un posible N+1, termina con error.
+# ----------------------------------------------------------------------
+
+from benchmarks import datos
+
+BASE = datos.nombre_base()
+# La app tiene que usar la base de prueba: se fija antes de importarla.
+os.environ["MYSQL_DB"] = BASE
+# Sin esto la app no manda la cabecera X-Consultas-DB que se cuenta abajo.
+os.environ["DEBUG_CONSULTAS"] = "1"
+
+from flask_app import create_app
+from flask_app.config.cache import cache
+from flask_app.config.hashing import servicio_hash
+from flask_app.config.instrumentacion import agregar_hook, quitar_hook
+from flask_app.config.mysqlconnection import cerrar_pools
+
+app = create_app()
+
+
+def _fecha_futura(dias=30):
+    return (date.today() + timedelta(days=dias)).strftime('%Y-%m-%d')
+
+
+# Cada escenario: (nombre, preparar, ejecutar, presupuesto de consultas).
+# `preparar` corre fuera de la medición (por ejemplo, vaciar la caché para
+# medir el peor caso); `ejecutar` hace la petición y devuelve la respuesta.
+def _escenarios(info):
+    id_asesoria = info["asesoria_id"]
+
+    def vaciar_cache(cliente):
+        cache.limpiar()
+
+    def sin_preparar(cliente):
+        pass
+
+    def etag_inicio(cliente):
+        cliente.etag_inicio = cliente.get('/inicio').headers.get('ETag')
+
+    formulario = {
+        "tema": "Benchmark", "fecha": _fecha_futura(), "duracion": "2",
+        "notas": "Creada por el benchmark", "tutor_id": str(info["tutor_id"]),
+    }
+
+    def con_fecha_al_azar():
+        # Fechas repartidas para no llenar el día del tutor (HORAS_MAX_TUTOR_DIA):
+        # así cada petición mide una escritura y no un rechazo.
+        return dict(formulario, fecha=_fecha_futura(random.randint(1, 3650)))
+
+    return [
+        ("login", sin_preparar,
+         lambda c: c.post('/login', data={"email": info["email"], "contrasena": datos.CONTRASENA}), 1),
+        ("inicio (sin caché)", vaciar_cache, lambda c: c.get('/inicio'), 2),
+        ("inicio (con caché)", sin_preparar, lambda c: c.get('/inicio'), 0),
+        ("inicio (304)", etag_inicio,
+         lambda c: c.get('/inicio', headers={"If-None-Match": c.etag_inicio}), 0),
+        ("ver (sin caché)", vaciar_cache, lambda c: c.get(f'/ver/{id_asesoria}'), 5),
+        ("ver (con caché)", sin_preparar, lambda c: c.get(f'/ver/{id_asesoria}'), 1),
+        ("nueva", vaciar_cache, lambda c: c.get('/nueva'), 3),
+        ("agenda tutor", vaciar_cache, lambda c: c.get(f'/agenda/tutor/{info["tutor_id"]}'), 4),
+        ("carga tutores", vaciar_cache, lambda c: c.get('/tutores/carga'), 3),
+        ("buscar", sin_preparar, lambda c: c.get('/buscar?q=programacion'), 1),
+        ("crear", sin_preparar, lambda c: c.post('/crear_asesoria', data=con_fecha_al_azar()), 2),
+        ("actualizar", sin_preparar,
+         lambda c: c.post('/actualizar_asesoria', data=dict(con_fecha_al_azar(), id=str(id_asesoria))), 3),
+        ("cambiar tutor", sin_preparar,
+         lambda c: c.post('/cambiar_tutor', data={"id": str(id_asesoria), "tutor_id": str(info["tutor_id"])}), 3),
+        ("tutores libres", sin_preparar, lambda c: c.get(f'/tutores/libres?fecha={_fecha_futura()}&duracion=2'), 2),
+    ]
+
+
+def _cliente(info):
+    # Cliente de pruebas con la sesión ya iniciada.
+    cliente = app.test_client()
+    respuesta = cliente.post('/login', data={"email": info["email"], "contrasena": datos.CONTRASENA})
+    if not respuesta.headers.get("Location", "").endswith("/inicio"):
+        raise SystemExit(f"No se pudo iniciar sesión con {info['email']}")
+    return cliente
+
+
+def _medir(cliente, preparar, ejecutar, repeticiones):
+    # Devuelve (latencias en ms, consultas por petición) de un hilo.
+    latencias, consultas = [], []
+    for _ in range(repeticiones):
+        preparar(cliente)
+        inicio = time.perf_counter()
+        respuesta = ejecutar(cliente)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        if respuesta.status_code >= 500 or respuesta.headers.get("Location", "").endswith("/entrar"):
+            raise SystemExit(f"Respuesta inesperada: {respuesta.status_code} {respuesta.headers.get('Location')}")
+        consultas.append(int(respuesta.headers.get("X-Consultas-DB", 0)))
+    return latencias, consultas
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def correr_tamano(tamano, repeticiones, hilos):
+    datos.crear_base(BASE)
+    info = datos.poblar(BASE, tamano, servicio_hash.generar(datos.CONTRASENA))
+    cerrar_pools()
+    cache.limpiar()
+    print(f"\n== {tamano} asesorías, {info['usuarios']} usuarios ({info['tutores']} tutores) ==")
+    print(f"{'ruta':<22}{'p50 ms':>9}{'p95 ms':>9}{'máx ms':>9}{'req/s':>9}{'consultas':>11}")
+
+    resultados = []
+    for nombre, preparar, ejecutar, presupuesto in _escenarios(info):
+        # El login de cada cliente queda fuera de la medición.
+        clientes = [_cliente(info) for _ in range(hilos)]
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+            partes = list(ejecutor.map(
+                lambda cliente: _medir(cliente, preparar, ejecutar, repeticiones), clientes
+            ))
+        total_s = time.perf_counter() - inicio
+        latencias = [l for parte, _ in partes for l in parte]
+        consultas = [c for _, parte in partes for c in parte]
+
+        resultado = {
+            "tamano": tamano,
+            "ruta": nombre,
+            "p50_ms": round(statistics.median(latencias), 2),
+            "p95_ms": round(_percentil(latencias, 0.95), 2),
+            "max_ms": round(max(latencias), 2),
+            "req_s": round(len(latencias) / total_s, 1),
+            "consultas_max": max(consultas),
+            "presupuesto": presupuesto,
+        }
+        resultados.append(resultado)
+        marca = "" if resultado["consultas_max"] <= presupuesto else f"  <-- presupuesto {presupuesto}"
+        print(f"{nombre:<22}{resultado['p50_ms']:>9}{resultado['p95_ms']:>9}{resultado['max_ms']:>9}"
+              f"{resultado['req_s']:>9}{resultado['consultas_max']:>11}{marca}")
+    return resultados
+
+
+def main(argumentos=None):
+    parser = argparse.ArgumentParser(description="Benchmark de las rutas de asesorías.")
+    parser.add_argument("--tamanos", default="1000,10000",
+                        help="Cantidades de asesorías a generar, separadas por coma.")
+    parser.add_argument("--repeticiones", type=int, default=50, help="Peticiones por ruta y por hilo.")
+    parser.add_argument("--hilos", type=int, default=1, help="Clientes concurrentes por ruta.")
+    parser.add_argument("--salida", help="Guardar los resultados en este archivo JSON.")
+    parser.add_argument("--conservar", action="store_true", help="No borrar la base de prueba al terminar.")
+    args = parser.parse_args(argumentos)
+
+    # Los avisos de N+1 de la instrumentación también hacen fallar la corrida.
+    avisos = []
+    candado = threading.Lock()
+
+    def hook(tipo, datos_evento):
+        if tipo == "n_mas_1":
+            with candado:
+                avisos.append(datos_evento)
+
+    agregar_hook(hook)
+    resultados = []
+    try:
+        for tamano in (int(t) for t in args.tamanos.split(",")):
+            resultados.extend(correr_tamano(tamano, args.repeticiones, max(1, args.hilos)))
+    finally:
+        quitar_hook(hook)
+        cerrar_pools()
+        if not args.conservar:
+            datos.borrar_base(BASE)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as archivo:
+            json.dump({"resultados": resultados, "avisos_n_mas_1": avisos}, archivo, indent=2, ensure_ascii=False)
+
+    fallos = [r for r in resultados if r["consultas_max"] > r["presupuesto"]]
+    for r in fallos:
+        print(f"FALLO: {r['ruta']} ({r['tamano']}) hizo {r['consultas_max']} consultas; presupuesto {r['presupuesto']}.")
+    for aviso in avisos:
+        print(f"FALLO: posible N+1 en {aviso['endpoint']}: {aviso['veces']} veces {aviso['sentencia']}")
+    return 1 if fallos or avisos else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import os, random
+from datetime import date, timedelta
+import pymysql
+from flask_app.config.mysqlconnection import crear_conexion
+from flask_app.config.migraciones import migrar
+
+# ----------------------------------------------------------------------
+# Base de datos de prueba para los benchmarks
+# Crea una base aparte (nunca la de la app), le aplica el esquema con las
+# migraciones y la llena con datos generados: usuarios, tutores y asesorías.
+# ----------------------------------------------------------------------
+
+# Contraseña de todos los usuarios generados (para poder probar el login).
+CONTRASENA = "benchmark123"
+
+TEMAS = ["Álgebra", "Cálculo", "Física", "Química", "Programación", "Inglés", "Historia", "Redacción"]
+NOMBRES = ["Ana", "Luis", "María", "Jorge", "Sofía", "Pedro", "Lucía", "Diego", "Valentina", "Tomás"]
+APELLIDOS = ["Pérez", "González", "Rojas", "Muñoz", "Díaz", "Soto", "Silva", "Torres", "Castro", "Vera"]
+
+
+def nombre_base():
+    db = os.environ.get("BENCH_MYSQL_DB", "asesorias_benchmark")
+    # Protección: esta base se borra y se vuelve a crear en cada corrida.
+    if db == os.environ.get("MYSQL_DB", "esquema_asesorias") or db == "esquema_asesorias":
+        raise SystemExit("BENCH_MYSQL_DB no puede ser la base de la aplicación.")
+    return db
+
+
+def _conexion_servidor():
+    # Conexión sin base elegida (la base de prueba puede no existir todavía).
+    return pymysql.connect(
+        host=os.environ.get("MYSQL_HOST", "localhost"),
+        port=int(os.environ.get("MYSQL_PORT", 3306)),
+        user=os.environ.get("MYSQL_USER", "root"),
+        password=os.environ.get("MYSQL_PASSWORD", "root"),
+        autocommit=True,
+    )
+
+
+def crear_base(db):
+    # Borra la base de prueba si existe, la crea vacía y aplica todas las migraciones.
+    conexion = _conexion_servidor()
+    try:
+        with conexion.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS `{db}`;")
+            cursor.execute(f"CREATE DATABASE `{db}` DEFAULT CHARACTER SET utf8mb4;")
+    finally:
+        conexion.close()
+    migrar(db, salida=lambda texto: None)
+
+
+def poblar(db, asesorias, hash_contrasena, semilla=1):
+    # Genera datos con la misma semilla (así dos corridas son comparables):
+    #   - un usuario por cada 10 asesorías (mínimo 20), el 20 % tutores;
+    #   - las asesorías repartidas en los próximos 180 días.
+    # Devuelve un resumen con los ids útiles para las pruebas.
+    azar = random.Random(semilla)
+    cantidad_usuarios = max(20, asesorias // 10)
+    usuarios = [
+        (azar.choice(NOMBRES), azar.choice(APELLIDOS), f"usuario{i}@benchmark.test",
+         hash_contrasena, 1 if i % 5 == 0 else 0)
+        for i in range(cantidad_usuarios)
+    ]
+
+    conexion = crear_conexion(db)
+    try:
+        with conexion.cursor() as cursor:
+            cursor.executemany(
+                "INSERT INTO usuarios (nombre, apellido, email, contrasena, es_tutor) VALUES (%s, %s, %s, %s, %s);",
+                usuarios,
+            )
+            cursor.execute("SELECT id, es_tutor FROM usuarios ORDER BY id;")
+            filas = cursor.fetchall()
+            ids = [fila["id"] for fila in filas]
+            tutores = [fila["id"] for fila in filas if fila["es_tutor"]]
+
+            hoy = date.today()
+            lote = []
+            for _ in range(asesorias):
+                creador = azar.choice(ids)
+                tutor = azar.choice([t for t in tutores[:50] if t != creador] or tutores)
+                lote.append((
+                    azar.choice(TEMAS), hoy + timedelta(days=azar.randint(0, 180)),
+                    azar.randint(1, 8), "Generada para benchmark", creador, tutor,
+                ))
+                if len(lote) >= 1000:
+                    _insertar_asesorias(cursor, lote)
+                    lote = []
+            if lote:
+                _insertar_asesorias(cursor, lote)
+
+            cursor.execute("SELECT id, usuario_id FROM asesorias ORDER BY id LIMIT 1;")
+            primera = cursor.fetchone()
+    finally:
+        conexion.close()
+
+    return {
+        "usuarios": cantidad_usuarios,
+        "tutores": len(tutores),
+        "asesorias": asesorias,
+        # El creador de la primera asesoría es quien inicia sesión en las pruebas.
+        "email": f"usuario{ids.index(primera['usuario_id'])}@benchmark.test",
+        "usuario_id": primera["usuario_id"],
+        "asesoria_id": primera["id"],
+        "tutor_id": next(t for t in tutores if t != primera["usuario_id"]),
+    }
+
+
+def _insertar_asesorias(cursor, lote):
+    cursor.executemany(
+        "INSERT INTO asesorias (tema, fecha, duracion, notas, usuario_id, tutor_id) "
+        "VALUES (%s, %s, %s, %s, %s, %s);",
+        lote,
+    )
+
+
+def borrar_base(db):
+    conexion = _conexion_servidor()
+    try:
+        with conexion.cursor() as cursor:
+            cursor.execute(f"DROP DATABASE IF EXISTS `{db}`;")
+    except pymysql.MySQLError:
+        pass
+    finally:
+        conexion.close()
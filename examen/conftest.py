@@ -0,0 +1,3 @@
+# Este archivo hace que pytest agregue la carpeta examen al sys.path, así los
+# tests importan flask_app igual que app.py. Correr desde la carpeta examen:
+#     python -m pytest -q
@@ -53,9 +53,17 @@ CREATE TABLE IF NOT EXISTS `esquema_asesorias`.`usuarios` (
   `updated_at` DATETIME NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
   -- Fecha automática que cambia cada vez que se edita el registro.
 
-  PRIMARY KEY (`id`))
+  PRIMARY KEY (`id`),
   -- Se establece la llave primaria para identificar cada usuario.
 
+  UNIQUE INDEX `email_UNIQUE` (`email` ASC) VISIBLE,
+  -- Índice único: no puede haber dos usuarios con el mismo email
+  -- y el login encuentra al usuario sin recorrer toda la tabla.
+
+  FULLTEXT INDEX `nombre_apellido` (`nombre`, `apellido`) VISIBLE)
+  -- Índice de texto completo: la búsqueda encuentra asesorías por el nombre
+  -- del solicitante o del tutor sin recorrer toda la tabla.
+
 ENGINE = InnoDB
 DEFAULT CHARACTER SET = utf8mb4
 COLLATE = utf8mb4_0900_ai_ci;
@@ -99,8 +107,16 @@ CREATE TABLE IF NOT EXISTS `esquema_asesorias`.`asesorias` (
   INDEX `usuario_id` (`usuario_id` ASC) VISIBLE,
   -- Índice para que MySQL pueda buscar más rápido las asesorías de un usuario.
 
-  INDEX `tutor_id` (`tutor_id` ASC) VISIBLE,
-  -- Índice para buscar rápido asesorías por tutor.
+  INDEX `tutor_fecha` (`tutor_id` ASC, `fecha` ASC) VISIBLE,
+  -- Índice para buscar rápido asesorías por tutor, y las de un tutor en una fecha
+  -- (revisar que no tenga más horas de las que puede dar ese día).
+
+  INDEX `fecha_id` (`fecha` ASC, `id` ASC) VISIBLE,
+  -- Índice para listar las asesorías futuras por fecha de a una página a la vez.
+
+  FULLTEXT INDEX `tema_notas` (`tema`, `notas`) VISIBLE,
+  -- Índice de texto completo para buscar palabras en el tema y las notas
+  -- (MATCH ... AGAINST en la página de búsqueda).
 
   CONSTRAINT `asesorias_ibfk_1`
     FOREIGN KEY (`usuario_id`)
@@ -1,20 +1,111 @@
-from flask import Flask, os
+import os
+from flask import Flask
 # Importamos la clase Flask desde el paquete flask.
 # Flask es el framework que nos permite crear aplicaciones web de manera sencilla.
 
-app = Flask(__name__)
-# Aquí estamos creando una instancia de la aplicación Flask.
-# "__name__" le dice a Flask dónde está el archivo principal para ubicar recursos y rutas.
-
-app.secret_key = os.environ.get("SECRET_KEY", "dev")
-# Esta es una clave secreta que Flask usa para:
-# - Manejar sesiones
-# - Proteger cookies
-# - Evitar manipulaciones externas
-# Debe mantenerse privada y normalmente se guarda en variables de entorno.
-
-from flask_app.controllers import usuarios, asesorias
-# Aquí importamos los controladores donde están definidas las rutas.
-# Esto es importante porque al importar estos archivos, Flask “descubre” las rutas
-# y las añade a la aplicación automáticamente.
-# Sin esta línea, la app no sabría qué rutas existen.
+from flask_app.config.arranque import PerfilArranque, CARPETA_PLANTILLAS_CACHE, cache_plantillas, precargar_plantillas
+
+
+def configuracion_por_defecto():
+    # Valores que se pueden cambiar con variables de entorno o pasando
+    # un diccionario a create_app (por ejemplo en el benchmark).
+    return {
+        # Clave secreta que Flask usa para firmar cookies y proteger la sesión.
+        # Debe mantenerse privada y normalmente se guarda en variables de entorno.
+        "SECRET_KEY": os.environ.get("SECRET_KEY", "dev"),
+        # Carpeta de la caché de plantillas compiladas ("" = sin caché en disco).
+        "PLANTILLAS_CACHE": os.environ.get("PLANTILLAS_CACHE", CARPETA_PLANTILLAS_CACHE),
+        # Compilar todas las plantillas al arrancar en vez de en la primera petición.
+        "PRECARGAR_PLANTILLAS": os.environ.get("PRECARGAR_PLANTILLAS") == "1",
+        # Construir las hojas de estilo empaquetadas si faltan.
+        "CONSTRUIR_RECURSOS": os.environ.get("CONSTRUIR_RECURSOS", "1") == "1",
+        # Revisión del esquema una sola vez al arrancar, no en cada petición.
+        "MIGRAR_AL_INICIAR": os.environ.get("MIGRAR_AL_INICIAR") == "1",
+        # Sembrado de tutores de ejemplo una sola vez al arrancar (no en cada GET).
+        "SEMBRAR_TUTORES": int(os.environ.get("SEMBRAR_TUTORES") or 0),
+        # Rechazo de carga (503 + Retry-After), 0 = desactivado:
+        # peticiones en curso por proceso y espera promedio por una conexión del pool.
+        "RECHAZO_MAX_EN_CURSO": int(os.environ.get("RECHAZO_MAX_EN_CURSO") or 0),
+        "RECHAZO_ESPERA_POOL_MS": int(os.environ.get("RECHAZO_ESPERA_POOL_MS") or 0),
+        "RECHAZO_RETRY_AFTER": int(os.environ.get("RECHAZO_RETRY_AFTER") or 1),
+    }
+
+
+def create_app(config=None):
+    # Fábrica de la aplicación: arma una app nueva cada vez que se llama.
+    # app.py la usa para la app "de verdad"; el benchmark o una consola pueden
+    # crear otra con otra configuración sin tocar variables globales.
+    perfil = PerfilArranque()
+
+    app = Flask(__name__)
+    # "__name__" le dice a Flask dónde está el paquete para ubicar plantillas y static.
+    app.config.update(configuracion_por_defecto())
+    app.config.update(config or {})
+
+    # Jinja guarda las plantillas compiladas en disco; los demás workers las reutilizan.
+    # Tiene que definirse antes del primer uso de app.jinja_env.
+    app.jinja_options = dict(app.jinja_options, bytecode_cache=cache_plantillas(app.config["PLANTILLAS_CACHE"]))
+
+    with perfil.medir("sesiones"):
+        from flask_app.config.sesiones import crear_interfaz_sesiones
+        app.session_interface = crear_interfaz_sesiones()
+        # Las sesiones se guardan en el servidor (SESION_BACKEND=memoria|sqlite);
+        # la cookie solo lleva un identificador aleatorio.
+
+    from flask_app.config.mysqlconnection import liberar_conexiones_request
+    app.teardown_appcontext(liberar_conexiones_request)
+    # Al terminar cada petición devolvemos al pool la conexión que usaron los modelos.
+    # Así toda la petición trabaja sobre una sola conexión en vez de abrir una por consulta.
+
+    from flask_app.config.instrumentacion import agregar_cabeceras_consultas
+    app.after_request(agregar_cabeceras_consultas)
+    # Cada respuesta lleva cuántas consultas hizo (cabecera X-Consultas-DB) y cuánto tardaron,
+    # solo en modo debug o con DEBUG_CONSULTAS=1.
+
+    from flask_app.config.metricas import MiddlewareMetricas, anotar_ruta
+    app.wsgi_app = MiddlewareMetricas(
+        app.wsgi_app,
+        max_en_curso=app.config["RECHAZO_MAX_EN_CURSO"],
+        max_espera_pool_ms=app.config["RECHAZO_ESPERA_POOL_MS"],
+        retry_after=app.config["RECHAZO_RETRY_AFTER"],
+    )
+    app.extensions["metricas"] = app.wsgi_app
+    app.before_request(anotar_ruta)
+    # Latencia por ruta, peticiones en curso y errores (se ven en /metrics).
+    # Con carga excesiva responde 503 enseguida en vez de encolar (ver config/metricas.py).
+
+    with perfil.medir("controladores"):
+        from flask_app.controllers import usuarios, asesorias, agenda, estado, exportar, importar, recursos
+        from flask_app import comandos
+        for modulo in (usuarios, asesorias, agenda, estado, exportar, importar, recursos, comandos):
+            app.register_blueprint(modulo.bp)
+        # Cada controlador tiene sus rutas en un Blueprint; al registrarlo,
+        # la app "descubre" esas rutas. Sin esto la app no sabría qué rutas existen.
+        # comandos solo trae comandos de consola (flask --app app migrar, etc.).
+
+    if app.config["CONSTRUIR_RECURSOS"]:
+        with perfil.medir("recursos_css"):
+            from flask_app.config import recursos as recursos_css
+            recursos_css.cargar()
+            # Las hojas de estilo empaquetadas se construyen si faltan o si se editó
+            # alguna hoja (en producción conviene hacerlo antes con construir-recursos).
+
+    if app.config["PRECARGAR_PLANTILLAS"]:
+        with perfil.medir("plantillas"):
+            precargar_plantillas(app)
+
+    if app.config["MIGRAR_AL_INICIAR"]:
+        with perfil.medir("migraciones"):
+            from flask_app.config.migraciones import migrar
+            migrar()
+
+    if app.config["SEMBRAR_TUTORES"]:
+        with perfil.medir("sembrar_tutores"):
+            from flask_app.models.usuario import Usuario
+            with app.app_context():
+                Usuario.sembrar_tutores_si_faltan(app.config["SEMBRAR_TUTORES"])
+
+    perfil.registrar()
+    app.extensions["perfil_arranque"] = perfil.reporte()
+    # Queda disponible en /estado/arranque y con `flask --app app perfil-arranque`.
+    return app
@@ -0,0 +1,102 @@
+import json
+import click
+from flask import Blueprint, current_app
+from flask_app.config import migraciones, recursos
+from flask_app.models.usuario import Usuario
+from flask_app.models.asesoria import Asesoria, COLUMNAS_EXPORTACION
+from flask_app.config.exportacion import FORMATOS
+from flask_app.config.importacion import leer_csv
+
+# ----------------------------------------------------------------------
+# Comandos de consola (se ejecutan con: flask --app app <comando>)
+# Son tareas de mantenimiento que no deben correr dentro de una petición.
+# Viven en un Blueprint sin rutas; cli_group=None los deja como comandos
+# de primer nivel (flask migrar, no flask comandos migrar).
+# ----------------------------------------------------------------------
+
+bp = Blueprint('comandos', __name__, cli_group=None)
+
+
+@bp.cli.command("migrar")
+def comando_migrar():
+    """Aplica las migraciones pendientes del esquema."""
+    migraciones.migrar(salida=click.echo)
+
+
+@bp.cli.command("version-esquema")
+def comando_version_esquema():
+    """Muestra la última migración aplicada."""
+    click.echo(migraciones.version_actual())
+
+
+@bp.cli.command("sembrar-tutores")
+@click.option("--minimo", default=3, show_default=True, help="Cantidad mínima de tutores.")
+def comando_sembrar_tutores(minimo):
+    """Crea tutores de ejemplo hasta llegar al mínimo (idempotente)."""
+    creados = Usuario.sembrar_tutores_si_faltan(minimo)
+    click.echo(f"Tutores creados: {creados}")
+
+
+@bp.cli.command("exportar-asesorias")
+@click.option("--formato", type=click.Choice(sorted(FORMATOS)), default="csv", show_default=True)
+@click.option("--desde", default=None, help="Fecha mínima (YYYY-MM-DD).")
+@click.option("--hasta", default=None, help="Fecha máxima (YYYY-MM-DD).")
+@click.option("--tutor", "tutor_id", type=int, default=None, help="Solo asesorías de este tutor.")
+@click.option("--salida", type=click.File("w", encoding="utf-8"), default="-", help="Archivo de salida (por defecto, la consola).")
+def comando_exportar_asesorias(formato, desde, hasta, tutor_id, salida):
+    """Exporta las asesorías en CSV o JSON leyendo las filas de a una."""
+    generar, _ = FORMATOS[formato]
+    filas = Asesoria.exportar(desde=desde, hasta=hasta, tutor_id=tutor_id)
+    for bloque in generar(filas, COLUMNAS_EXPORTACION):
+        salida.write(bloque)
+
+
+@bp.cli.command("revocar-sesiones")
+@click.argument("email")
+def comando_revocar_sesiones(email):
+    """Cierra todas las sesiones abiertas de un usuario."""
+    usuario = Usuario.obtener_credenciales({"email": email})
+    if usuario is None:
+        raise click.ClickException(f"No existe el usuario {email}")
+    cerradas = current_app.session_interface.revocar_sesiones(usuario.id)
+    Usuario.invalidar_identidad(usuario.id)
+    click.echo(f"Sesiones cerradas: {cerradas}")
+
+
+@bp.cli.command("construir-recursos")
+def comando_construir_recursos():
+    """Empaqueta, minifica y comprime las hojas de estilo (static/dist)."""
+    recursos.construir(salida=click.echo)
+
+
+@bp.cli.command("perfil-arranque")
+@click.option("--json", "como_json", is_flag=True, help="Salida en JSON (para guardarla y comparar).")
+def comando_perfil_arranque(como_json):
+    """Muestra cuánto tardó cada paso de create_app."""
+    perfil = current_app.extensions["perfil_arranque"]
+    if como_json:
+        click.echo(json.dumps(perfil))
+        return
+    for fase in perfil["fases"]:
+        click.echo(f"{fase['fase']:<18}{fase['ms']:>9.1f} ms")
+    click.echo(f"{'total':<18}{perfil['total_ms']:>9.1f} ms")
+
+
+def _mostrar_resultado(resultado):
+    click.echo(f"Filas insertadas: {resultado.insertadas}")
+    for linea, errores in resultado.errores:
+        click.echo(f"  línea {linea}: {' '.join(errores)}", err=True)
+
+
+@bp.cli.command("importar-usuarios")
+@click.argument("archivo", type=click.File("r", encoding="utf-8-sig"))
+def comando_importar_usuarios(archivo):
+    """Importa usuarios desde un CSV (nombre, apellido, email, contrasena, es_tutor)."""
+    _mostrar_resultado(Usuario.importar(leer_csv(archivo)))
+
+
+@bp.cli.command("importar-asesorias")
+@click.argument("archivo", type=click.File("r", encoding="utf-8-sig"))
+def comando_importar_asesorias(archivo):
+    """Importa asesorías desde un CSV (tema, fecha, duracion, notas, usuario_id, tutor_id)."""
+    _mostrar_resultado(Asesoria.importar(leer_csv(archivo)))
@@ -0,0 +1,66 @@
+import logging, os, tempfile, time
+from contextlib import contextmanager
+from jinja2 import FileSystemBytecodeCache
+
+# ----------------------------------------------------------------------
+# Arranque de la aplicación
+# - Caché de plantillas compiladas en disco: Jinja guarda el código ya
+#   compilado de cada plantilla en PLANTILLAS_CACHE, y los demás workers
+#   (o el próximo reinicio) lo leen en vez de volver a compilar. Si la
+#   plantilla cambia, Jinja lo nota (compara el contenido) y la recompila.
+# - Precarga opcional de todas las plantillas al arrancar.
+# - Perfil de arranque: cuánto tardó cada paso de create_app, para ver si
+#   un cambio hace más lento el inicio de los workers.
+# ----------------------------------------------------------------------
+
+logger = logging.getLogger("flask_app.arranque")
+
+CARPETA_PLANTILLAS_CACHE = os.path.join(tempfile.gettempdir(), "examen-plantillas")
+
+
+def cache_plantillas(carpeta):
+    # Caché de bytecode compartida por todos los procesos de la máquina.
+    # Con carpeta vacía no se usa caché.
+    if not carpeta:
+        return None
+    os.makedirs(carpeta, exist_ok=True)
+    return FileSystemBytecodeCache(carpeta)
+
+
+def precargar_plantillas(app):
+    # Compila todas las plantillas (o las lee de la caché en disco) para
+    # que ninguna petición pague ese costo. Devuelve cuántas cargó.
+    nombres = app.jinja_env.list_templates()
+    for nombre in nombres:
+        app.jinja_env.get_template(nombre)
+    return len(nombres)
+
+
+class PerfilArranque:
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.fases = []     # [(nombre, milisegundos)]
+
+    @contextmanager
+    def medir(self, nombre):
+        comienzo = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.fases.append((nombre, (time.perf_counter() - comienzo) * 1000))
+
+    def total_ms(self):
+        return (time.perf_counter() - self.inicio) * 1000
+
+    def reporte(self):
+        # Versión en diccionario (para /estado/arranque y el comando perfil-arranque).
+        return {
+            "pid": os.getpid(),
+            "total_ms": round(self.total_ms(), 2),
+            "fases": [{"fase": nombre, "ms": round(ms, 2)} for nombre, ms in self.fases],
+        }
+
+    def registrar(self):
+        # Una línea en el log por arranque: fácil de comparar entre versiones.
+        detalle = ", ".join(f"{nombre}={ms:.1f}ms" for nombre, ms in self.fases)
+        logger.info("Arranque en %.1f ms (%s)", self.total_ms(), detalle)
@@ -0,0 +1,50 @@
+import inspect, os
+from functools import wraps
+from flask import g, redirect, session
+from flask_app.models.usuario import Usuario
+
+# ----------------------------------------------------------------------
+# Usuario actual y decorador login_required
+# La sesión solo guarda usuario_id. El nombre y demás datos del usuario
+# salen de la caché de identidades (Usuario.identidad) una sola vez por
+# petición y quedan en g.usuario para las vistas y las plantillas.
+# ----------------------------------------------------------------------
+
+
+def usuario_actual():
+    # Devuelve la identidad del usuario que inició sesión, o None.
+    if "usuario" not in g:
+        usuario_id = session.get('usuario_id')
+        g.usuario = Usuario.identidad(usuario_id) if usuario_id else None
+    return g.usuario
+
+
+def ids_admin(variable):
+    # Ids de usuario de una lista en una variable de entorno, separados por coma
+    # (IMPORTACION_ADMINS="1,7"). Sin la variable la lista está vacía: nadie es admin.
+    return {int(parte) for parte in os.environ.get(variable, "").split(",") if parte.strip().isdigit()}
+
+
+def _rechazar():
+    # Sin sesión, o el usuario ya no existe: se limpia la sesión y se pide login.
+    session.clear()
+    return redirect('/entrar')
+
+
+def login_required(vista):
+    # Protege una ruta: si no hay usuario, redirige a /entrar.
+    # Sirve tanto para vistas normales como para vistas "async def".
+    if inspect.iscoroutinefunction(vista):
+        @wraps(vista)
+        async def envoltura_async(*args, **kwargs):
+            if usuario_actual() is None:
+                return _rechazar()
+            return await vista(*args, **kwargs)
+        return envoltura_async
+
+    @wraps(vista)
+    def envoltura(*args, **kwargs):
+        if usuario_actual() is None:
+            return _rechazar()
+        return vista(*args, **kwargs)
+    return envoltura
@@ -0,0 +1,190 @@
+import json, os, sqlite3, threading, time
+
+# ----------------------------------------------------------------------
+# Caché de datos que cambian poco (por ejemplo, la lista de tutores).
+# Hay dos "backends" con la misma interfaz:
+#   - CacheMemoria: un diccionario dentro del proceso (el más rápido).
+#   - CacheSQLite: un archivo local compartido por varios workers de gunicorn,
+#     así una invalidación en un worker la ven todos los demás.
+# Se elige con la variable de entorno CACHE_BACKEND=memoria|sqlite. Por
+# defecto es memoria con `flask run` y sqlite con gunicorn.conf.py cuando hay
+# más de un worker (que no acepta memoria en ese caso).
+# Los valores deben poder convertirse a JSON (listas, dicts, números, textos).
+# ----------------------------------------------------------------------
+
+# Máximo de claves guardadas; al pasarse se borran las vencidas y luego las menos usadas.
+CACHE_MAX_ENTRADAS = int(os.environ.get("CACHE_MAX_ENTRADAS", 10000))
+
+
+class BackendCache:
+    # Interfaz que debe cumplir cualquier backend de caché.
+    def obtener(self, clave):
+        # Devuelve el valor guardado o None si no existe o ya venció.
+        raise NotImplementedError
+
+    def guardar(self, clave, valor, ttl=None):
+        # Guarda un valor; ttl en segundos (None = no vence).
+        raise NotImplementedError
+
+    def borrar(self, clave):
+        raise NotImplementedError
+
+    def incrementar(self, clave):
+        # Suma 1 a un contador (lo crea en 1 si no existe) y devuelve el nuevo valor.
+        raise NotImplementedError
+
+    def limpiar(self):
+        raise NotImplementedError
+
+    def reiniciar_tras_fork(self):
+        # Se llama en cada worker de gunicorn después del fork.
+        pass
+
+
+class CacheMemoria(BackendCache):
+    def __init__(self, max_entradas=CACHE_MAX_ENTRADAS):
+        self._datos = {}   # clave -> (vence_en, valor), de la menos a la más usada
+        # Claves de incrementar(): son contadores (p. ej. la versión de los datos)
+        # y no se borran al recortar, igual que en CacheSQLite (que solo recorta
+        # claves con vencimiento).
+        self._contadores = set()
+        self._candado = threading.Lock()
+        self.max_entradas = max_entradas
+
+    def obtener(self, clave):
+        with self._candado:
+            entrada = self._datos.pop(clave, None)
+            if entrada is None:
+                return None
+            vence_en, valor = entrada
+            if vence_en is not None and vence_en < time.monotonic():
+                return None
+            # Se vuelve a poner al final: las claves usadas hace poco son las últimas en borrarse.
+            self._datos[clave] = entrada
+            return valor
+
+    def guardar(self, clave, valor, ttl=None):
+        vence_en = time.monotonic() + ttl if ttl else None
+        with self._candado:
+            self._datos.pop(clave, None)
+            self._datos[clave] = (vence_en, valor)
+            if len(self._datos) > self.max_entradas:
+                self._recortar()
+
+    def _recortar(self):
+        ahora = time.monotonic()
+        for clave in [c for c, (vence_en, _) in self._datos.items() if vence_en is not None and vence_en < ahora]:
+            del self._datos[clave]
+        while len(self._datos) > self.max_entradas:
+            # Los diccionarios mantienen el orden: la primera clave es la usada hace más tiempo.
+            clave = next((c for c in self._datos if c not in self._contadores), None)
+            if clave is None:
+                return
+            del self._datos[clave]
+
+    def borrar(self, clave):
+        with self._candado:
+            self._datos.pop(clave, None)
+            self._contadores.discard(clave)
+
+    def incrementar(self, clave):
+        with self._candado:
+            _, valor = self._datos.get(clave, (None, 0))
+            valor += 1
+            self._datos[clave] = (None, valor)
+            self._contadores.add(clave)
+            return valor
+
+    def limpiar(self):
+        with self._candado:
+            self._datos.clear()
+            self._contadores.clear()
+
+
+class CacheSQLite(BackendCache):
+    # Caché en un archivo SQLite local: lo comparten todos los procesos de la máquina.
+    def __init__(self, ruta, max_entradas=CACHE_MAX_ENTRADAS):
+        self.ruta = ruta
+        self.max_entradas = max_entradas
+        self._escrituras = 0
+        self._local = threading.local()
+        with self._conexion() as conexion:
+            conexion.execute(
+                "CREATE TABLE IF NOT EXISTS cache (clave TEXT PRIMARY KEY, valor TEXT, vence_en REAL)"
+            )
+
+    def _conexion(self):
+        # Una conexión por hilo (sqlite3 no permite compartirlas entre hilos).
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            self._local.conexion = conexion
+        return conexion
+
+    def obtener(self, clave):
+        fila = self._conexion().execute(
+            "SELECT valor, vence_en FROM cache WHERE clave = ?", (clave,)
+        ).fetchone()
+        if fila is None:
+            return None
+        valor, vence_en = fila
+        if vence_en is not None and vence_en < time.time():
+            self.borrar(clave)
+            return None
+        return json.loads(valor)
+
+    def guardar(self, clave, valor, ttl=None):
+        vence_en = time.time() + ttl if ttl else None
+        conexion = self._conexion()
+        conexion.execute(
+            "INSERT OR REPLACE INTO cache (clave, valor, vence_en) VALUES (?, ?, ?)",
+            (clave, json.dumps(valor), vence_en),
+        )
+        self._escrituras += 1
+        if self._escrituras % 200 == 0:
+            # De vez en cuando se limpian las claves vencidas y, si sobran, las más viejas.
+            conexion.execute("DELETE FROM cache WHERE vence_en IS NOT NULL AND vence_en < ?", (time.time(),))
+            conexion.execute(
+                "DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache WHERE vence_en IS NOT NULL "
+                "ORDER BY vence_en LIMIT max(0, (SELECT COUNT(*) FROM cache) - ?))",
+                (self.max_entradas,),
+            )
+
+    def reiniciar_tras_fork(self):
+        # Una conexión SQLite abierta antes del fork no se puede usar en el hijo.
+        self._local = threading.local()
+
+    def borrar(self, clave):
+        self._conexion().execute("DELETE FROM cache WHERE clave = ?", (clave,))
+
+    def incrementar(self, clave):
+        conexion = self._conexion()
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            fila = conexion.execute("SELECT valor FROM cache WHERE clave = ?", (clave,)).fetchone()
+            valor = (json.loads(fila[0]) if fila else 0) + 1
+            conexion.execute(
+                "INSERT OR REPLACE INTO cache (clave, valor, vence_en) VALUES (?, ?, NULL)",
+                (clave, json.dumps(valor)),
+            )
+            conexion.execute("COMMIT")
+        except Exception:
+            conexion.execute("ROLLBACK")
+            raise
+        return valor
+
+    def limpiar(self):
+        self._conexion().execute("DELETE FROM cache")
+
+
+def crear_cache():
+    tipo = os.environ.get("CACHE_BACKEND", "memoria")
+    if tipo == "sqlite":
+        ruta = os.environ.get("CACHE_RUTA", os.path.join(os.getcwd(), "cache_app.sqlite3"))
+        return CacheSQLite(ruta)
+    return CacheMemoria()
+
+
+# Caché compartida por toda la aplicación.
+cache = crear_cache()
@@ -0,0 +1,54 @@
+import csv, io, json
+from datetime import date, datetime
+
+# ----------------------------------------------------------------------
+# Conversión de filas a CSV o JSON de a poco (generadores), para poder
+# enviar exportaciones grandes sin armar todo el archivo en memoria.
+# ----------------------------------------------------------------------
+
+# Cada cuántas filas se entrega un bloque de texto.
+FILAS_POR_BLOQUE = 500
+
+
+def _valor_json(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return str(valor)
+
+
+def generar_csv(filas, columnas):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(columnas)
+    pendientes = 0
+    for fila in filas:
+        escritor.writerow([fila.get(columna) for columna in columnas])
+        pendientes += 1
+        if pendientes >= FILAS_POR_BLOQUE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+            pendientes = 0
+    yield buffer.getvalue()
+
+
+def generar_json(filas, columnas):
+    # Un arreglo JSON escrito por partes: "[", fila, ",", fila, ..., "]".
+    yield "["
+    separador = ""
+    bloque = []
+    for fila in filas:
+        datos = {columna: fila.get(columna) for columna in columnas}
+        bloque.append(separador + json.dumps(datos, default=_valor_json, ensure_ascii=False))
+        separador = ","
+        if len(bloque) >= FILAS_POR_BLOQUE:
+            yield "".join(bloque)
+            bloque = []
+    bloque.append("]")
+    yield "".join(bloque)
+
+
+FORMATOS = {
+    "csv": (generar_csv, "text/csv; charset=utf-8"),
+    "json": (generar_json, "application/json"),
+}
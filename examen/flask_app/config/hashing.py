@@ -0,0 +1,106 @@
+import os, threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# ----------------------------------------------------------------------
+# Servicio de hash de contraseñas
+# Generar y comprobar hashes es lento a propósito (scrypt/pbkdf2). En vez de
+# hacerlo en el hilo de la petición, se manda a un grupo de hilos o procesos
+# con una cola acotada: si hay demasiados logins a la vez se rechaza rápido
+# (ServicioOcupado) en lugar de dejar todos los workers bloqueados.
+# ----------------------------------------------------------------------
+
+# Método de Werkzeug, p. ej. "scrypt" o "pbkdf2:sha256:600000".
+HASH_METODO = os.environ.get("HASH_METODO", "scrypt")
+# "hilos" (hashlib suelta el GIL mientras calcula) o "procesos".
+HASH_EJECUTOR = os.environ.get("HASH_EJECUTOR", "hilos")
+HASH_TRABAJADORES = int(os.environ.get("HASH_TRABAJADORES", os.cpu_count() or 2))
+# Máximo de hashes pendientes + en curso antes de rechazar nuevos.
+HASH_COLA_MAX = int(os.environ.get("HASH_COLA_MAX", 32))
+# Segundos que una petición espera su resultado.
+HASH_ESPERA = float(os.environ.get("HASH_ESPERA", 10))
+
+
+class ServicioOcupado(Exception):
+    # La cola de hashes está llena o el resultado tardó demasiado.
+    pass
+
+
+class ServicioHash:
+    def __init__(self, metodo=HASH_METODO, ejecutor=HASH_EJECUTOR, trabajadores=HASH_TRABAJADORES,
+                 cola_max=HASH_COLA_MAX, espera=HASH_ESPERA):
+        self.metodo = metodo
+        self.tipo_ejecutor = ejecutor
+        self.trabajadores = max(1, trabajadores)
+        self.espera = espera
+        self._cupos = threading.BoundedSemaphore(max(1, cola_max))
+        self._ejecutor = None
+        self._candado = threading.Lock()
+        self._prefijo = None
+
+    def _obtener_ejecutor(self):
+        # Se crea al primer uso (y de nuevo tras un fork de gunicorn).
+        if self._ejecutor is None:
+            with self._candado:
+                if self._ejecutor is None:
+                    if self.tipo_ejecutor == "procesos":
+                        self._ejecutor = ProcessPoolExecutor(max_workers=self.trabajadores)
+                    else:
+                        self._ejecutor = ThreadPoolExecutor(
+                            max_workers=self.trabajadores, thread_name_prefix="hash"
+                        )
+        return self._ejecutor
+
+    def _enviar(self, funcion, *args, bloquear=False):
+        if not self._cupos.acquire(blocking=bloquear, timeout=self.espera if bloquear else None):
+            raise ServicioOcupado("Demasiadas contraseñas en proceso, intente más tarde.")
+        try:
+            futuro = self._obtener_ejecutor().submit(funcion, *args)
+        except Exception:
+            self._cupos.release()
+            raise
+        futuro.add_done_callback(lambda _: self._cupos.release())
+        return futuro
+
+    def _esperar(self, futuro):
+        try:
+            return futuro.result(timeout=self.espera)
+        except TimeoutError:
+            raise ServicioOcupado("El cálculo del hash tardó demasiado.")
+
+    def generar(self, contrasena):
+        return self._esperar(self._enviar(generate_password_hash, contrasena, self.metodo))
+
+    def verificar(self, hash_guardado, contrasena):
+        return self._esperar(self._enviar(check_password_hash, hash_guardado, contrasena))
+
+    def generar_muchos(self, contrasenas):
+        # Para cargas masivas: se reparten en paralelo y, si la cola se llena,
+        # se espera un cupo en vez de rechazar.
+        futuros = [
+            self._enviar(generate_password_hash, contrasena, self.metodo, bloquear=True)
+            for contrasena in contrasenas
+        ]
+        return [self._esperar(futuro) for futuro in futuros]
+
+    def necesita_rehash(self, hash_guardado):
+        # El hash guarda sus parámetros al inicio ("scrypt:32768:8:1$sal$hash").
+        # Si no coinciden con la configuración actual, hay que recalcularlo.
+        if self._prefijo is None:
+            self._prefijo = generate_password_hash("", self.metodo).split("$", 1)[0]
+        return hash_guardado.split("$", 1)[0] != self._prefijo
+
+    def reiniciar_tras_fork(self):
+        # El ejecutor (y sus hilos) no sobreviven a un fork: el worker crea uno nuevo al primer uso.
+        self._ejecutor = None
+        self._candado = threading.Lock()
+
+    def cerrar(self):
+        with self._candado:
+            if self._ejecutor is not None:
+                self._ejecutor.shutdown(wait=True)
+                self._ejecutor = None
+
+
+# Servicio compartido por toda la aplicación.
+servicio_hash = ServicioHash()
@@ -0,0 +1,66 @@
+import csv, io, os
+from itertools import islice
+
+# ----------------------------------------------------------------------
+# Utilidades para la importación masiva desde CSV (usuarios y asesorías).
+# Las filas se procesan por lotes: se validan, se revisan contra la base con
+# una sola consulta por lote y se insertan con un INSERT de varias filas
+# dentro de una transacción.
+# ----------------------------------------------------------------------
+
+# Filas por lote (cada lote es una transacción).
+IMPORTACION_LOTE = int(os.environ.get("IMPORTACION_LOTE", 500))
+
+# Clave donde leer_csv deja cuántos valores de más trae una fila
+# (más columnas que el encabezado); ver errores_formato.
+CLAVE_SOBRANTES = "_sobrantes"
+
+
+class ResultadoImportacion:
+    # Resumen de una importación: cuántas filas entraron y qué filas fallaron.
+    def __init__(self):
+        self.insertadas = 0
+        self.errores = []   # [(número de línea, [mensajes]), ...]
+
+    def agregar_error(self, linea, mensajes):
+        self.errores.append((linea, list(mensajes)))
+
+    def como_dict(self):
+        return {
+            "insertadas": self.insertadas,
+            "con_errores": len(self.errores),
+            "errores": [{"linea": linea, "errores": mensajes} for linea, mensajes in self.errores],
+        }
+
+
+def leer_csv(archivo):
+    # Devuelve (número de línea, fila) para cada fila del CSV; la línea 1 es el encabezado.
+    # `archivo` puede estar abierto en modo texto o binario (subida por formulario).
+    if isinstance(archivo.read(0), bytes):
+        archivo = io.TextIOWrapper(archivo, encoding="utf-8-sig")
+    lector = csv.DictReader(archivo)
+    for numero, fila in enumerate(lector, start=2):
+        # Si la fila tiene más valores que el encabezado, DictReader deja los
+        # sobrantes en una lista bajo la clave None: no se mezclan con los demás.
+        sobrantes = fila.pop(None, None)
+        datos = {(clave or "").strip(): (valor or "").strip() for clave, valor in fila.items()}
+        if sobrantes:
+            datos[CLAVE_SOBRANTES] = len(sobrantes)
+        yield numero, datos
+
+
+def errores_formato(fila):
+    # Errores de la forma de la fila (no de sus datos); los importadores los
+    # reportan igual que los de validación, como error de esa línea.
+    if fila.get(CLAVE_SOBRANTES):
+        return [f"La fila tiene {fila[CLAVE_SOBRANTES]} columna(s) de más."]
+    return []
+
+
+def en_lotes(iterable, tamano=IMPORTACION_LOTE):
+    iterador = iter(iterable)
+    while True:
+        lote = list(islice(iterador, tamano))
+        if not lote:
+            return
+        yield lote
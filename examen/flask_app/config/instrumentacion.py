@@ -0,0 +1,158 @@
+import logging, os, threading, time
+from collections import Counter, deque
+from flask import current_app, g, has_app_context, request
+
+# ----------------------------------------------------------------------
+# Instrumentación de consultas
+# Reemplaza el print() de cada consulta por mediciones: tiempo de cada
+# consulta, filas, tiempo esperando una conexión del pool, un log de
+# consultas lentas y un conteo por petición (cabeceras X-Consultas-DB y
+# X-Tiempo-DB-ms, solo en modo debug o con DEBUG_CONSULTAS=1).
+# También detecta patrones N+1: la misma sentencia repetida muchas veces
+# en una sola petición.
+# ----------------------------------------------------------------------
+
+logger = logging.getLogger("flask_app.db")
+
+# Consultas que tardan más que esto (en milisegundos) se registran como lentas.
+CONSULTA_LENTA_MS = float(os.environ.get("CONSULTA_LENTA_MS", 200))
+# Si la misma sentencia se repite esta cantidad de veces en una petición, se avisa de un posible N+1.
+UMBRAL_N_MAS_1 = int(os.environ.get("UMBRAL_N_MAS_1", 5))
+# Cuántas peticiones recientes se guardan para /debug/consultas.
+HISTORIAL_MAX = int(os.environ.get("HISTORIAL_CONSULTAS", 50))
+
+# Funciones que se llaman con cada evento: hook(tipo, datos).
+# tipo es "consulta", "consulta_lenta" o "n_mas_1".
+_hooks = []
+_historial = deque(maxlen=HISTORIAL_MAX)
+
+# Promedio reciente de la espera por una conexión del pool (de todo el proceso,
+# no de una petición). Se "olvida" solo: cada ESPERA_VIDA_MEDIA_S segundos sin
+# esperas nuevas vale la mitad. Lo usa el rechazo de carga de config/metricas.py.
+ESPERA_VIDA_MEDIA_S = 2.0
+_espera_pool = {"media_s": 0.0, "momento": time.monotonic()}
+_candado_espera = threading.Lock()
+
+
+def agregar_hook(funcion):
+    _hooks.append(funcion)
+    return funcion
+
+
+def quitar_hook(funcion):
+    if funcion in _hooks:
+        _hooks.remove(funcion)
+
+
+def _avisar(tipo, datos):
+    for hook in list(_hooks):
+        try:
+            hook(tipo, datos)
+        except Exception:
+            logger.exception("Falló un hook de instrumentación")
+
+
+def _estado_request():
+    if not has_app_context():
+        return None
+    if "_instrumentacion" not in g:
+        g._instrumentacion = {
+            "consultas": 0,
+            "tiempo_s": 0.0,
+            "filas": 0,
+            "espera_conexion_s": 0.0,
+            "por_sentencia": Counter(),
+        }
+    return g._instrumentacion
+
+
+def _espera_actual(ahora):
+    transcurrido = ahora - _espera_pool["momento"]
+    return _espera_pool["media_s"] * 0.5 ** (transcurrido / ESPERA_VIDA_MEDIA_S)
+
+
+def registrar_espera_conexion(segundos):
+    # Tiempo que tardó el pool en prestar una conexión.
+    estado = _estado_request()
+    if estado is not None:
+        estado["espera_conexion_s"] += segundos
+    with _candado_espera:
+        ahora = time.monotonic()
+        _espera_pool["media_s"] = _espera_actual(ahora) * 0.8 + segundos * 0.2
+        _espera_pool["momento"] = ahora
+
+
+def espera_conexion_reciente():
+    # Segundos promedio que se está esperando una conexión en este proceso.
+    with _candado_espera:
+        return _espera_actual(time.monotonic())
+
+
+def registrar_consulta(sentencia, segundos, filas):
+    # Se llama desde MySQLConnection después de cada consulta.
+    # `sentencia` es el SQL con los %(marcadores)s, sin los valores, así
+    # consultas iguales con datos distintos cuentan como la misma sentencia.
+    estado = _estado_request()
+    if estado is not None:
+        estado["consultas"] += 1
+        estado["tiempo_s"] += segundos
+        estado["filas"] += filas
+        estado["por_sentencia"][sentencia] += 1
+
+    datos = {"sentencia": sentencia, "ms": segundos * 1000, "filas": filas}
+    if _hooks:
+        _avisar("consulta", datos)
+    if datos["ms"] >= CONSULTA_LENTA_MS:
+        logger.warning("Consulta lenta (%.1f ms, %s filas): %s", datos["ms"], filas, " ".join(sentencia.split()))
+        _avisar("consulta_lenta", datos)
+
+
+def resumen_request():
+    estado = _estado_request()
+    if estado is None:
+        return None
+    return {
+        "consultas": estado["consultas"],
+        "tiempo_ms": round(estado["tiempo_s"] * 1000, 2),
+        "filas": estado["filas"],
+        "espera_conexion_ms": round(estado["espera_conexion_s"] * 1000, 2),
+        "repetidas": {
+            " ".join(sentencia.split()): veces
+            for sentencia, veces in estado["por_sentencia"].items()
+            if veces > 1
+        },
+    }
+
+
+def cabeceras_activas():
+    # Las cabeceras cuentan cuánto trabaja la base en cada ruta: a un cliente
+    # cualquiera no se le muestra (igual que /debug/consultas).
+    return current_app.debug or os.environ.get("DEBUG_CONSULTAS") == "1"
+
+
+def agregar_cabeceras_consultas(respuesta):
+    # Se registra con app.after_request: agrega el conteo de consultas de la
+    # petición a la respuesta y revisa si hubo un posible N+1.
+    resumen = resumen_request()
+    if resumen is None:
+        return respuesta
+    if cabeceras_activas():
+        respuesta.headers["X-Consultas-DB"] = str(resumen["consultas"])
+        respuesta.headers["X-Tiempo-DB-ms"] = str(resumen["tiempo_ms"])
+
+    for sentencia, veces in resumen["repetidas"].items():
+        if veces >= UMBRAL_N_MAS_1:
+            logger.warning("Posible N+1 en %s: %s veces la misma consulta: %s",
+                           request.endpoint, veces, sentencia)
+            _avisar("n_mas_1", {"endpoint": request.endpoint, "sentencia": sentencia, "veces": veces})
+
+    resumen["ruta"] = request.path
+    resumen["endpoint"] = request.endpoint
+    resumen["momento"] = time.time()
+    _historial.append(resumen)
+    return respuesta
+
+
+def historial():
+    # Resúmenes de las últimas peticiones (la más reciente primero).
+    return list(reversed(_historial))
@@ -0,0 +1,231 @@
+import threading, time
+from flask import request
+from flask_app.config.instrumentacion import logger, espera_conexion_reciente
+
+# ----------------------------------------------------------------------
+# Métricas por ruta y rechazo de carga
+# MiddlewareMetricas envuelve app.wsgi_app (la app WSGI de Flask) y por
+# cada petición anota:
+# - cuánto tardó, en un histograma por ruta y método (la ruta es la regla,
+#   "/ver/<int:id>", no la URL: así todas las asesorías suman en una sola serie),
+# - cuántas peticiones están en curso en este momento,
+# - cuántas terminaron con error (código 5xx o excepción).
+# El tiempo se mide hasta que el servidor termina de enviar el cuerpo, así
+# las exportaciones que se envían por partes cuentan su duración real.
+# /metrics lo muestra en el formato de texto de Prometheus (solo con MONITOREO=1
+# o MONITOREO_TOKEN; ver controllers/estado.py).
+#
+# Rechazo de carga (opcional): si hay demasiadas peticiones en curso o se
+# está esperando demasiado por una conexión del pool, se responde enseguida
+# 503 con Retry-After en vez de encolar la petición hasta que el worker
+# llegue a su timeout. /metrics, /estado/... y /recursos/... nunca se rechazan.
+#
+# Ojo: los números son de cada proceso. Con varios workers de gunicorn cada
+# uno tiene los suyos y Prometheus los suma (cada scrape cae en un worker).
+# ----------------------------------------------------------------------
+
+# Límites de los "baldes" del histograma, en segundos.
+BALDES_S = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Prefijos que siempre se atienden (monitoreo y archivos estáticos).
+RUTAS_EXENTAS = ("/metrics", "/estado/", "/recursos/", "/static/")
+
+# Métodos que se usan como etiqueta; cualquier otro se cuenta como "otro"
+# (el cliente elige el método, y cada valor distinto sería una serie nueva).
+METODOS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+# Clave de request.environ donde before_request deja la regla de la ruta.
+CLAVE_RUTA = "metricas.ruta"
+
+MENSAJE_RECHAZO = "El servidor está ocupado. Intenta de nuevo en unos segundos.\n".encode("utf-8")
+
+
+def anotar_ruta():
+    # before_request: la regla de la ruta solo se conoce después de que Flask
+    # resolvió la URL, y el middleware está "afuera" de Flask; se la pasamos por el environ.
+    request.environ[CLAVE_RUTA] = request.url_rule.rule if request.url_rule else "sin_ruta"
+
+
+class _Serie:
+    # Histograma y contadores de una combinación (ruta, método).
+    __slots__ = ("baldes", "suma_s", "cantidad", "errores", "por_estado")
+
+    def __init__(self):
+        self.baldes = [0] * len(BALDES_S)
+        self.suma_s = 0.0
+        self.cantidad = 0
+        self.errores = 0
+        self.por_estado = {}    # "2xx", "3xx"... -> cantidad
+
+
+class _CuerpoMedido:
+    # Envuelve el cuerpo de la respuesta: la petición termina cuando se envió
+    # la última parte o el servidor llama a close(), no cuando la vista devuelve.
+    def __init__(self, cuerpo, al_cerrar):
+        self._cuerpo = cuerpo
+        self._al_cerrar = al_cerrar
+
+    def __iter__(self):
+        try:
+            yield from self._cuerpo
+        except Exception:
+            self._al_cerrar(error=True)
+            raise
+        self._al_cerrar()
+
+    def close(self):
+        try:
+            if hasattr(self._cuerpo, "close"):
+                self._cuerpo.close()
+        finally:
+            self._al_cerrar()
+
+
+class MiddlewareMetricas:
+    def __init__(self, wsgi_app, max_en_curso=0, max_espera_pool_ms=0, retry_after=1):
+        self.wsgi_app = wsgi_app
+        # 0 = sin límite.
+        self.max_en_curso = max_en_curso
+        self.max_espera_pool_s = max_espera_pool_ms / 1000
+        self.retry_after = retry_after
+        self.en_curso = 0
+        self.series = {}        # (ruta, método) -> _Serie
+        self.rechazos = {"en_curso": 0, "espera_pool": 0}
+        self._candado = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # WSGI
+    # ------------------------------------------------------------------
+    def __call__(self, environ, start_response):
+        if not environ.get("PATH_INFO", "").startswith(RUTAS_EXENTAS):
+            motivo = self._motivo_rechazo()
+            if motivo:
+                return self._rechazar(motivo, start_response)
+
+        with self._candado:
+            self.en_curso += 1
+        inicio = time.perf_counter()
+        estado = {"codigo": 500, "cerrado": False}
+
+        def start_response_medido(status, headers, exc_info=None):
+            estado["codigo"] = int(status.split(" ", 1)[0])
+            return start_response(status, headers, exc_info)
+
+        def al_cerrar(error=False):
+            if estado["cerrado"]:
+                return
+            estado["cerrado"] = True
+            ruta = environ.get(CLAVE_RUTA, "sin_ruta")
+            metodo = environ.get("REQUEST_METHOD", "GET")
+            self._anotar(ruta, metodo if metodo in METODOS else "otro", estado["codigo"],
+                         time.perf_counter() - inicio, error)
+
+        try:
+            cuerpo = self.wsgi_app(environ, start_response_medido)
+        except Exception:
+            al_cerrar(error=True)
+            raise
+        return _CuerpoMedido(cuerpo, al_cerrar)
+
+    def _motivo_rechazo(self):
+        if self.max_en_curso and self.en_curso >= self.max_en_curso:
+            return "en_curso"
+        if self.max_espera_pool_s and espera_conexion_reciente() > self.max_espera_pool_s:
+            return "espera_pool"
+        return None
+
+    def _rechazar(self, motivo, start_response):
+        with self._candado:
+            self.rechazos[motivo] += 1
+        logger.warning("Petición rechazada por carga (%s): %s en curso", motivo, self.en_curso)
+        start_response("503 Service Unavailable", [
+            ("Content-Type", "text/plain; charset=utf-8"),
+            ("Content-Length", str(len(MENSAJE_RECHAZO))),
+            ("Retry-After", str(self.retry_after)),
+            ("Cache-Control", "no-store"),
+        ])
+        return [MENSAJE_RECHAZO]
+
+    def _anotar(self, ruta, metodo, codigo, segundos, error):
+        with self._candado:
+            self.en_curso -= 1
+            serie = self.series.get((ruta, metodo))
+            if serie is None:
+                serie = self.series[(ruta, metodo)] = _Serie()
+            for i, limite in enumerate(BALDES_S):
+                if segundos <= limite:
+                    serie.baldes[i] += 1
+                    break
+            serie.suma_s += segundos
+            serie.cantidad += 1
+            clase = f"{codigo // 100}xx"
+            serie.por_estado[clase] = serie.por_estado.get(clase, 0) + 1
+            if error or codigo >= 500:
+                serie.errores += 1
+
+    # ------------------------------------------------------------------
+    # Formato de texto de Prometheus
+    # ------------------------------------------------------------------
+    def exposicion(self, pools=()):
+        # pools: lista de estadísticas de pool (estadisticas_pools().values()).
+        with self._candado:
+            series = sorted((clave, _copiar(serie)) for clave, serie in self.series.items())
+            en_curso = self.en_curso
+            rechazos = dict(self.rechazos)
+
+        lineas = [
+            "# HELP http_request_duration_seconds Duración de las peticiones por ruta.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (ruta, metodo), serie in series:
+            etiquetas = f'ruta="{_escapar(ruta)}",metodo="{metodo}"'
+            acumulado = 0
+            for limite, cantidad in zip(BALDES_S, serie.baldes):
+                acumulado += cantidad
+                lineas.append(f'http_request_duration_seconds_bucket{{{etiquetas},le="{limite}"}} {acumulado}')
+            lineas.append(f'http_request_duration_seconds_bucket{{{etiquetas},le="+Inf"}} {serie.cantidad}')
+            lineas.append(f"http_request_duration_seconds_sum{{{etiquetas}}} {serie.suma_s:.6f}")
+            lineas.append(f"http_request_duration_seconds_count{{{etiquetas}}} {serie.cantidad}")
+
+        lineas += ["# HELP http_requests_total Peticiones terminadas por ruta y clase de código.",
+                   "# TYPE http_requests_total counter"]
+        for (ruta, metodo), serie in series:
+            for clase, cantidad in sorted(serie.por_estado.items()):
+                lineas.append(f'http_requests_total{{ruta="{_escapar(ruta)}",metodo="{metodo}",estado="{clase}"}} {cantidad}')
+
+        lineas += ["# HELP http_request_errors_total Peticiones con código 5xx o excepción.",
+                   "# TYPE http_request_errors_total counter"]
+        for (ruta, metodo), serie in series:
+            lineas.append(f'http_request_errors_total{{ruta="{_escapar(ruta)}",metodo="{metodo}"}} {serie.errores}')
+
+        lineas += ["# HELP http_requests_in_flight Peticiones en curso en este proceso.",
+                   "# TYPE http_requests_in_flight gauge",
+                   f"http_requests_in_flight {en_curso}",
+                   "# HELP http_requests_shed_total Peticiones rechazadas con 503 por carga.",
+                   "# TYPE http_requests_shed_total counter"]
+        for motivo, cantidad in sorted(rechazos.items()):
+            lineas.append(f'http_requests_shed_total{{motivo="{motivo}"}} {cantidad}')
+
+        lineas += ["# HELP db_pool_wait_seconds Espera promedio reciente por una conexión del pool.",
+                   "# TYPE db_pool_wait_seconds gauge",
+                   f"db_pool_wait_seconds {espera_conexion_reciente():.6f}",
+                   "# HELP db_pool_connections Conexiones del pool por estado.",
+                   "# TYPE db_pool_connections gauge"]
+        for datos in pools:
+            etiquetas = f'db="{_escapar(datos["db"])}",servidor="{_escapar(datos["servidor"])}"'
+            lineas.append(f'db_pool_connections{{{etiquetas},estado="en_uso"}} {datos["en_uso"]}')
+            lineas.append(f'db_pool_connections{{{etiquetas},estado="libres"}} {datos["libres"]}')
+        return "\n".join(lineas) + "\n"
+
+
+def _copiar(serie):
+    # Copia para armar el texto fuera del candado.
+    copia = _Serie()
+    copia.baldes = list(serie.baldes)
+    copia.suma_s, copia.cantidad, copia.errores = serie.suma_s, serie.cantidad, serie.errores
+    copia.por_estado = dict(serie.por_estado)
+    return copia
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,167 @@
+import os
+from flask_app.config.mysqlconnection import crear_conexion
+
+# ----------------------------------------------------------------------
+# Migraciones del esquema
+# Cada migración tiene un número de versión, una descripción y una función
+# que recibe un cursor. Se aplican en orden y solo una vez: la tabla
+# `migraciones_esquema` guarda cuáles ya se ejecutaron.
+# Esto corre al arrancar la app (MIGRAR_AL_INICIAR=1) o con `flask migrar`,
+# nunca dentro de una petición.
+# ----------------------------------------------------------------------
+
+RUTA_ESQUEMA = os.path.join(os.path.dirname(__file__), "..", "..", "esquema.sql")
+
+# Nombre del candado de MySQL para que dos procesos no migren al mismo tiempo.
+CANDADO = "migraciones_esquema_asesorias"
+
+
+def _sentencias_esquema():
+    # Lee esquema.sql y devuelve solo los CREATE TABLE, sin comentarios
+    # y sin el nombre del esquema (así sirve para cualquier MYSQL_DB).
+    with open(RUTA_ESQUEMA, encoding="utf-8") as archivo:
+        lineas = [l for l in archivo if not l.strip().startswith("--")]
+    sentencias = []
+    for sentencia in "".join(lineas).split(";"):
+        sentencia = sentencia.strip()
+        if sentencia.upper().startswith("CREATE TABLE"):
+            sentencias.append(sentencia.replace("`esquema_asesorias`.", ""))
+    return sentencias
+
+
+def _existe_columna(cursor, tabla, columna):
+    cursor.execute(
+        "SELECT COUNT(*) AS c FROM information_schema.columns "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s;",
+        (tabla, columna),
+    )
+    return cursor.fetchone()["c"] > 0
+
+
+def _existe_indice(cursor, tabla, indice):
+    cursor.execute(
+        "SELECT COUNT(*) AS c FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s;",
+        (tabla, indice),
+    )
+    return cursor.fetchone()["c"] > 0
+
+
+def agregar_indice_si_falta(cursor, tabla, indice, definicion):
+    # Las bases nuevas ya traen los índices desde esquema.sql;
+    # las antiguas los reciben aquí.
+    if not _existe_indice(cursor, tabla, indice):
+        cursor.execute(f"ALTER TABLE {tabla} ADD {definicion};")
+
+
+# ----------------------------------------------------------------------
+# Migraciones (agregar nuevas al final, con el siguiente número)
+# ----------------------------------------------------------------------
+def _m001_esquema_base(cursor):
+    for sentencia in _sentencias_esquema():
+        cursor.execute(sentencia)
+
+
+def _m002_columna_es_tutor(cursor):
+    # Bases creadas antes de que existiera la columna es_tutor.
+    if not _existe_columna(cursor, "usuarios", "es_tutor"):
+        cursor.execute("ALTER TABLE usuarios ADD COLUMN es_tutor TINYINT(1) NOT NULL DEFAULT 0;")
+
+
+def _m003_indice_fecha_id(cursor):
+    # Índice para el listado paginado de /inicio (WHERE fecha >= ... ORDER BY fecha, id).
+    agregar_indice_si_falta(cursor, "asesorias", "fecha_id", "INDEX `fecha_id` (`fecha` ASC, `id` ASC)")
+
+
+def _m004_email_unico(cursor):
+    # Login y registro buscan por email: índice UNIQUE para que sea una búsqueda
+    # por índice y para que MySQL rechace emails repetidos.
+    # Si ya hay emails duplicados esta migración falla: hay que limpiarlos antes.
+    agregar_indice_si_falta(cursor, "usuarios", "email_UNIQUE", "UNIQUE INDEX `email_UNIQUE` (`email` ASC)")
+
+
+def _m005_fulltext_asesorias(cursor):
+    # Búsqueda (/buscar) por tema y notas con MATCH ... AGAINST en vez de LIKE '%...%',
+    # que obliga a leer la tabla entera. La primera FULLTEXT de una tabla InnoDB la reconstruye.
+    agregar_indice_si_falta(cursor, "asesorias", "tema_notas", "FULLTEXT INDEX `tema_notas` (`tema`, `notas`)")
+
+
+def _m006_fulltext_usuarios(cursor):
+    # Búsqueda de asesorías por el nombre del solicitante o del tutor.
+    agregar_indice_si_falta(cursor, "usuarios", "nombre_apellido", "FULLTEXT INDEX `nombre_apellido` (`nombre`, `apellido`)")
+
+
+def _m007_indice_tutor_fecha(cursor):
+    # Disponibilidad de tutores (WHERE tutor_id = ... AND fecha = ...) y agenda de un
+    # tutor (ORDER BY fecha, id). El índice compuesto también sirve para la llave
+    # foránea de tutor_id, así que el índice simple `tutor_id` sobra y se quita.
+    agregar_indice_si_falta(cursor, "asesorias", "tutor_fecha", "INDEX `tutor_fecha` (`tutor_id` ASC, `fecha` ASC)")
+    if _existe_indice(cursor, "asesorias", "tutor_id"):
+        cursor.execute("ALTER TABLE asesorias DROP INDEX `tutor_id`;")
+
+
+MIGRACIONES = [
+    (1, "Esquema base desde esquema.sql", _m001_esquema_base),
+    (2, "Columna usuarios.es_tutor", _m002_columna_es_tutor),
+    (3, "Índice asesorias(fecha, id)", _m003_indice_fecha_id),
+    (4, "Índice UNIQUE usuarios(email)", _m004_email_unico),
+    (5, "Índice FULLTEXT asesorias(tema, notas)", _m005_fulltext_asesorias),
+    (6, "Índice FULLTEXT usuarios(nombre, apellido)", _m006_fulltext_usuarios),
+    (7, "Índice asesorias(tutor_id, fecha)", _m007_indice_tutor_fecha),
+]
+
+
+def migrar(db=None, salida=print):
+    # Aplica todas las migraciones pendientes y devuelve la lista de versiones aplicadas.
+    db = db or os.environ.get("MYSQL_DB", "esquema_asesorias")
+    conexion = crear_conexion(db)
+    aplicadas = []
+    try:
+        with conexion.cursor() as cursor:
+            cursor.execute("SELECT GET_LOCK(%s, 60) AS ok;", (CANDADO,))
+            if not cursor.fetchone()["ok"]:
+                raise RuntimeError("Otro proceso está aplicando migraciones.")
+            try:
+                cursor.execute("""
+                    CREATE TABLE IF NOT EXISTS migraciones_esquema (
+                        version INT NOT NULL PRIMARY KEY,
+                        descripcion VARCHAR(255) NOT NULL,
+                        aplicada_en DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+                    ) ENGINE = InnoDB;
+                """)
+                cursor.execute("SELECT version FROM migraciones_esquema;")
+                hechas = {fila["version"] for fila in cursor.fetchall()}
+
+                for version, descripcion, funcion in MIGRACIONES:
+                    if version in hechas:
+                        continue
+                    salida(f"Aplicando migración {version}: {descripcion}")
+                    # Los ALTER/CREATE de MySQL confirman solos, por eso cada
+                    # migración se registra apenas termina.
+                    funcion(cursor)
+                    cursor.execute(
+                        "INSERT INTO migraciones_esquema (version, descripcion) VALUES (%s, %s);",
+                        (version, descripcion),
+                    )
+                    aplicadas.append(version)
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK(%s);", (CANDADO,))
+    finally:
+        conexion.close()
+
+    if not aplicadas:
+        salida("El esquema está al día.")
+    return aplicadas
+
+
+def version_actual(db=None):
+    db = db or os.environ.get("MYSQL_DB", "esquema_asesorias")
+    conexion = crear_conexion(db)
+    try:
+        with conexion.cursor() as cursor:
+            cursor.execute("SELECT MAX(version) AS v FROM migraciones_esquema;")
+            return cursor.fetchone()["v"] or 0
+    except Exception:
+        return 0
+    finally:
+        conexion.close()
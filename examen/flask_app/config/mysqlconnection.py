@@ -1,39 +1,672 @@
-import pymysql.cursors, os
+import pymysql.cursors, itertools, os, threading, time
+from collections import deque
+from contextlib import contextmanager
+from flask import g, has_app_context, has_request_context, session
+from flask_app.config.instrumentacion import logger, registrar_consulta, registrar_espera_conexion
+
+# ----------------------------------------------------------------------
+# Configuración del pool de conexiones (se puede cambiar con variables de entorno)
+# ----------------------------------------------------------------------
+# Cantidad de conexiones que se abren al crear el pool (quedan "calientes").
+POOL_MIN = int(os.environ.get("MYSQL_POOL_MIN", 1))
+# Máximo de conexiones abiertas al mismo tiempo por proceso y por base de datos.
+POOL_MAX = int(os.environ.get("MYSQL_POOL_MAX", 10))
+# Segundos que se espera una conexión libre antes de rendirse cuando el pool está lleno.
+POOL_TIMEOUT = float(os.environ.get("MYSQL_POOL_TIMEOUT", 5))
+# Segundos de vida máxima de una conexión; después se cierra y se abre otra nueva.
+POOL_RECICLAR = float(os.environ.get("MYSQL_POOL_RECICLAR", 3600))
+# Si una conexión estuvo quieta más de estos segundos, se le hace ping antes de usarla.
+POOL_PING = float(os.environ.get("MYSQL_POOL_PING", 30))
+
+
+# ----------------------------------------------------------------------
+# Réplicas de lectura (opcional)
+# MYSQL_REPLICAS="host1:3306,host2" (mismo usuario, contraseña y base que la primaria).
+# Las lecturas marcadas (connectToMySQL(db, lectura=True)) van a una réplica;
+# las escrituras y todo lo que esté dentro de transaccion() va a la primaria.
+# ----------------------------------------------------------------------
+def _leer_servidores(texto):
+    servidores = []
+    for parte in texto.split(","):
+        parte = parte.strip()
+        if parte:
+            host, _, puerto = parte.partition(":")
+            servidores.append((host, int(puerto or 3306)))
+    return servidores
+
+
+REPLICAS = _leer_servidores(os.environ.get("MYSQL_REPLICAS", ""))
+# Segundos que las lecturas de un usuario van a la primaria después de que
+# escribió algo, para que vea sus cambios aunque la réplica vaya atrasada.
+REPLICA_FIJAR = float(os.environ.get("MYSQL_REPLICA_FIJAR", 5))
+# Segundos que se deja de usar una réplica después de un error de conexión.
+REPLICA_PAUSA = float(os.environ.get("MYSQL_REPLICA_PAUSA", 30))
+
+
+class PoolAgotado(Exception):
+    # Se lanza cuando no hubo ninguna conexión libre dentro del tiempo de espera.
+    pass
+
+
+class RegistroDuplicado(Exception):
+    # Se lanza cuando un INSERT/UPDATE choca con un índice UNIQUE (error 1062 de MySQL),
+    # por ejemplo al registrar un email que ya existe.
+    pass
+
+
+class ConflictoBloqueo(Exception):
+    # MySQL abortó la sentencia por un deadlock (1213) o por esperar demasiado un
+    # bloqueo (1205). La conexión sigue sana: no es un error de conexión. La
+    # transacción ya se deshizo; quien llama puede repetirla o pedir que se reintente.
+    pass
+
+
+# Código de error de MySQL para "Duplicate entry"
+ER_DUP_ENTRY = 1062
+# Deadlock y tiempo de espera de un bloqueo agotado.
+ER_LOCK_DEADLOCK = 1213
+ER_LOCK_WAIT_TIMEOUT = 1205
+
+
+def crear_conexion(db, servidor=None):
+    # Cambia 'root' y 'root' por tu usuario y contraseña de MySQL
+    # `servidor` es (host, puerto) de una réplica; None = la primaria.
+    host, puerto = servidor or (os.environ.get("MYSQL_HOST", "localhost"), int(os.environ.get("MYSQL_PORT", 3306)))
+    return pymysql.connect(
+        host=host,
+        port=puerto,
+        user=os.environ.get("MYSQL_USER", "root"),
+        password=os.environ.get("MYSQL_PASSWORD", "root"),
+        db=db or os.environ.get("MYSQL_DB"),
+        charset='utf8mb4',
+        cursorclass=pymysql.cursors.DictCursor,
+        autocommit=True
+    )
+
+
+class PoolConexiones:
+    # Pool acotado de conexiones PyMySQL para una base de datos.
+    # En vez de abrir y cerrar una conexión TCP por consulta, las conexiones
+    # se prestan (obtener) y se devuelven (devolver) para reutilizarlas.
+    def __init__(self, db, minimo=POOL_MIN, maximo=POOL_MAX, timeout=POOL_TIMEOUT,
+                 reciclar=POOL_RECICLAR, ping=POOL_PING, servidor=None, calentar=True):
+        self.db = db
+        self.servidor = servidor
+        self.clave = clave_pool(db, servidor)
+        self.minimo = max(0, minimo)
+        self.maximo = max(1, maximo)
+        self.timeout = timeout
+        self.reciclar = reciclar
+        self.ping = ping
+
+        # Conexiones libres: (conexion, momento_creacion, momento_ultimo_uso)
+        self._libres = deque()
+        self._condicion = threading.Condition()
+        # Conexiones abiertas en total (libres + prestadas)
+        self._total = 0
+        self._en_uso = 0
+        self._cerrado = False
+        # Momento de creación de cada conexión prestada (para reciclarla al volver)
+        self._creadas = {}
+
+        self.stats = {
+            "prestamos": 0,      # veces que se pidió una conexión
+            "esperas": 0,        # veces que hubo que esperar porque el pool estaba lleno
+            "espera_total_s": 0.0,
+            "timeouts": 0,       # veces que se acabó el tiempo de espera
+            "creaciones": 0,     # conexiones nuevas abiertas
+            "recicladas": 0,     # conexiones cerradas por superar su vida máxima
+            "descartadas": 0,    # conexiones que fallaron el ping o quedaron rotas
+        }
+
+        if calentar:
+            self.calentar()
+
+    def calentar(self):
+        # Abre las primeras `minimo` conexiones (quedan "calientes" en _libres).
+        # obtener_pool lo llama después de publicar el pool, fuera de
+        # _pools_candado: si el servidor está lento o caído solo esperan los
+        # que usan este pool, no los que piden la primaria u otra réplica.
+        while True:
+            with self._condicion:
+                if self._cerrado or self._total >= min(self.minimo, self.maximo):
+                    return
+                self._total += 1
+            try:
+                conexion, creada = self._abrir()
+            except Exception:
+                with self._condicion:
+                    self._total -= 1
+                    self._condicion.notify()
+                raise
+            with self._condicion:
+                if self._cerrado:
+                    self._total -= 1
+                    self._cerrar_silencioso(conexion)
+                    return
+                self._libres.append((conexion, creada, creada))
+                self._condicion.notify()
+
+    def _abrir(self):
+        conexion = crear_conexion(self.db, self.servidor)
+        with self._condicion:
+            self.stats["creaciones"] += 1
+        return conexion, time.monotonic()
+
+    def obtener(self):
+        inicio = time.monotonic()
+        entrada = None
+        with self._condicion:
+            if self._cerrado:
+                raise PoolAgotado(f"El pool de '{self.db}' está cerrado")
+            self.stats["prestamos"] += 1
+            espero = False
+            while True:
+                if self._libres:
+                    # LIFO: se usa la conexión más reciente, así las viejas
+                    # quedan quietas y se reciclan solas.
+                    entrada = self._libres.pop()
+                    break
+                if self._total < self.maximo:
+                    # Reservamos el lugar; la conexión se abre fuera del candado.
+                    self._total += 1
+                    break
+                if not espero:
+                    espero = True
+                    self.stats["esperas"] += 1
+                restante = self.timeout - (time.monotonic() - inicio)
+                if restante <= 0:
+                    self.stats["timeouts"] += 1
+                    raise PoolAgotado(
+                        f"No hubo conexión libre en {self.timeout}s (máximo {self.maximo})"
+                    )
+                self._condicion.wait(restante)
+            self._en_uso += 1
+            if espero:
+                self.stats["espera_total_s"] += time.monotonic() - inicio
+
+        try:
+            conexion = self._preparar(entrada)
+            # Incluye la espera por un lugar libre y, si hizo falta, abrir la conexión.
+            registrar_espera_conexion(time.monotonic() - inicio)
+            return conexion
+        except Exception:
+            with self._condicion:
+                self._total -= 1
+                self._en_uso -= 1
+                self._condicion.notify()
+            raise
+
+    def _preparar(self, entrada):
+        # Revisa que la conexión prestada siga sirviendo; si no, abre otra.
+        if entrada is None:
+            conexion, creada = self._abrir()
+            self._creadas[id(conexion)] = creada
+            return conexion
+
+        conexion, creada, ultimo_uso = entrada
+        ahora = time.monotonic()
+        if ahora - creada > self.reciclar:
+            # La conexión ya vivió demasiado: se cierra y se reemplaza.
+            self._cerrar_silencioso(conexion)
+            with self._condicion:
+                self.stats["recicladas"] += 1
+            conexion, creada = self._abrir()
+        elif ahora - ultimo_uso > self.ping:
+            # Estuvo quieta un rato: verificamos que el servidor siga respondiendo.
+            try:
+                conexion.ping(reconnect=False)
+            except Exception:
+                self._cerrar_silencioso(conexion)
+                with self._condicion:
+                    self.stats["descartadas"] += 1
+                conexion, creada = self._abrir()
+        self._creadas[id(conexion)] = creada
+        return conexion
+
+    def devolver(self, conexion):
+        creada = self._creadas.pop(id(conexion), time.monotonic())
+        with self._condicion:
+            self._en_uso -= 1
+            if self._cerrado or not conexion.open:
+                if conexion.open:
+                    self._cerrar_silencioso(conexion)
+                else:
+                    self.stats["descartadas"] += 1
+                self._total -= 1
+            else:
+                self._libres.append((conexion, creada, time.monotonic()))
+            self._condicion.notify()
+
+    def descartar(self, conexion):
+        # Se usa cuando la conexión quedó en un estado dudoso (error de red, etc.).
+        self._creadas.pop(id(conexion), None)
+        self._cerrar_silencioso(conexion)
+        with self._condicion:
+            self._en_uso -= 1
+            self._total -= 1
+            self.stats["descartadas"] += 1
+            self._condicion.notify()
+
+    def cerrar(self):
+        # Cierra todas las conexiones libres; las prestadas se cierran al devolverse.
+        with self._condicion:
+            self._cerrado = True
+            while self._libres:
+                conexion, _, _ = self._libres.pop()
+                self._cerrar_silencioso(conexion)
+                self._total -= 1
+            self._condicion.notify_all()
+
+    def estadisticas(self):
+        with self._condicion:
+            datos = dict(self.stats)
+            datos.update({
+                "db": self.db,
+                "servidor": "%s:%s" % self.servidor if self.servidor else "primaria",
+                "minimo": self.minimo,
+                "maximo": self.maximo,
+                "abiertas": self._total,
+                "libres": len(self._libres),
+                "en_uso": self._en_uso,
+            })
+        return datos
+
+    @staticmethod
+    def _cerrar_silencioso(conexion):
+        try:
+            conexion.close()
+        except Exception:
+            pass
+
+
+# Un pool por base de datos (y por réplica), compartido por todo el proceso.
+_pools = {}
+_pools_candado = threading.Lock()
+
+
+def clave_pool(db, servidor=None):
+    return db if servidor is None else "%s@%s:%s" % (db, *servidor)
+
+
+def obtener_pool(db, servidor=None):
+    db = db or os.environ.get("MYSQL_DB")
+    clave = clave_pool(db, servidor)
+    pool = _pools.get(clave)
+    if pool is None:
+        with _pools_candado:
+            pool = _pools.get(clave)
+            creado = pool is None
+            if creado:
+                # Crear el objeto no abre conexiones: el candado se suelta enseguida.
+                pool = PoolConexiones(db, servidor=servidor, calentar=False)
+                _pools[clave] = pool
+        if creado:
+            pool.calentar()
+    return pool
+
+
+# Réplicas con errores recientes: servidor -> momento hasta el que no se usan.
+_replicas_caidas = {}
+# Turno rotativo para repartir entre réplicas igual de ocupadas.
+_turno = itertools.count()
+
+
+def marcar_replica_caida(servidor):
+    _replicas_caidas[servidor] = time.monotonic() + REPLICA_PAUSA
+    logger.warning("Réplica %s:%s fuera de servicio por %ss", servidor[0], servidor[1], REPLICA_PAUSA)
+
+
+def elegir_replica(db):
+    db = db or os.environ.get("MYSQL_DB")
+    # La réplica sana con menos conexiones prestadas; si hay empate, por turnos.
+    # Devuelve None si no hay réplicas configuradas o ninguna está sana.
+    ahora = time.monotonic()
+    sanas = [r for r in REPLICAS if _replicas_caidas.get(r, 0) <= ahora]
+    if not sanas:
+        return None
+    # Si esta petición ya tiene una conexión a una réplica, se sigue usando esa.
+    for contexto in _contextos().values():
+        if contexto.pool.db == db and contexto.pool.servidor in sanas:
+            return contexto.pool.servidor
+    inicio = next(_turno)
+    def ocupacion(indice):
+        pool = _pools.get(clave_pool(db, sanas[indice]))
+        return (pool._en_uso if pool else 0, (indice - inicio) % len(sanas))
+    return sanas[min(range(len(sanas)), key=ocupacion)]
+
+
+def estado_replicas():
+    ahora = time.monotonic()
+    return {
+        "%s:%s" % r: ("caida" if _replicas_caidas.get(r, 0) > ahora else "sana")
+        for r in REPLICAS
+    }
+
+
+def marcar_escritura():
+    # Read-your-writes: se anota en la sesión cuándo escribió este usuario.
+    if REPLICAS and has_request_context():
+        session['_escritura_en'] = time.time()
+
+
+def leer_de_primaria(db):
+    # Las lecturas van a la primaria si hay una transacción abierta en esta
+    # petición o si el usuario escribió hace menos de REPLICA_FIJAR segundos.
+    contexto = _contextos().get(clave_pool(db or os.environ.get("MYSQL_DB")))
+    if contexto is not None and contexto.en_transaccion:
+        return True
+    if has_request_context():
+        return time.time() - session.get('_escritura_en', 0) < REPLICA_FIJAR
+    return False
+
+
+def estadisticas_pools():
+    # Resumen de todos los pools del proceso (útil para dimensionarlos con carga real).
+    return {clave: pool.estadisticas() for clave, pool in list(_pools.items())}
+
+
+def cerrar_pools():
+    with _pools_candado:
+        for pool in _pools.values():
+            pool.cerrar()
+        _pools.clear()
+
+
+def reiniciar_pools_tras_fork():
+    # Se llama en cada worker recién creado (gunicorn post_fork). Las conexiones
+    # heredadas del proceso padre comparten el mismo socket: no se cierran aquí
+    # (eso cortaría la del padre), solo se olvidan y cada worker abre las suyas.
+    global _pools_candado, _local
+    _pools.clear()
+    _replicas_caidas.clear()
+    _pools_candado = threading.Lock()
+    _local = threading.local()
+
+
+class ContextoDB:
+    # Conexión "de trabajo" que se reutiliza durante toda una petición HTTP.
+    # Todas las consultas de los modelos en la misma petición usan esta conexión,
+    # y si hay una transacción abierta se confirma una sola vez al final del bloque.
+    def __init__(self, pool):
+        self.pool = pool
+        self.conexion = pool.obtener()
+        self.profundidad = 0   # transacciones anidadas abiertas
+        self.al_confirmar = [] # funciones a llamar después del COMMIT
+
+    @property
+    def en_transaccion(self):
+        return self.profundidad > 0
+
+    def liberar(self, roto=False):
+        if self.en_transaccion and not roto:
+            # Si la petición terminó con una transacción abierta, no se confirma nada.
+            try:
+                self.conexion.rollback()
+            except Exception:
+                roto = True
+            self.profundidad = 0
+            self.al_confirmar.clear()
+        if roto:
+            self.pool.descartar(self.conexion)
+        else:
+            self.pool.devolver(self.conexion)
+
+
+# Fuera de una petición (scripts, hilos) solo existe contexto dentro de transaccion().
+_local = threading.local()
+
+
+def _contextos():
+    if has_app_context():
+        if "_contextos_db" not in g:
+            g._contextos_db = {}
+        return g._contextos_db
+    if not hasattr(_local, "contextos"):
+        _local.contextos = {}
+    return _local.contextos
+
+
+def _contexto_actual(pool, crear=True):
+    # Devuelve la conexión de la petición actual, pidiéndola al pool la primera vez.
+    contextos = _contextos()
+    contexto = contextos.get(pool.clave)
+    if contexto is None and crear and has_app_context():
+        contexto = ContextoDB(pool)
+        contextos[pool.clave] = contexto
+    return contexto
+
+
+def liberar_conexiones_request(excepcion=None):
+    # Se registra con app.teardown_appcontext: devuelve al pool las conexiones de la petición.
+    if not has_app_context():
+        return
+    contextos = g.pop("_contextos_db", {})
+    for contexto in contextos.values():
+        contexto.liberar()
+
+
+@contextmanager
+def transaccion(db=None):
+    # Agrupa varias consultas en una sola transacción:
+    #     with transaccion(Asesoria.db):
+    #         Asesoria.actualizar(...)
+    #         Asesoria.actualizar_tutor(...)
+    # Si algo falla dentro del bloque se hace ROLLBACK; si no, un solo COMMIT al final.
+    pool = obtener_pool(db)
+    contexto = _contexto_actual(pool)
+    propio = contexto is None
+    if propio:
+        contexto = ContextoDB(pool)
+        _contextos()[pool.clave] = contexto
+
+    if contexto.profundidad == 0:
+        contexto.conexion.begin()
+    contexto.profundidad += 1
+    try:
+        yield contexto
+    except BaseException:
+        contexto.profundidad -= 1
+        if contexto.profundidad == 0:
+            contexto.al_confirmar.clear()
+            try:
+                contexto.conexion.rollback()
+            except Exception:
+                # Si ni siquiera se puede hacer ROLLBACK la conexión está rota;
+                # al cerrarla el pool la descarta cuando se devuelva.
+                contexto.conexion.close()
+        raise
+    else:
+        contexto.profundidad -= 1
+        if contexto.profundidad == 0:
+            contexto.conexion.commit()
+            pendientes, contexto.al_confirmar = contexto.al_confirmar, []
+            for funcion in pendientes:
+                funcion()
+    finally:
+        if propio:
+            _contextos().pop(pool.clave, None)
+            contexto.liberar()
+
+
+def al_confirmar(db, funcion):
+    # Ejecuta `funcion` cuando los datos ya estén confirmados: al final de la
+    # transacción abierta (si la hay) o de inmediato. Sirve para invalidar
+    # cachés sin que otra petición alcance a guardar datos viejos entre medio.
+    contexto = _contextos().get(obtener_pool(db).clave)
+    if contexto is not None and contexto.en_transaccion:
+        contexto.al_confirmar.append(funcion)
+    else:
+        funcion()
+
 
 class MySQLConnection:
-    def __init__(self, db):
-        # Cambia 'root' y 'root' por tu usuario y contraseña de MySQL
-        connection = pymysql.connect(
-            host=os.environ.get("MYSQL_HOST", "localhost"),
-            port=int(os.environ.get("MYSQL_PORT", 3306)),
-            user=os.environ.get("MYSQL_USER", "root"),
-            password=os.environ.get("MYSQL_PASSWORD", "root"),
-            db=db or os.environ.get("MYSQL_DB"),
-            charset='utf8mb4',
-            cursorclass=pymysql.cursors.DictCursor,
-            autocommit=True
-        )
-        self.connection = connection
-    
-    def query_db(self, query, data=None):
-        with self.connection.cursor() as cursor:
+    def __init__(self, db, lectura=False):
+        # Dentro de una petición se reutiliza la misma conexión para todas las consultas;
+        # fuera de ella se pide una prestada al pool solo para esta consulta.
+        # Con lectura=True (solo SELECT) se usa una réplica si hay réplicas configuradas.
+        self.db = db
+        self.servidor = None
+        if lectura and REPLICAS and not leer_de_primaria(db):
+            self.servidor = elegir_replica(db)
+        if self.servidor is not None:
             try:
-                query = cursor.mogrify(query, data)
-                print("Running Query:", query)
-                cursor.execute(query, data)
-                if query.lower().find("insert") >= 0:
-                    self.connection.commit()
-                    return cursor.lastrowid
-                elif query.lower().find("select") >= 0:
-                    result = cursor.fetchall()
-                    return result
+                self._conectar(obtener_pool(db, self.servidor))
+                return
+            except (PoolAgotado, pymysql.err.OperationalError):
+                # La réplica no responde: se marca y esta lectura va a la primaria.
+                marcar_replica_caida(self.servidor)
+                self.servidor = None
+        self._conectar(obtener_pool(db))
+
+    def _conectar(self, pool):
+        self.pool = pool
+        self.contexto = _contexto_actual(pool)
+        if self.contexto is not None:
+            self.connection = self.contexto.conexion
+        else:
+            self.connection = pool.obtener()
+
+    # ----------------------------------------------------------------------
+    # Métodos explícitos: cada uno sabe qué tipo de sentencia ejecuta, en vez
+    # de adivinarlo buscando "select" o "insert" dentro del texto del SQL.
+    # Los errores se lanzan (no se convierten en False).
+    # ----------------------------------------------------------------------
+    def fetch_all(self, query, data=None):
+        # SELECT que devuelve una lista de diccionarios (vacía si no hay filas).
+        return self._leer(query, data, lambda cursor: list(cursor.fetchall()))
+
+    def fetch_one(self, query, data=None):
+        # SELECT que devuelve la primera fila como diccionario, o None.
+        return self._leer(query, data, lambda cursor: cursor.fetchone())
+
+    def execute(self, query, data=None):
+        # UPDATE/DELETE/DDL: devuelve cuántas filas fueron afectadas.
+        resultado = self._ejecutar(query, data, lambda cursor: cursor.rowcount)
+        marcar_escritura()
+        return resultado
+
+    def insert(self, query, data=None):
+        # INSERT de una fila: devuelve el id generado (lastrowid).
+        resultado = self._ejecutar(query, data, lambda cursor: cursor.lastrowid)
+        marcar_escritura()
+        return resultado
+
+    def execute_many(self, query, lista_data):
+        # Misma sentencia para muchas filas. Con "INSERT ... VALUES (...)" PyMySQL
+        # arma un solo INSERT de varias filas: un viaje a la base en vez de N.
+        # Devuelve la cantidad de filas afectadas.
+        lista_data = list(lista_data)
+        if not lista_data:
+            return 0
+        resultado = self._ejecutar(query, lista_data, lambda cursor: cursor.rowcount, muchos=True)
+        marcar_escritura()
+        return resultado
+
+    def query_db(self, query, data=None):
+        # Compatibilidad con el código anterior: elige el método según la
+        # primera palabra de la sentencia (no según lo que aparezca en el texto).
+        palabra = query.lstrip().split(None, 1)[0].upper() if query.strip() else ""
+        if palabra in ("SELECT", "SHOW", "WITH"):
+            return self.fetch_all(query, data)
+        if palabra == "INSERT":
+            return self.insert(query, data)
+        return self.execute(query, data)
+
+    def _leer(self, query, data, leer):
+        try:
+            return self._ejecutar(query, data, leer)
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError):
+            if self.servidor is None:
+                raise
+            # La réplica falló a mitad de la lectura: se repite una vez en la primaria.
+            self.servidor = None
+            self._conectar(obtener_pool(self.db))
+            return self._ejecutar(query, data, leer)
+
+    def _ejecutar(self, query, data, leer, muchos=False):
+        roto = False
+        try:
+            with self.connection.cursor() as cursor:
+                inicio = time.perf_counter()
+                if muchos:
+                    cursor.executemany(query, data)
                 else:
-                    self.connection.commit()
-            except Exception as e:
-                print("Something went wrong", e)
-                return False
-            finally:
-                self.connection.close() 
-
-def connectToMySQL(db):
-    return MySQLConnection(db)
+                    cursor.execute(query, data)
+                # La conexión está en autocommit; dentro de transaccion() el COMMIT
+                # se hace una sola vez al cerrar el bloque.
+                resultado = leer(cursor)
+                registrar_consulta(query, time.perf_counter() - inicio, cursor.rowcount)
+                return resultado
+        except pymysql.err.IntegrityError as e:
+            if e.args and e.args[0] == ER_DUP_ENTRY:
+                # El llamador decide qué hacer con el duplicado (p. ej. avisar al usuario).
+                raise RegistroDuplicado(e.args[1] if len(e.args) > 1 else str(e)) from e
+            logger.error("Error en la consulta: %s -- %s", e, " ".join(query.split()))
+            raise
+        except pymysql.err.OperationalError as e:
+            if e.args and e.args[0] in (ER_LOCK_DEADLOCK, ER_LOCK_WAIT_TIMEOUT):
+                # Choque de bloqueos con otra transacción: la conexión está bien.
+                logger.warning("Conflicto de bloqueo: %s -- %s", e, " ".join(query.split()))
+                raise ConflictoBloqueo(e.args[1] if len(e.args) > 1 else str(e)) from e
+            # Error de conexión: no se devuelve al pool una conexión rota.
+            roto = True
+            if self.servidor is not None:
+                marcar_replica_caida(self.servidor)
+            logger.error("Error de conexión: %s -- %s", e, " ".join(query.split()))
+            raise
+        except pymysql.err.InterfaceError as e:
+            # Error de conexión: no se devuelve al pool una conexión rota.
+            roto = True
+            if self.servidor is not None:
+                marcar_replica_caida(self.servidor)
+            logger.error("Error de conexión: %s -- %s", e, " ".join(query.split()))
+            raise
+        except Exception as e:
+            logger.error("Error en la consulta: %s -- %s", e, " ".join(query.split()))
+            raise
+        finally:
+            self._soltar(roto)
+
+    def _soltar(self, roto):
+        if self.contexto is None:
+            if roto:
+                self.pool.descartar(self.connection)
+            else:
+                self.pool.devolver(self.connection)
+        elif roto and not self.contexto.en_transaccion:
+            # La conexión de la petición se rompió: la próxima consulta pedirá otra.
+            _contextos().pop(self.pool.clave, None)
+            self.contexto.liberar(roto=True)
+
+def consulta_en_flujo(db, query, data=None, lectura=False):
+    # Generador que entrega las filas de un SELECT de a una, usando un cursor
+    # del lado del servidor (SSDictCursor): PyMySQL no carga todo el resultado
+    # en memoria, así se pueden recorrer cientos de miles de filas.
+    # Usa su propia conexión del pool (no la de la petición), porque mientras
+    # se lee el resultado esa conexión no puede ejecutar otras consultas.
+    # Con lectura=True la exportación se hace desde una réplica, si hay.
+    servidor = elegir_replica(db) if lectura and REPLICAS and not leer_de_primaria(db) else None
+    pool = obtener_pool(db, servidor)
+    conexion = pool.obtener()
+    completo = False
+    filas = 0
+    inicio = time.perf_counter()
+    try:
+        with conexion.cursor(pymysql.cursors.SSDictCursor) as cursor:
+            cursor.execute(query, data)
+            for fila in cursor:
+                filas += 1
+                yield fila
+            completo = True
+    finally:
+        registrar_consulta(query, time.perf_counter() - inicio, filas)
+        if completo:
+            pool.devolver(conexion)
+        else:
+            # Si se cortó a la mitad (cliente desconectado, error), la conexión
+            # todavía tiene filas pendientes: es más barato descartarla que leerlas.
+            pool.descartar(conexion)
+
+def connectToMySQL(db, lectura=False):
+    return MySQLConnection(db, lectura)
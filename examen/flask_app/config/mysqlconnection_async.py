@@ -0,0 +1,153 @@
+import asyncio, os, threading, time
+import aiomysql, pymysql
+from flask_app.config.instrumentacion import logger, registrar_consulta
+from flask_app.config.mysqlconnection import (
+    POOL_MIN, POOL_MAX, POOL_RECICLAR, REPLICAS, elegir_replica, marcar_replica_caida, leer_de_primaria, clave_pool,
+)
+
+# ----------------------------------------------------------------------
+# Versión asíncrona de MySQLConnection (para vistas "async def" de Flask)
+# Flask ejecuta cada vista async en un bucle de eventos nuevo por petición,
+# y un pool de aiomysql solo sirve dentro del bucle donde se creó. Por eso
+# los pools viven en un único bucle en un hilo de fondo, y las vistas le
+# mandan sus consultas: varias consultas independientes de una misma vista
+# (asyncio.gather) viajan a MySQL al mismo tiempo, cada una en su conexión.
+# Solo para lecturas: las escrituras y transacciones siguen en MySQLConnection.
+# ----------------------------------------------------------------------
+
+_bucle = None
+_hilo = None
+_pools = {}
+_candado = threading.Lock()
+
+
+def _obtener_bucle():
+    # Arranca el hilo con el bucle de eventos la primera vez que se usa.
+    global _bucle, _hilo
+    if _bucle is None:
+        with _candado:
+            if _bucle is None:
+                bucle = asyncio.new_event_loop()
+                _hilo = threading.Thread(target=bucle.run_forever, name="mysql-async", daemon=True)
+                _hilo.start()
+                _bucle = bucle
+    return _bucle
+
+
+async def _pool(db, servidor=None):
+    # Se ejecuta dentro del bucle de fondo. Se guarda la tarea que crea el pool
+    # (no el pool) para que dos consultas simultáneas no creen dos pools.
+    clave = clave_pool(db, servidor)
+    tarea = _pools.get(clave)
+    if tarea is None:
+        host, puerto = servidor or (os.environ.get("MYSQL_HOST", "localhost"), int(os.environ.get("MYSQL_PORT", 3306)))
+        tarea = asyncio.ensure_future(aiomysql.create_pool(
+            host=host,
+            port=puerto,
+            user=os.environ.get("MYSQL_USER", "root"),
+            password=os.environ.get("MYSQL_PASSWORD", "root"),
+            db=db,
+            charset='utf8mb4',
+            autocommit=True,
+            minsize=POOL_MIN,
+            maxsize=POOL_MAX,
+            pool_recycle=POOL_RECICLAR,
+        ))
+        _pools[clave] = tarea
+    try:
+        return await asyncio.shield(tarea)
+    except Exception:
+        # Si no se pudo conectar, la próxima consulta lo vuelve a intentar.
+        if _pools.get(clave) is tarea:
+            del _pools[clave]
+        raise
+
+
+async def _consultar(db, servidor, query, data, leer):
+    pool = await _pool(db, servidor)
+    async with pool.acquire() as conexion:
+        async with conexion.cursor(aiomysql.DictCursor) as cursor:
+            inicio = time.perf_counter()
+            await cursor.execute(query, data)
+            resultado = await leer(cursor)
+            return resultado, time.perf_counter() - inicio, cursor.rowcount
+
+
+class MySQLConnectionAsync:
+    def __init__(self, db, lectura=True):
+        # Todas son lecturas: se usa una réplica si hay (ver MYSQL_REPLICAS),
+        # salvo que el usuario haya escrito hace poco.
+        self.db = db
+        self.servidor = None
+        if lectura and REPLICAS and not leer_de_primaria(db):
+            self.servidor = elegir_replica(db)
+
+    async def fetch_all(self, query, data=None):
+        # SELECT que devuelve una lista de diccionarios.
+        async def leer(cursor):
+            return list(await cursor.fetchall())
+        return await self._ejecutar(query, data, leer)
+
+    async def fetch_one(self, query, data=None):
+        # SELECT que devuelve la primera fila o None.
+        async def leer(cursor):
+            return await cursor.fetchone()
+        return await self._ejecutar(query, data, leer)
+
+    async def _ejecutar(self, query, data, leer):
+        # La consulta corre en el bucle de fondo; aquí solo se espera el resultado,
+        # y la medición se registra en la petición actual (para X-Consultas-DB).
+        try:
+            resultado, segundos, filas = await self._en_bucle(query, data, leer)
+        except Exception as e:
+            if self.servidor is not None and isinstance(e, (pymysql.err.OperationalError, pymysql.err.InterfaceError)):
+                # La réplica no responde: se marca y se repite en la primaria.
+                marcar_replica_caida(self.servidor)
+                self.servidor = None
+                return await self._ejecutar(query, data, leer)
+            logger.error("Error en la consulta: %s -- %s", e, " ".join(query.split()))
+            raise
+        registrar_consulta(query, segundos, filas)
+        return resultado
+
+    async def _en_bucle(self, query, data, leer):
+        futuro = asyncio.run_coroutine_threadsafe(
+            _consultar(self.db, self.servidor, query, data, leer), _obtener_bucle()
+        )
+        return await asyncio.wrap_future(futuro)
+
+
+def connectToMySQLAsync(db, lectura=True):
+    return MySQLConnectionAsync(db, lectura)
+
+
+def cerrar_pools_async(espera=5):
+    # Apagado ordenado: cierra los pools dentro de su bucle y detiene el hilo.
+    global _bucle, _hilo
+    with _candado:
+        bucle, hilo = _bucle, _hilo
+        _bucle = _hilo = None
+    if bucle is None:
+        return
+
+    async def cerrar():
+        for tarea in list(_pools.values()):
+            if tarea.done() and not tarea.exception():
+                tarea.result().close()
+                await tarea.result().wait_closed()
+        _pools.clear()
+
+    try:
+        asyncio.run_coroutine_threadsafe(cerrar(), bucle).result(espera)
+    except Exception:
+        logger.exception("No se pudieron cerrar los pools async")
+    bucle.call_soon_threadsafe(bucle.stop)
+    hilo.join(espera)
+
+
+def reiniciar_pools_async_tras_fork():
+    # El hilo del bucle no existe en el proceso hijo: se olvida y se crea otro al primer uso.
+    global _bucle, _hilo, _candado
+    _bucle = _hilo = None
+    _pools.clear()
+    _candado = threading.Lock()
@@ -0,0 +1,128 @@
+import gzip, hashlib, json, os, re, threading
+from flask_app.config.instrumentacion import logger
+
+try:
+    import brotli
+except ImportError:     # sin el paquete Brotli solo se generan las versiones .gz
+    brotli = None
+
+# ----------------------------------------------------------------------
+# Hojas de estilo empaquetadas
+# En vez de pedir base.css + la hoja de cada página por separado, cada
+# página carga un solo archivo que junta las dos, minificado y con un
+# resumen (hash) del contenido en el nombre: inicio.3f2a9c1b4d.css.
+# Como el nombre cambia cuando cambia el contenido, el navegador puede
+# guardarlo "para siempre" (Cache-Control immutable). También se guardan
+# ya comprimidas las versiones .gz y .br para no comprimir en cada petición.
+# manifest.json dice qué archivo corresponde a cada paquete; las plantillas
+# lo piden con asset_url('inicio').
+# Se construye con `flask --app app construir-recursos` o al arrancar si falta.
+# ----------------------------------------------------------------------
+
+CARPETA_STATIC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+CARPETA_DIST = os.path.join(CARPETA_STATIC, "dist")
+RUTA_MANIFIESTO = os.path.join(CARPETA_DIST, "manifest.json")
+
+# Paquete -> hojas de static/ que lo forman, en orden.
+PAQUETES = {
+    "base": ["base.css"],
+    "inicio": ["base.css", "inicio.css"],
+    "ver": ["base.css", "ver.css"],
+    "crear": ["base.css", "crear.css"],
+    "editar": ["base.css", "editar.css"],
+    "entrar": ["base.css", "entrar.css"],
+}
+
+# Un año: el contenido de un nombre con hash no cambia nunca.
+CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+
+_manifiesto = None
+_candado = threading.Lock()
+
+
+def minificar_css(texto):
+    # Minificación sencilla y segura para estas hojas: quita comentarios,
+    # saltos de línea y espacios que no cambian el significado.
+    texto = re.sub(r"/\*.*?\*/", "", texto, flags=re.S)
+    texto = re.sub(r"\s+", " ", texto)
+    texto = re.sub(r"\s*([{};,>])\s*", r"\1", texto)
+    texto = re.sub(r":\s+", ":", texto)
+    texto = texto.replace(";}", "}")
+    return texto.strip()
+
+
+def _escribir(ruta, contenido):
+    # Se escribe en un temporal y se renombra: otro proceso nunca ve un archivo a medias.
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "wb") as archivo:
+        archivo.write(contenido)
+    os.replace(temporal, ruta)
+
+
+def construir(salida=None):
+    # Junta, minifica y escribe cada paquete con su hash y sus versiones
+    # comprimidas; al final escribe el manifiesto. Devuelve el manifiesto.
+    global _manifiesto
+    os.makedirs(CARPETA_DIST, exist_ok=True)
+    manifiesto = {}
+    for nombre, hojas in PAQUETES.items():
+        partes = []
+        for hoja in hojas:
+            with open(os.path.join(CARPETA_STATIC, hoja), encoding="utf-8") as archivo:
+                partes.append(minificar_css(archivo.read()))
+        contenido = "\n".join(partes).encode("utf-8")
+        resumen = hashlib.sha256(contenido).hexdigest()[:10]
+        archivo_final = f"{nombre}.{resumen}.css"
+        ruta = os.path.join(CARPETA_DIST, archivo_final)
+        _escribir(ruta, contenido)
+        _escribir(ruta + ".gz", gzip.compress(contenido, compresslevel=9, mtime=0))
+        if brotli is not None:
+            _escribir(ruta + ".br", brotli.compress(contenido, quality=11))
+        manifiesto[nombre] = archivo_final
+        if salida:
+            salida(f"{nombre}: {archivo_final} ({len(contenido)} bytes)")
+
+    # Se borran los paquetes de construcciones anteriores.
+    vigentes = set(manifiesto.values())
+    for archivo in os.listdir(CARPETA_DIST):
+        base = archivo.removesuffix(".gz").removesuffix(".br")
+        if base.endswith(".css") and base not in vigentes:
+            os.remove(os.path.join(CARPETA_DIST, archivo))
+
+    _escribir(RUTA_MANIFIESTO, json.dumps(manifiesto, indent=2).encode("utf-8"))
+    _manifiesto = manifiesto
+    return manifiesto
+
+
+def _desactualizado():
+    # True si no hay manifiesto o alguna hoja de static/ es más nueva que él.
+    if not os.path.exists(RUTA_MANIFIESTO):
+        return True
+    construido = os.path.getmtime(RUTA_MANIFIESTO)
+    hojas = {hoja for lista in PAQUETES.values() for hoja in lista}
+    return any(os.path.getmtime(os.path.join(CARPETA_STATIC, hoja)) > construido for hoja in hojas)
+
+
+def cargar(revisar=False):
+    # Devuelve el manifiesto (leído una sola vez). Con revisar=True (modo
+    # debug) se vuelve a construir si se editó alguna hoja.
+    global _manifiesto
+    if _manifiesto is None or revisar:
+        with _candado:
+            if _desactualizado():
+                logger.info("Construyendo hojas de estilo empaquetadas")
+                construir()
+            elif _manifiesto is None:
+                with open(RUTA_MANIFIESTO, encoding="utf-8") as archivo:
+                    _manifiesto = json.load(archivo)
+    return _manifiesto
+
+
+def archivo_comprimido(archivo, aceptadas):
+    # Elige la mejor versión ya comprimida que acepta el navegador
+    # (aceptadas es request.accept_encodings: da la calidad de cada una, 0 si no).
+    # Devuelve (nombre del archivo en dist/, Content-Encoding o None).
+    for extension, codificacion in ((".br", "br"), (".gz", "gzip")):
+        if aceptadas[codificacion] and os.path.exists(os.path.join(CARPETA_DIST, archivo + extension)):
+            return archivo + extension, codificacion
+    return archivo, None
@@ -0,0 +1,152 @@
+import os, secrets, time
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+from flask_app.config.cache import CacheMemoria, CacheSQLite
+
+# ----------------------------------------------------------------------
+# Sesiones guardadas en el servidor
+# La cookie solo lleva un identificador aleatorio; los datos de la sesión
+# (usuario_id, mensajes flash) quedan en un almacén del servidor. Así la
+# cookie es pequeña y una sesión se puede cerrar desde el servidor
+# (revocar_sesiones), cosa imposible con la cookie firmada de Flask.
+# Se elige con SESION_BACKEND=memoria|sqlite:
+#   - memoria: diccionario LRU dentro del proceso (un solo worker). Es el
+#     valor por defecto con `flask run`.
+#   - sqlite: archivo local compartido por todos los workers de la máquina.
+#     Es el valor por defecto con gunicorn.conf.py (que no acepta memoria con
+#     más de un worker). `flask --app app revocar-sesiones` debe correrse desde
+#     la misma carpeta (o con el mismo SESION_RUTA) para ver el mismo archivo.
+# ----------------------------------------------------------------------
+
+SESION_BACKEND = os.environ.get("SESION_BACKEND", "memoria")
+# Segundos sin actividad tras los que la sesión vence (por defecto 7 días).
+SESION_TTL = int(os.environ.get("SESION_TTL", 7 * 24 * 3600))
+# Máximo de sesiones en memoria; al llenarse se descartan las menos usadas.
+SESION_MAX = int(os.environ.get("SESION_MAX", 10000))
+
+
+def _clave(sid):
+    return f"sesion:{sid}"
+
+
+def _clave_usuario(usuario_id):
+    return f"sesiones_usuario:{usuario_id}"
+
+
+class SesionServidor(CallbackDict, SessionMixin):
+    def __init__(self, datos=None, sid=None, renovada=0):
+        def al_cambiar(sesion):
+            sesion.modified = True
+        CallbackDict.__init__(self, datos, al_cambiar)
+        self.sid = sid
+        self.renovada = renovada   # cuándo se guardó por última vez en el almacén
+        self.new = sid is None
+        self.modified = False
+        self.accessed = False      # si la petición leyó la sesión (ver save_session)
+        self.cambiar_id = False
+
+    def __getitem__(self, clave):
+        self.accessed = True
+        return super().__getitem__(clave)
+
+    def get(self, clave, por_defecto=None):
+        self.accessed = True
+        return super().get(clave, por_defecto)
+
+    # `'usuario_id' in session` también es leer la sesión (usuarios.py lo usa
+    # para decidir si redirigir): la respuesta depende de la cookie igual.
+    def __contains__(self, clave):
+        self.accessed = True
+        return super().__contains__(clave)
+
+    def __iter__(self):
+        self.accessed = True
+        return super().__iter__()
+
+    def __len__(self):
+        self.accessed = True
+        return super().__len__()
+
+    def regenerar(self):
+        # Pide un identificador nuevo al guardar (después del login, para que
+        # un identificador conocido antes de iniciar sesión no sirva después).
+        self.cambiar_id = True
+        self.modified = True
+
+
+class InterfazSesionServidor(SessionInterface):
+    def __init__(self, almacen, ttl=SESION_TTL):
+        self.almacen = almacen
+        self.ttl = ttl
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            guardado = self.almacen.obtener(_clave(sid))
+            if guardado is not None:
+                return SesionServidor(guardado["datos"], sid, guardado["renovada"])
+        return SesionServidor()
+
+    def save_session(self, app, session, response):
+        nombre = self.get_cookie_name(app)
+        dominio = self.get_cookie_domain(app)
+        ruta = self.get_cookie_path(app)
+        # Solo si la respuesta depende de la sesión: así los archivos estáticos
+        # (/recursos) se pueden guardar en cachés compartidas.
+        if session.accessed or session.modified:
+            response.vary.add("Cookie")
+
+        # Sesión vacía (por ejemplo, después de /salir): se borra del almacén y la cookie.
+        if not session:
+            if session.modified and session.sid:
+                self.almacen.borrar(_clave(session.sid))
+                response.delete_cookie(nombre, domain=dominio, path=ruta)
+            return
+
+        sid_nuevo = session.sid is None or session.cambiar_id
+        if sid_nuevo:
+            if session.sid:
+                self.almacen.borrar(_clave(session.sid))
+            session.sid = secrets.token_urlsafe(32)
+
+        # Si no cambió nada, solo se vuelve a guardar de vez en cuando para
+        # extender el vencimiento (no en cada petición).
+        renovar = time.time() - session.renovada > self.ttl / 4
+        if session.modified or sid_nuevo or renovar:
+            session.renovada = time.time()
+            self.almacen.guardar(_clave(session.sid), {"datos": dict(session), "renovada": session.renovada}, self.ttl)
+            if sid_nuevo and "usuario_id" in session:
+                self._recordar_sid(session["usuario_id"], session.sid)
+
+        if sid_nuevo or renovar:
+            response.set_cookie(
+                nombre, session.sid,
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=dominio, path=ruta,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
+
+    def _recordar_sid(self, usuario_id, sid):
+        # Lista de sesiones de cada usuario, para poder cerrarlas todas.
+        sids = self.almacen.obtener(_clave_usuario(usuario_id)) or []
+        sids = [s for s in sids if self.almacen.obtener(_clave(s)) is not None] + [sid]
+        self.almacen.guardar(_clave_usuario(usuario_id), sids, self.ttl)
+
+    def revocar_sesiones(self, usuario_id):
+        # Cierra todas las sesiones abiertas de un usuario; devuelve cuántas había.
+        cerradas = 0
+        for sid in self.almacen.obtener(_clave_usuario(usuario_id)) or []:
+            if self.almacen.obtener(_clave(sid)) is not None:
+                self.almacen.borrar(_clave(sid))
+                cerradas += 1
+        self.almacen.borrar(_clave_usuario(usuario_id))
+        return cerradas
+
+
+def crear_interfaz_sesiones():
+    if SESION_BACKEND == "sqlite":
+        ruta = os.environ.get("SESION_RUTA", os.path.join(os.getcwd(), "sesiones_app.sqlite3"))
+        return InterfazSesionServidor(CacheSQLite(ruta, max_entradas=SESION_MAX))
+    return InterfazSesionServidor(CacheMemoria(max_entradas=SESION_MAX))
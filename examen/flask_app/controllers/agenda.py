@@ -0,0 +1,77 @@
+from datetime import datetime
+from flask import Blueprint, render_template, request, abort, jsonify
+from flask_app.models.asesoria import Asesoria, TAMANO_PAGINA, TAMANO_MAXIMO, HORAS_MAX_TUTOR_DIA
+from flask_app.models.usuario import Usuario
+from flask_app.config.autenticacion import login_required
+
+# ----------------------------------------------------------------------
+# Agendas: próximas asesorías de un tutor o de quien las pidió, y la carga
+# semanal de cada tutor. Los listados filtran en MySQL por los índices
+# `tutor_fecha` / `usuario_id` y se paginan igual que /inicio.
+# ----------------------------------------------------------------------
+
+bp = Blueprint('agenda', __name__)
+
+
+def _tamano():
+    return max(1, min(request.args.get('tamano', TAMANO_PAGINA, type=int), TAMANO_MAXIMO))
+
+
+def _pagina(**filtro):
+    return Asesoria.obtener_pagina_futuras_en_cache(
+        despues=request.args.get('despues'), antes=request.args.get('antes'), tamano=_tamano(), **filtro
+    )
+
+
+@bp.route('/agenda/tutor/<int:id>')
+@login_required
+def agenda_tutor(id):
+    persona = Usuario.identidad(id)
+    if persona is None:
+        abort(404)
+    cargas = [c for c in Asesoria.carga_tutores() if c.tutor_id == id]
+    pagina = _pagina(tutor_id=id)
+    return render_template('agenda.html', titulo=f"Agenda de {persona.nombre} como tutor",
+                           asesorias=pagina.asesorias, pagina=pagina, cargas=cargas, tamano=_tamano())
+
+
+@bp.route('/agenda/creador/<int:id>')
+@login_required
+def agenda_creador(id):
+    persona = Usuario.identidad(id)
+    if persona is None:
+        abort(404)
+    pagina = _pagina(usuario_id=id)
+    return render_template('agenda.html', titulo=f"Asesorías solicitadas por {persona.nombre}",
+                           asesorias=pagina.asesorias, pagina=pagina, cargas=None, tamano=_tamano())
+
+
+@bp.route('/tutores/carga')
+@login_required
+def carga_tutores():
+    # Tabla con asesorías y horas por tutor y por semana (calculada con GROUP BY y en caché).
+    nombres = dict(Usuario.directorio_tutores())
+    return render_template('carga_tutores.html', cargas=Asesoria.carga_tutores(), nombres=nombres)
+
+
+@bp.route('/tutores/libres')
+@login_required
+def tutores_libres():
+    # Tutores con lugar en una fecha: ?fecha=YYYY-MM-DD&duracion=N&excluir=<id de la asesoría que se edita>
+    # Lo usa el selector de tutor de crear.html/editar.html al cambiar la fecha o la duración.
+    fecha = request.args.get('fecha', '')
+    try:
+        datetime.strptime(fecha, '%Y-%m-%d')
+    except ValueError:
+        abort(400)
+    duracion = max(1, request.args.get('duracion', 1, type=int))
+    ocupacion = Asesoria.ocupacion_tutores(fecha, excluir_id=request.args.get('excluir', 0, type=int))
+    sin_lugar = Asesoria.tutores_sin_lugar(ocupacion, duracion)
+    return jsonify({
+        "fecha": fecha,
+        "duracion": duracion,
+        "horas_max": HORAS_MAX_TUTOR_DIA,
+        "libres": [{"id": id, "nombre": nombre, "horas_ocupadas": ocupacion.get(id, 0)}
+                   for id, nombre in Usuario.directorio_tutores() if id not in sin_lugar],
+        "sin_lugar": sorted(sin_lugar),
+    })
@@ -1,31 +1,86 @@
-from flask import render_template, redirect, request, session, flash
-from flask_app import app
-from flask_app.models.asesoria import Asesoria
+import asyncio, hashlib, time
+from datetime import datetime
+from flask import Blueprint, render_template, redirect, request, session, flash, make_response, g, abort
+from markupsafe import Markup
+from flask_app.models.asesoria import Asesoria, TutorOcupado, TAMANO_PAGINA, TAMANO_MAXIMO, TTL_LISTADO
+from flask_app.config.cache import cache
 from flask_app.models.usuario import Usuario
+from flask_app.config.mysqlconnection import transaccion, ConflictoBloqueo
+from flask_app.config.autenticacion import login_required
 
-@app.route('/inicio')
-def inicio():
-    if 'usuario_id' not in session:
-        return redirect('/entrar')
-    
-    # Obtener asesorías futuras
-    asesorias = Asesoria.obtener_todas_futuras()
-    return render_template('inicio.html', asesorias=asesorias)
+bp = Blueprint('asesorias', __name__)
+
+# Si MySQL abortó la escritura por un choque de bloqueos con otra reserva (deadlock),
+# no se guardó nada y basta con volver a enviar el formulario.
+MENSAJE_CONFLICTO = "Otra persona estaba reservando al mismo tutor en ese momento. Intenta de nuevo."
 
-@app.route('/nueva')
+@bp.route('/inicio')
+@login_required
+def inicio():
+    # Página pedida (?despues=<cursor> o ?antes=<cursor>)
+    despues = request.args.get('despues')
+    antes = request.args.get('antes')
+    tamano = max(1, min(request.args.get('tamano', TAMANO_PAGINA, type=int), TAMANO_MAXIMO))
+
+    # El ETag depende solo de la versión de los datos, el día, la página y quién mira.
+    # Si el navegador ya tiene esta versión, respondemos 304 sin tocar la base de datos.
+    # El tramo de tiempo (TTL_LISTADO) acota cuánto puede durar una versión vieja
+    # cuando cada worker tiene su propia caché en memoria.
+    clave = Asesoria.clave_listado(despues, antes, tamano)
+    tramo = int(time.time() // TTL_LISTADO)
+    etag = hashlib.sha1(
+        f"{clave}|{tramo}|{g.usuario.id}|{g.usuario.nombre}".encode()
+    ).hexdigest()
+    if etag in request.if_none_match:
+        respuesta = make_response('', 304)
+    else:
+        # El HTML del listado también se guarda en caché por usuario (los botones
+        # Editar/Borrar dependen de quién lo ve).
+        clave_fragmento = f"fragmento_inicio:{etag}"
+        fragmento = cache.obtener(clave_fragmento)
+        if fragmento is None:
+            pagina = Asesoria.obtener_pagina_futuras_en_cache(despues=despues, antes=antes, tamano=tamano)
+            fragmento = render_template('_lista_asesorias.html', asesorias=pagina.asesorias, pagina=pagina,
+                                        tamano=tamano)
+            cache.guardar(clave_fragmento, fragmento, TTL_LISTADO)
+        respuesta = make_response(render_template('inicio.html', lista_asesorias=Markup(fragmento)))
+
+    respuesta.set_etag(etag)
+    # "private, no-cache": el navegador puede guardarla pero debe preguntar (If-None-Match).
+    respuesta.headers['Cache-Control'] = 'private, no-cache'
+    return respuesta
+
+@bp.route('/buscar')
+@login_required
+def buscar():
+    # Búsqueda por tema, notas y nombres: ?q=texto&desde=YYYY-MM-DD&hasta=YYYY-MM-DD&pagina=N
+    texto = request.args.get('q', '').strip()
+    fechas = {}
+    for campo in ('desde', 'hasta'):
+        valor = request.args.get(campo, '')
+        if valor:
+            try:
+                datetime.strptime(valor, '%Y-%m-%d')
+            except ValueError:
+                abort(400)
+            fechas[campo] = valor
+    tamano = max(1, min(request.args.get('tamano', TAMANO_PAGINA, type=int), TAMANO_MAXIMO))
+    resultado = Asesoria.buscar(texto, pagina=request.args.get('pagina', 1, type=int), tamano=tamano, **fechas)
+    return render_template('buscar.html', texto=texto, fechas=fechas, resultado=resultado,
+                           asesorias=resultado.asesorias, tamano=tamano)
+
+@bp.route('/nueva')
+@login_required
 def vista_crear():
-    if 'usuario_id' not in session:
-        return redirect('/entrar')
     # BONUS: Enviar lista de usuarios para el selector de tutor
-    Usuario.sembrar_tutores_si_faltan(session['usuario_id'], 3)
     tutores = Usuario.obtener_tutores_excepto({'id': session['usuario_id']})
-    return render_template('crear.html', usuarios=tutores)
+    # Carga de cada tutor (asesorías y horas de las próximas semanas) para el selector.
+    carga = Asesoria.resumen_carga(Asesoria.carga_tutores())
+    return render_template('crear.html', usuarios=tutores, carga=carga)
 
-@app.route('/crear_asesoria', methods=['POST'])
+@bp.route('/crear_asesoria', methods=['POST'])
+@login_required
 def crear_asesoria():
-    if 'usuario_id' not in session:
-        return redirect('/entrar')
-
     if not Asesoria.validar_asesoria(request.form):
         return redirect('/nueva')
 
@@ -46,93 +101,126 @@ def crear_asesoria():
         "usuario_id": session['usuario_id'],
         "tutor_id": tutor_id
     }
-    Asesoria.guardar(data)
+    try:
+        Asesoria.guardar(data)
+    except TutorOcupado as e:
+        # El tutor ya no tiene horas libres ese día: no se guardó nada.
+        flash(e.mensaje(), "asesoria")
+        return redirect('/nueva')
+    except ConflictoBloqueo:
+        flash(MENSAJE_CONFLICTO, "asesoria")
+        return redirect('/nueva')
     return redirect('/inicio')
 
-@app.route('/editar/<int:id>')
-def vista_editar(id):
-    if 'usuario_id' not in session:
-        return redirect('/entrar')
-    
-    data = {"id": id}
-    asesoria = Asesoria.obtener_una(data)
+@bp.route('/editar/<int:id>')
+@login_required
+async def vista_editar(id):
+    # La asesoría, el directorio de tutores, su carga y la ocupación de cada tutor
+    # el día de la asesoría se piden a la vez (vista async).
+    asesoria, directorio, cargas, ocupacion = await asyncio.gather(
+        Asesoria.obtener_una_async({"id": id}),
+        Usuario.directorio_tutores_async(),
+        Asesoria.carga_tutores_async(),
+        Asesoria.ocupacion_tutores_de_asesoria_async(id),
+    )
     
-    # Validar que sea el creador
-    if session['usuario_id'] != asesoria.usuario_id:
+    # Validar que exista y que sea el creador
+    if not asesoria or session['usuario_id'] != asesoria.usuario_id:
         return redirect('/inicio')
 
-    Usuario.sembrar_tutores_si_faltan(asesoria.usuario_id, 3)
-    tutores = Usuario.obtener_tutores_excepto({'id': asesoria.usuario_id})
-    return render_template('editar.html', asesoria=asesoria, usuarios=tutores)
+    tutores = Usuario.tutores_excepto(directorio, asesoria.usuario_id)
+    return render_template('editar.html', asesoria=asesoria, usuarios=tutores, carga=Asesoria.resumen_carga(cargas),
+                           sin_lugar=Asesoria.tutores_sin_lugar(ocupacion, asesoria.duracion))
 
-@app.route('/actualizar_asesoria', methods=['POST'])
+@bp.route('/actualizar_asesoria', methods=['POST'])
+@login_required
 def actualizar_asesoria():
-    if 'usuario_id' not in session:
-        return redirect('/entrar')
-
     if not Asesoria.validar_asesoria(request.form):
         return redirect(f"/editar/{request.form['id']}")
 
-    original = Asesoria.obtener_una({"id": request.form['id']})
-    tutor_raw = request.form.get('tutor_id', '')
-    if tutor_raw == "":
-        flash("Debe elegir un tutor.", "asesoria")
+    # La lectura y la escritura van en la misma conexión y en una sola transacción.
+    try:
+        with transaccion(Asesoria.db):
+            original = Asesoria.obtener_una({"id": request.form['id']})
+            if not original:
+                return redirect('/inicio')
+            tutor_raw = request.form.get('tutor_id', '')
+            if tutor_raw == "":
+                flash("Debe elegir un tutor.", "asesoria")
+                return redirect(f"/editar/{request.form['id']}")
+            tutor_id = int(tutor_raw)
+            if tutor_id == original.usuario_id:
+                flash("El tutor no puede ser el creador.", "asesoria")
+                return redirect(f"/editar/{request.form['id']}")
+
+            data = {
+                "id": int(request.form['id']),
+                "tema": request.form['tema'],
+                "fecha": request.form['fecha'],
+                "duracion": int(request.form['duracion']),
+                "notas": request.form['notas'],
+                "tutor_id": tutor_id
+            }
+            Asesoria.actualizar(data)
+    except TutorOcupado as e:
+        # Se hizo ROLLBACK: la asesoría queda como estaba.
+        flash(e.mensaje(), "asesoria")
         return redirect(f"/editar/{request.form['id']}")
-    tutor_id = int(tutor_raw)
-    if tutor_id == original.usuario_id:
-        flash("El tutor no puede ser el creador.", "asesoria")
+    except ConflictoBloqueo:
+        flash(MENSAJE_CONFLICTO, "asesoria")
         return redirect(f"/editar/{request.form['id']}")
-
-    data = {
-        "id": int(request.form['id']),
-        "tema": request.form['tema'],
-        "fecha": request.form['fecha'],
-        "duracion": int(request.form['duracion']),
-        "notas": request.form['notas'],
-        "tutor_id": tutor_id
-    }
-    Asesoria.actualizar(data)
     return redirect('/inicio')
 
-@app.route('/ver/<int:id>')
-def ver_asesoria(id):
-    if 'usuario_id' not in session:
-        return redirect('/entrar')
-    
-    data = {"id": id}
-    asesoria = Asesoria.obtener_una(data)
-    Usuario.sembrar_tutores_si_faltan(asesoria.usuario_id, 3)
-    tutores = Usuario.obtener_tutores_excepto({'id': asesoria.usuario_id})
-    return render_template('ver.html', asesoria=asesoria, usuarios=tutores)
+@bp.route('/ver/<int:id>')
+@login_required
+async def ver_asesoria(id):
+    # Las consultas no dependen una de la otra: se hacen al mismo tiempo.
+    asesoria, directorio, cargas, ocupacion = await asyncio.gather(
+        Asesoria.obtener_una_async({"id": id}),
+        Usuario.directorio_tutores_async(),
+        Asesoria.carga_tutores_async(),
+        Asesoria.ocupacion_tutores_de_asesoria_async(id),
+    )
+    if not asesoria:
+        return redirect('/inicio')
+    tutores = Usuario.tutores_excepto(directorio, asesoria.usuario_id)
+    return render_template('ver.html', asesoria=asesoria, usuarios=tutores, carga=Asesoria.resumen_carga(cargas),
+                           sin_lugar=Asesoria.tutores_sin_lugar(ocupacion, asesoria.duracion))
 
 # BONUS: Ruta para cambiar tutor desde ver.html
-@app.route('/cambiar_tutor', methods=['POST'])
+@bp.route('/cambiar_tutor', methods=['POST'])
+@login_required
 def cambiar_tutor():
-    if 'usuario_id' not in session:
-        return redirect('/entrar')
-
-    original = Asesoria.obtener_una({"id": request.form['id']})
-    tutor_raw = request.form.get('tutor_id', '')
-    if tutor_raw == "":
-        flash("Debe elegir un tutor.", "asesoria")
-        return redirect(f"/ver/{request.form['id']}")
-    tutor_id = int(tutor_raw)
-    if tutor_id == original.usuario_id:
-        flash("El tutor no puede ser el creador.", "asesoria")
-        return redirect(f"/ver/{request.form['id']}")
-
-    Asesoria.actualizar_tutor({"id": int(request.form['id']), "tutor_id": tutor_id})
+    try:
+        with transaccion(Asesoria.db):
+            original = Asesoria.obtener_una({"id": request.form['id']})
+            if not original:
+                return redirect('/inicio')
+            tutor_raw = request.form.get('tutor_id', '')
+            if tutor_raw == "":
+                flash("Debe elegir un tutor.", "asesoria")
+                return redirect(f"/ver/{request.form['id']}")
+            tutor_id = int(tutor_raw)
+            if tutor_id == original.usuario_id:
+                flash("El tutor no puede ser el creador.", "asesoria")
+                return redirect(f"/ver/{request.form['id']}")
+
+            # La fecha y la duración vienen de la base (no del formulario) para revisar el lugar del tutor.
+            Asesoria.actualizar_tutor({"id": original.id, "tutor_id": tutor_id,
+                                       "fecha": original.fecha, "duracion": original.duracion})
+    except TutorOcupado as e:
+        flash(e.mensaje(), "asesoria")
+    except ConflictoBloqueo:
+        flash(MENSAJE_CONFLICTO, "asesoria")
     return redirect(f"/ver/{request.form['id']}")
 
-@app.route('/borrar/<int:id>')
+@bp.route('/borrar/<int:id>')
+@login_required
 def borrar_asesoria(id):
-    if 'usuario_id' not in session:
-        return redirect('/entrar')
-    
     data = {"id": id}
     # Primero verificar que es el dueño (seguridad extra)
     asesoria = Asesoria.obtener_una(data)
-    if session['usuario_id'] == asesoria.usuario_id:
+    if asesoria and session['usuario_id'] == asesoria.usuario_id:
         Asesoria.borrar(data)
         
     return redirect('/inicio')
\ No newline at end of file
@@ -0,0 +1,53 @@
+import hmac, os
+from flask import Blueprint, Response, jsonify, abort, current_app, request
+from flask_app.config.mysqlconnection import estadisticas_pools, estado_replicas
+from flask_app.config import instrumentacion
+
+bp = Blueprint('estado', __name__)
+
+
+def revisar_monitoreo():
+    # Las rutas de monitoreo muestran datos internos del servidor: solo responden
+    # en modo debug, con MONITOREO=1 o, si se define MONITOREO_TOKEN, a quien
+    # mande "Authorization: Bearer <token>" (Prometheus lo hace con bearer_token).
+    token = os.environ.get("MONITOREO_TOKEN")
+    if token:
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+            abort(403)
+    elif not (current_app.debug or os.environ.get("MONITOREO") == "1"):
+        abort(404)
+
+
+@bp.route('/estado/pool')
+def estado_pool():
+    # Muestra cuántas conexiones hay abiertas, libres, prestadas, cuántas esperas
+    # y creaciones ha tenido el pool (sirve para ajustar MYSQL_POOL_MIN/MAX con carga real).
+    # Si hay réplicas configuradas también se indica cuáles están sanas.
+    revisar_monitoreo()
+    return jsonify({"pools": estadisticas_pools(), "replicas": estado_replicas()})
+
+
+@bp.route('/estado/arranque')
+def estado_arranque():
+    # Cuánto tardó create_app en este proceso y en qué pasos (sesiones,
+    # controladores, hojas de estilo, plantillas...).
+    revisar_monitoreo()
+    return jsonify(current_app.extensions["perfil_arranque"])
+
+
+@bp.route('/metrics')
+def metricas():
+    # Latencia por ruta, peticiones en curso, errores, rechazos y pools en el
+    # formato de texto de Prometheus. Son los números de este proceso (worker).
+    revisar_monitoreo()
+    texto = current_app.extensions["metricas"].exposicion(estadisticas_pools().values())
+    return Response(texto, content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@bp.route('/debug/consultas')
+def debug_consultas():
+    # Consultas por petición de las últimas peticiones (solo en modo debug
+    # o con DEBUG_CONSULTAS=1, porque muestra el SQL).
+    if not (current_app.debug or os.environ.get("DEBUG_CONSULTAS") == "1"):
+        abort(404)
+    return jsonify(instrumentacion.historial())
@@ -0,0 +1,51 @@
+import os
+from flask import Blueprint, Response, request, stream_with_context, abort, g
+from datetime import datetime
+from flask_app.models.asesoria import Asesoria, COLUMNAS_EXPORTACION
+from flask_app.config.exportacion import FORMATOS
+from flask_app.config.autenticacion import login_required, ids_admin
+
+bp = Blueprint('exportar', __name__)
+
+
+def leer_filtros(args):
+    # Filtros de la exportación desde la URL: ?desde=YYYY-MM-DD&hasta=YYYY-MM-DD&tutor_id=N
+    filtros = {}
+    for campo in ("desde", "hasta"):
+        valor = args.get(campo, "")
+        if valor:
+            try:
+                datetime.strptime(valor, "%Y-%m-%d")
+            except ValueError:
+                return None
+            filtros[campo] = valor
+    if args.get("tutor_id"):
+        try:
+            filtros["tutor_id"] = int(args["tutor_id"])
+        except ValueError:
+            return None
+    return filtros
+
+
+@bp.route('/exportar/asesorias.<formato>')
+@login_required
+def exportar_asesorias(formato):
+    # Descarga de todas las asesorías (pasadas incluidas, con notas y nombres).
+    # Igual que la importación: apagada salvo EXPORTACION_WEB=1, y solo para los
+    # usuarios de EXPORTACION_ADMINS="1,7". Lo normal es `flask exportar-asesorias`.
+    if os.environ.get("EXPORTACION_WEB") != "1" or formato not in FORMATOS:
+        abort(404)
+    if g.usuario.id not in ids_admin("EXPORTACION_ADMINS"):
+        abort(403)
+    filtros = leer_filtros(request.args)
+    if filtros is None:
+        abort(400)
+
+    generar, tipo = FORMATOS[formato]
+    filas = Asesoria.exportar(**filtros)
+    # La respuesta se va enviando mientras se leen las filas (no se arma entera en memoria).
+    return Response(
+        stream_with_context(generar(filas, COLUMNAS_EXPORTACION)),
+        content_type=tipo,
+        headers={"Content-Disposition": f"attachment; filename=asesorias.{formato}"},
+    )
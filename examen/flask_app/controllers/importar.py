@@ -0,0 +1,34 @@
+import os
+from flask import Blueprint, jsonify, request, abort, g
+from flask_app.models.usuario import Usuario
+from flask_app.models.asesoria import Asesoria
+from flask_app.config.importacion import leer_csv
+from flask_app.config.autenticacion import login_required, ids_admin
+
+bp = Blueprint('importar', __name__)
+
+# Qué modelo importa cada tipo de archivo.
+IMPORTADORES = {
+    "usuarios": Usuario.importar,
+    "asesorias": Asesoria.importar,
+}
+
+
+@bp.route('/importar/<tipo>', methods=['POST'])
+@login_required
+def importar(tipo):
+    # Importación masiva por formulario (campo "archivo" con un CSV).
+    # Está apagada salvo que se active con IMPORTACION_WEB=1, y aun así solo la
+    # pueden usar los usuarios de IMPORTACION_ADMINS; lo normal es usar
+    # `flask importar-usuarios` / `flask importar-asesorias`.
+    if os.environ.get("IMPORTACION_WEB") != "1" or tipo not in IMPORTADORES:
+        abort(404)
+    # Importar crea cuentas y asesorías a nombre de otras personas: no basta
+    # con haber iniciado sesión (IMPORTACION_ADMINS="1,7"; sin la lista, nadie).
+    if g.usuario.id not in ids_admin("IMPORTACION_ADMINS"):
+        abort(403)
+    archivo = request.files.get('archivo')
+    if archivo is None:
+        abort(400)
+    resultado = IMPORTADORES[tipo](leer_csv(archivo.stream))
+    return jsonify(resultado.como_dict())
@@ -0,0 +1,32 @@
+from flask import Blueprint, send_from_directory, request, abort, url_for, current_app
+from flask_app.config import recursos
+
+# ----------------------------------------------------------------------
+# Hojas de estilo empaquetadas (ver config/recursos.py)
+# /recursos/<archivo> sirve los archivos de static/dist con caché de un año
+# y, si el navegador lo acepta, la versión ya comprimida (.br o .gz).
+# ----------------------------------------------------------------------
+
+bp = Blueprint('recursos', __name__)
+
+
+@bp.app_template_global()
+def asset_url(paquete):
+    # En las plantillas: {{ asset_url('inicio') }} -> /recursos/inicio.3f2a9c1b4d.css
+    manifiesto = recursos.cargar(revisar=current_app.debug)
+    return url_for('recursos.recurso', archivo=manifiesto[paquete])
+
+
+@bp.route('/recursos/<archivo>')
+def recurso(archivo):
+    if archivo not in recursos.cargar().values():
+        abort(404)
+    nombre, codificacion = recursos.archivo_comprimido(archivo, request.accept_encodings)
+    respuesta = send_from_directory(recursos.CARPETA_DIST, nombre, mimetype="text/css", conditional=True)
+    # El navegador debe ver el archivo .css, no el .gz/.br que está en disco.
+    respuesta.headers.pop("Content-Disposition", None)
+    if codificacion:
+        respuesta.headers["Content-Encoding"] = codificacion
+    respuesta.vary.add("Accept-Encoding")
+    respuesta.headers["Cache-Control"] = recursos.CACHE_INMUTABLE
+    return respuesta
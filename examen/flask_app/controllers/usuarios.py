@@ -6,16 +6,24 @@ from flask import render_template, redirect, request, session, flash
 # - session: para guardar datos del usuario mientras navega
 # - flash: para mostrar mensajes cortos (errores, avisos)
 
-from flask_app import app   # Importamos la app principal de Flask
+from flask import Blueprint
+bp = Blueprint('usuarios', __name__)
+# Un Blueprint agrupa las rutas de este archivo. La app lo registra en
+# create_app (flask_app/__init__.py); así las rutas no dependen de una app global.
 
 from flask_app.models.usuario import Usuario  
 # Importamos el modelo Usuario, para poder trabajar con la base de datos.
 
-from werkzeug.security import generate_password_hash, check_password_hash
-# Estas funciones sirven para encriptar contraseñas y compararlas de forma segura.
+from flask_app.config.mysqlconnection import RegistroDuplicado
+# Error que lanza la base de datos cuando el email ya está registrado.
 
+from flask_app.config.hashing import servicio_hash, ServicioOcupado
+# Servicio que encripta contraseñas y las compara de forma segura.
+# El cálculo (lento a propósito) se hace en un grupo de hilos/procesos aparte;
+# si hay demasiados a la vez lanza ServicioOcupado en vez de trabar el servidor.
 
-@app.route('/')
+
+@bp.route('/')
 def index():
     # Esta es la ruta principal "/".
     # Si el usuario ya inició sesión, lo mandamos directo al inicio.
@@ -25,13 +33,13 @@ def index():
     return redirect('/entrar')
 
 
-@app.route('/entrar')
+@bp.route('/entrar')
 def pagina_entrar():
     # Mostrar la página con los formularios de login y registro.
     return render_template('entrar.html')
 
 
-@app.route('/registro', methods=['POST'])
+@bp.route('/registro', methods=['POST'])
 def procesar_registro():
     # Este método procesa lo que el usuario envía desde el formulario de registro.
 
@@ -42,7 +50,11 @@ def procesar_registro():
     
     # Si la validación pasa, entonces encriptamos la contraseña.
     # Esto se hace para que NO se guarde en texto plano en la base de datos.
-    password_encriptada = generate_password_hash(request.form['contrasena'])
+    try:
+        password_encriptada = servicio_hash.generar(request.form['contrasena'])
+    except ServicioOcupado:
+        flash("El servidor está ocupado, intente de nuevo en unos segundos.", "registro")
+        return redirect('/entrar')
     
     # Preparamos los datos tal como los espera el método guardar().
     data = {
@@ -53,7 +65,12 @@ def procesar_registro():
     }
 
     # Guardamos el nuevo usuario en la base de datos.
-    Usuario.guardar(data)
+    # Si el email ya existe, el índice UNIQUE lo rechaza y avisamos al usuario.
+    try:
+        Usuario.guardar(data)
+    except RegistroDuplicado:
+        flash("Ese email ya está registrado.", "registro")
+        return redirect('/entrar')
 
     # Mandamos un mensaje avisando que todo salió bien.
     flash("Registro exitoso. Ahora puede iniciar sesión.", "login")
@@ -62,12 +79,13 @@ def procesar_registro():
     return redirect('/entrar')
 
 
-@app.route('/login', methods=['POST'])
+@bp.route('/login', methods=['POST'])
 def procesar_login():
     # Este método procesa el formulario cuando el usuario intenta iniciar sesión.
 
-    # Buscamos al usuario por su email en la base de datos.
-    usuario = Usuario.obtener_por_email(request.form)
+    # Buscamos al usuario por su email en la base de datos
+    # (solo id, nombre y contraseña encriptada, que es lo que se necesita aquí).
+    usuario = Usuario.obtener_credenciales(request.form)
 
     # Si no existe, mostramos error y regresamos al login.
     if not usuario:
@@ -75,20 +93,36 @@ def procesar_login():
         return redirect('/entrar')
     
     # Si existe, comprobamos que la contraseña coincida con la encriptada.
-    if not check_password_hash(usuario.contrasena, request.form['contrasena']):
-        flash("Contraseña incorrecta", "login")
+    try:
+        if not servicio_hash.verificar(usuario.contrasena, request.form['contrasena']):
+            flash("Contraseña incorrecta", "login")
+            return redirect('/entrar')
+
+        # Si cambiamos los parámetros del hash (HASH_METODO), aprovechamos que
+        # tenemos la contraseña correcta para guardarla con los nuevos parámetros.
+        if servicio_hash.necesita_rehash(usuario.contrasena):
+            Usuario.actualizar_contrasena({
+                "id": usuario.id,
+                "contrasena": servicio_hash.generar(request.form['contrasena'])
+            })
+    except ServicioOcupado:
+        flash("El servidor está ocupado, intente de nuevo en unos segundos.", "login")
         return redirect('/entrar')
     
-    # Si todo está bien, guardamos datos del usuario en la sesión.
+    # Si todo está bien, guardamos el id del usuario en la sesión (que vive en el
+    # servidor; la cookie solo lleva un identificador) y pedimos un identificador nuevo.
     # Esto permite que permanezca "logueado".
+    session.clear()
     session['usuario_id'] = usuario.id
-    session['nombre'] = usuario.nombre
+    session.regenerar()
+    # El nombre no va en la sesión: queda en la caché de identidades (g.usuario).
+    Usuario.recordar_identidad(usuario)
 
     # Lo mandamos a la página de inicio.
     return redirect('/inicio')
 
 
-@app.route('/salir')
+@bp.route('/salir')
 def cerrar_sesion():
     # Esta ruta borra toda la información guardada en la sesión.
     # Es básicamente "cerrar sesión".
@@ -1,11 +1,160 @@
-from flask_app.config.mysqlconnection import connectToMySQL
-from flask import flash, os
+from flask_app.config.mysqlconnection import connectToMySQL, consulta_en_flujo, transaccion, al_confirmar, ConflictoBloqueo
+from flask_app.config.mysqlconnection_async import connectToMySQLAsync
+from flask_app.config.cache import cache
+from flask_app.config.importacion import ResultadoImportacion, en_lotes, errores_formato, IMPORTACION_LOTE
+from flask_app.models.usuario import Usuario
+from flask_app.models.lecturas import AsesoriaListado, CargaSemana
+import os, re, time
+import pymysql
+from flask import flash
 from datetime import datetime
+from collections import namedtuple
+
+# Una página del listado: las asesorías y los cursores para ir a la página
+# siguiente o a la anterior (None si no hay más en esa dirección).
+PaginaAsesorias = namedtuple('PaginaAsesorias', ['asesorias', 'siguiente', 'anterior'])
+
+# Una página de resultados de la búsqueda (numerada: se ordena por relevancia).
+ResultadoBusqueda = namedtuple('ResultadoBusqueda', ['asesorias', 'pagina', 'hay_mas'])
+
+# Columnas que se entregan al exportar asesorías (CSV/JSON).
+COLUMNAS_EXPORTACION = [
+    'id', 'tema', 'fecha', 'duracion', 'notas',
+    'usuario_id', 'creador_nombre', 'tutor_id', 'tutor_nombre',
+]
+
+# Contador de versión de los datos de asesorías: sube con cada escritura y
+# forma parte de la clave de caché del listado de /inicio.
+CLAVE_VERSION = "version_asesorias"
+# Segundos que se guarda en caché una página del listado.
+TTL_LISTADO = int(os.environ.get("CACHE_LISTADO_TTL", 300))
+
+# Una asesoría con los nombres completos del creador y del tutor.
+CONSULTA_UNA = """
+    SELECT asesorias.*, 
+           CONCAT(creador.nombre, ' ', creador.apellido) as creador_nombre,
+           CONCAT(tutor.nombre, ' ', tutor.apellido) as tutor_nombre
+    FROM asesorias
+    JOIN usuarios as creador ON asesorias.usuario_id = creador.id
+    LEFT JOIN usuarios as tutor ON asesorias.tutor_id = tutor.id
+    WHERE asesorias.id = %(id)s;
+"""
+
+# Carga de tutores: asesorías y horas por tutor y por semana (semanas ISO, lunes a domingo).
+SEMANAS_CARGA = int(os.environ.get("SEMANAS_CARGA", 4))
+CONSULTA_CARGA_TUTORES = """
+    SELECT tutor_id, YEARWEEK(fecha, 3) AS semana,
+           COUNT(*) AS sesiones, SUM(duracion) AS horas
+    FROM asesorias
+    WHERE tutor_id IS NOT NULL
+      AND fecha >= CURDATE() AND fecha < CURDATE() + INTERVAL %(dias)s DAY
+    GROUP BY tutor_id, semana
+    ORDER BY tutor_id, semana;
+"""
+
+# Búsqueda de texto con los índices FULLTEXT `tema_notas` (asesorias) y
+# `nombre_apellido` (usuarios). Cada parte del UNION usa su propio índice, así
+# MySQL solo lee las filas que coinciden; después se suman los puntajes por
+# asesoría (una coincidencia en el tema o las notas pesa el doble que en un nombre).
+CONSULTA_BUSQUEDA = """
+    SELECT {columnas}
+    FROM (
+        SELECT id, SUM(puntaje) AS relevancia
+        FROM (
+            SELECT asesorias.id,
+                   MATCH(asesorias.tema, asesorias.notas) AGAINST (%(texto)s IN BOOLEAN MODE) * 2 AS puntaje
+            FROM asesorias
+            WHERE MATCH(asesorias.tema, asesorias.notas) AGAINST (%(texto)s IN BOOLEAN MODE){fechas}
+            UNION ALL
+            SELECT asesorias.id,
+                   MATCH(creador.nombre, creador.apellido) AGAINST (%(texto)s IN BOOLEAN MODE)
+            FROM usuarios AS creador
+            JOIN asesorias ON asesorias.usuario_id = creador.id
+            WHERE MATCH(creador.nombre, creador.apellido) AGAINST (%(texto)s IN BOOLEAN MODE){fechas}
+            UNION ALL
+            SELECT asesorias.id,
+                   MATCH(tutor.nombre, tutor.apellido) AGAINST (%(texto)s IN BOOLEAN MODE)
+            FROM usuarios AS tutor
+            JOIN asesorias ON asesorias.tutor_id = tutor.id
+            WHERE MATCH(tutor.nombre, tutor.apellido) AGAINST (%(texto)s IN BOOLEAN MODE){fechas}
+        ) AS coincidencias
+        GROUP BY id
+    ) AS encontradas
+    JOIN asesorias ON asesorias.id = encontradas.id
+    JOIN usuarios AS creador ON asesorias.usuario_id = creador.id
+    ORDER BY encontradas.relevancia DESC, asesorias.fecha ASC, asesorias.id ASC
+    LIMIT %(limite)s OFFSET %(desplazamiento)s;
+"""
+# Palabras que se toman de lo que escribe el usuario, y páginas que se pueden pedir
+# (con OFFSET cada página cuesta más que la anterior, así que se pone un tope).
+BUSQUEDA_MAX_PALABRAS = 8
+BUSQUEDA_MAX_PAGINAS = int(os.environ.get("BUSQUEDA_MAX_PAGINAS", 50))
+
+# Disponibilidad de los tutores. La fecha no tiene hora, así que "choque" quiere
+# decir pasarse de las horas que un tutor puede dar en un mismo día.
+HORAS_MAX_TUTOR_DIA = int(os.environ.get("HORAS_MAX_TUTOR_DIA", 8))
+# Horas ya ocupadas de un tutor en una fecha (sin contar la asesoría que se edita).
+# FOR UPDATE bloquea la fila del tutor en `usuarios` hasta el COMMIT: dos peticiones
+# para el mismo tutor se atienden de a una. Bloquear solo el tramo del índice
+# `tutor_fecha` no basta: en un día sin asesorías son bloqueos de "hueco", que no
+# chocan entre sí, y las dos primeras reservas terminaban en un deadlock.
+CONSULTA_HORAS_TUTOR = """
+    SELECT COALESCE(SUM(asesorias.duracion), 0) AS horas
+    FROM usuarios
+    LEFT JOIN asesorias ON asesorias.tutor_id = usuarios.id
+        AND asesorias.fecha = %(fecha)s AND asesorias.id <> %(excluir)s
+    WHERE usuarios.id = %(tutor_id)s
+    FOR UPDATE;
+"""
+# Bloquea las filas de varios tutores (importación), siempre en el mismo orden.
+CONSULTA_BLOQUEAR_TUTORES = "SELECT id FROM usuarios WHERE id IN %(ids)s ORDER BY id FOR UPDATE;"
+# Horas ocupadas de cada tutor en una fecha (índice `fecha_id`), en una sola consulta.
+CONSULTA_OCUPACION_FECHA = """
+    SELECT tutor_id, SUM(duracion) AS horas
+    FROM asesorias
+    WHERE fecha = %(fecha)s AND tutor_id IS NOT NULL AND id <> %(excluir)s
+    GROUP BY tutor_id;
+"""
+# Lo mismo, pero para el día de una asesoría dada (sin contarla): así /ver y
+# /editar lo piden a la vez que la asesoría, sin esperar a saber su fecha.
+CONSULTA_OCUPACION_ASESORIA = """
+    SELECT otras.tutor_id, SUM(otras.duracion) AS horas
+    FROM asesorias AS propia
+    JOIN asesorias AS otras ON otras.fecha = propia.fecha AND otras.id <> propia.id
+    WHERE propia.id = %(id)s AND otras.tutor_id IS NOT NULL
+    GROUP BY otras.tutor_id;
+"""
+
+
+class TutorOcupado(Exception):
+    # El tutor ya no tiene horas libres ese día para esta asesoría.
+    def __init__(self, tutor_id, fecha, horas_ocupadas):
+        super().__init__(f"El tutor {tutor_id} ya tiene {horas_ocupadas} horas el {fecha}.")
+        self.tutor_id = tutor_id
+        self.fecha = fecha
+        self.horas_ocupadas = horas_ocupadas
+
+    def mensaje(self):
+        libres = max(0, HORAS_MAX_TUTOR_DIA - self.horas_ocupadas)
+        return (f"El tutor ya tiene {self.horas_ocupadas} horas ocupadas el {self.fecha} "
+                f"(le quedan {libres}). Elija otro tutor, otra fecha o menos horas.")
+
+
+# Largo máximo del tema (VARCHAR(100) en esquema.sql).
+TEMA_MAXIMO = 100
+
+# Tamaño de página por defecto y máximo permitido para el listado de /inicio.
+TAMANO_PAGINA = 20
+TAMANO_MAXIMO = 100
 
 class Asesoria:
     # Nombre de la base de datos que vamos a usar.
     db = os.environ.get("MYSQL_DB", "esquema_asesorias")
 
+    # Atributos fijos: sin __dict__ por objeto, cada asesoría ocupa menos memoria.
+    __slots__ = ('id', 'tema', 'fecha', 'duracion', 'notas', 'usuario_id', 'tutor_id',
+                 'creador_nombre', 'tutor_nombre')
+
     def __init__(self, data):
         # Aquí recibimos un diccionario con los datos de la asesoría
         # y los guardamos en el objeto (self).
@@ -25,121 +174,575 @@ class Asesoria:
     @classmethod
     def guardar(cls, data):
         # Inserta una nueva asesoría en la base de datos.
+        # Si el tutor no tiene lugar ese día lanza TutorOcupado y no guarda nada.
         query = """
             INSERT INTO asesorias (tema, fecha, duracion, notas, usuario_id, tutor_id) 
             VALUES (%(tema)s, %(fecha)s, %(duracion)s, %(notas)s, %(usuario_id)s, %(tutor_id)s);
         """
-        # Ejecutamos la consulta usando el método que conecta con MySQL.
-        return connectToMySQL(cls.db).query_db(query, data)
+        # La revisión y el INSERT van en la misma transacción (la revisión deja al tutor bloqueado).
+        with transaccion(cls.db):
+            cls.revisar_disponibilidad(data['tutor_id'], data['fecha'], data['duracion'])
+            # Ejecutamos la consulta usando el método que conecta con MySQL.
+            resultado = connectToMySQL(cls.db).insert(query, data)
+        cls.marcar_cambio()
+        return resultado
 
     @classmethod
-    def obtener_todas_futuras(cls):
-        # Esta consulta hace un JOIN para unir asesorías con usuarios
-        # y así poder mostrar el nombre del creador y del tutor.
-        # También usamos CURDATE() para traer solo asesorías futuras o de hoy.
+    def guardar_muchas(cls, lista_data):
+        # Inserta varias asesorías con un solo INSERT de varias filas.
         query = """
-            SELECT asesorias.*, 
-                   CONCAT(creador.nombre, ' ', creador.apellido) as creador_nombre,
-                   CONCAT(tutor.nombre, ' ', tutor.apellido) as tutor_nombre
+            INSERT INTO asesorias (tema, fecha, duracion, notas, usuario_id, tutor_id)
+            VALUES (%(tema)s, %(fecha)s, %(duracion)s, %(notas)s, %(usuario_id)s, %(tutor_id)s);
+        """
+        resultado = connectToMySQL(cls.db).execute_many(query, lista_data)
+        cls.marcar_cambio()
+        return resultado
+
+    # ----------------------------------------------------------------------
+    # Disponibilidad de los tutores: ninguno puede pasar de HORAS_MAX_TUTOR_DIA
+    # horas en una fecha. Cada escritura hace una sola consulta de revisión
+    # (CONSULTA_HORAS_TUTOR, con FOR UPDATE, dentro de su transacción).
+    # ----------------------------------------------------------------------
+    @classmethod
+    def revisar_disponibilidad(cls, tutor_id, fecha, duracion, excluir_id=0):
+        # Lanza TutorOcupado si el tutor no tiene `duracion` horas libres ese día.
+        # excluir_id: la asesoría que se está editando (sus horas no cuentan).
+        if tutor_id is None:
+            return
+        fila = connectToMySQL(cls.db).fetch_one(
+            CONSULTA_HORAS_TUTOR, {"tutor_id": tutor_id, "fecha": fecha, "excluir": excluir_id or 0}
+        )
+        ocupadas = int(fila['horas']) if fila else 0
+        if ocupadas + int(duracion) > HORAS_MAX_TUTOR_DIA:
+            raise TutorOcupado(tutor_id, fecha, ocupadas)
+
+    @classmethod
+    def horas_por_tutor_y_fecha(cls, pares):
+        # {(tutor_id, 'YYYY-MM-DD'): horas ocupadas} para muchos pares a la vez
+        # (importación masiva): una sola consulta por el índice `tutor_fecha`.
+        # Antes se bloquean las filas de los tutores, igual que en revisar_disponibilidad.
+        if not pares:
+            return {}
+        connectToMySQL(cls.db).fetch_all(CONSULTA_BLOQUEAR_TUTORES, {"ids": sorted({t for t, _ in pares})})
+        data = {}
+        tuplas = []
+        for i, (tutor_id, fecha) in enumerate(pares):
+            data[f"t{i}"], data[f"f{i}"] = tutor_id, fecha
+            tuplas.append(f"(%(t{i})s, %(f{i})s)")
+        query = f"""
+            SELECT tutor_id, fecha, SUM(duracion) AS horas
+            FROM asesorias
+            WHERE (tutor_id, fecha) IN ({", ".join(tuplas)})
+            GROUP BY tutor_id, fecha
+            FOR UPDATE;
+        """
+        resultados = connectToMySQL(cls.db).fetch_all(query, data)
+        return {(fila['tutor_id'], str(fila['fecha'])): int(fila['horas']) for fila in resultados}
+
+    @classmethod
+    def ocupacion_tutores(cls, fecha, excluir_id=0):
+        # {tutor_id: horas ocupadas} en una fecha, para todos los tutores a la vez.
+        # En caché hasta la próxima escritura (la versión de los datos está en la clave).
+        clave = f"ocupacion:{cls.version_datos()}:{fecha}:{excluir_id or 0}"
+        ocupacion = cache.obtener(clave)
+        if ocupacion is None:
+            # Lo que va a la caché compartida se lee de la primaria: una réplica
+            # atrasada dejaría guardado el estado de antes de la última escritura
+            # bajo la versión nueva, y lo verían todos hasta que venza.
+            resultados = connectToMySQL(cls.db).fetch_all(
+                CONSULTA_OCUPACION_FECHA, {"fecha": fecha, "excluir": excluir_id or 0}
+            )
+            ocupacion = [[fila['tutor_id'], int(fila['horas'])] for fila in resultados]
+            cache.guardar(clave, ocupacion, TTL_LISTADO)
+        return dict(ocupacion)
+
+    @classmethod
+    async def ocupacion_tutores_de_asesoria_async(cls, id):
+        # Igual que ocupacion_tutores, para el día de la asesoría `id` (vistas async).
+        clave = f"ocupacion_asesoria:{cls.version_datos()}:{id}"
+        ocupacion = cache.obtener(clave)
+        if ocupacion is None:
+            resultados = await connectToMySQLAsync(cls.db, lectura=False).fetch_all(CONSULTA_OCUPACION_ASESORIA, {"id": id})
+            ocupacion = [[fila['tutor_id'], int(fila['horas'])] for fila in resultados]
+            cache.guardar(clave, ocupacion, TTL_LISTADO)
+        return dict(ocupacion)
+
+    @staticmethod
+    def tutores_sin_lugar(ocupacion, duracion):
+        # Ids de los tutores que no tienen `duracion` horas libres (para deshabilitarlos en el selector).
+        return {tutor_id for tutor_id, horas in ocupacion.items() if horas + int(duracion) > HORAS_MAX_TUTOR_DIA}
+
+    # ----------------------------------------------------------------------
+    # Versión de los datos: cada escritura (guardar, actualizar, borrar...)
+    # sube el contador, y así las páginas del listado guardadas en caché con
+    # la versión anterior dejan de usarse.
+    # ----------------------------------------------------------------------
+    @classmethod
+    def marcar_cambio(cls):
+        # Se incrementa después del COMMIT si hay una transacción abierta.
+        # version_datos() primero: si el contador no existía, incrementar()
+        # partiría de 1 y podría repetir una versión ya usada.
+        def incrementar():
+            cls.version_datos()
+            cache.incrementar(CLAVE_VERSION)
+        al_confirmar(cls.db, incrementar)
+
+    @classmethod
+    def version_datos(cls):
+        version = cache.obtener(CLAVE_VERSION)
+        if version is None:
+            # Con la caché en memoria el contador se pierde al reiniciar (o con
+            # limpiar()); partir de la hora actual en microsegundos evita repetir una
+            # versión (y un ETag) de antes: para alcanzarla harían falta más de un
+            # cambio por microsegundo desde que se creó la anterior.
+            version = time.time_ns() // 1000
+            cache.guardar(CLAVE_VERSION, version)
+        return version
+
+    # ----------------------------------------------------------------------
+    # Listado paginado por "keyset" (cursor = fecha + id de la última fila vista).
+    # En vez de OFFSET, se pide "lo que viene después de (fecha, id)", así MySQL
+    # usa el índice fecha_id y cada página cuesta lo mismo sin importar el tamaño
+    # de la tabla.
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def crear_cursor(asesoria):
+        return f"{asesoria.fecha}_{asesoria.id}"
+
+    @staticmethod
+    def leer_cursor(cursor):
+        # "2025-01-31_15" -> {"fecha": "2025-01-31", "id": 15}; None si no es válido.
+        try:
+            fecha, id = cursor.split("_")
+            datetime.strptime(fecha, "%Y-%m-%d")
+            return {"fecha": fecha, "id": int(id)}
+        except (AttributeError, ValueError):
+            return None
+
+    @classmethod
+    def obtener_pagina_futuras(cls, despues=None, antes=None, tamano=TAMANO_PAGINA,
+                               usuario_id=None, tutor_id=None, lectura=True):
+        # usuario_id / tutor_id: solo las asesorías de ese creador o de ese tutor
+        # (usan los índices `usuario_id` y `tutor_fecha` de la tabla).
+        # lectura=False: leer de la primaria aunque haya réplicas.
+        tamano = max(1, min(int(tamano), TAMANO_MAXIMO))
+        data = {"limite": tamano + 1}
+        condicion = ""
+        orden = "ASC"
+        filtro = ""
+        if usuario_id is not None:
+            filtro += " AND asesorias.usuario_id = %(usuario_id)s"
+            data["usuario_id"] = usuario_id
+        if tutor_id is not None:
+            filtro += " AND asesorias.tutor_id = %(tutor_id)s"
+            data["tutor_id"] = tutor_id
+
+        cursor_despues = cls.leer_cursor(despues) if despues else None
+        cursor_antes = cls.leer_cursor(antes) if antes else None
+        if cursor_despues:
+            data.update(cursor_despues)
+            condicion = """AND (asesorias.fecha > %(fecha)s
+                     OR (asesorias.fecha = %(fecha)s AND asesorias.id > %(id)s))"""
+        elif cursor_antes:
+            data.update(cursor_antes)
+            condicion = """AND (asesorias.fecha < %(fecha)s
+                     OR (asesorias.fecha = %(fecha)s AND asesorias.id < %(id)s))"""
+            # Hacia atrás se recorre el índice al revés y luego se da vuelta la lista.
+            orden = "DESC"
+
+        # Solo las columnas que muestra inicio.html (sin notas ni tutor: no hace falta el LEFT JOIN).
+        query = f"""
+            SELECT {AsesoriaListado.columnas}
             FROM asesorias
             JOIN usuarios as creador ON asesorias.usuario_id = creador.id
-            LEFT JOIN usuarios as tutor ON asesorias.tutor_id = tutor.id
-            WHERE asesorias.fecha >= CURDATE()
-            ORDER BY asesorias.fecha ASC;
+            WHERE asesorias.fecha >= CURDATE(){filtro} {condicion}
+            ORDER BY asesorias.fecha {orden}, asesorias.id {orden}
+            LIMIT %(limite)s;
         """
-        resultados = connectToMySQL(cls.db).query_db(query)
+        resultados = connectToMySQL(cls.db, lectura=lectura).fetch_all(query, data)
+
+        # Pedimos una fila de más solo para saber si hay otra página.
+        hay_mas = len(resultados) > tamano
+        asesorias = [AsesoriaListado(fila) for fila in resultados[:tamano]]
+        if cursor_antes:
+            asesorias.reverse()
+
+        siguiente = anterior = None
+        if asesorias:
+            if cursor_antes:
+                siguiente = cls.crear_cursor(asesorias[-1])
+                anterior = cls.crear_cursor(asesorias[0]) if hay_mas else None
+            else:
+                siguiente = cls.crear_cursor(asesorias[-1]) if hay_mas else None
+                anterior = cls.crear_cursor(asesorias[0]) if cursor_despues else None
+        elif cursor_antes:
+            # Página vacía hacia atrás: se puede volver a donde estábamos.
+            siguiente = antes
+        elif cursor_despues:
+            anterior = despues
+        return PaginaAsesorias(asesorias, siguiente, anterior)
+
+    # ----------------------------------------------------------------------
+    # Búsqueda por tema, notas y nombres del solicitante o del tutor, con filtro
+    # opcional de fechas (desde / hasta, 'YYYY-MM-DD'). Ordena por relevancia y
+    # se pagina por número de página: con un puntaje no sirve el cursor de /inicio.
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def texto_busqueda(texto):
+        # "Clases de álgebra" -> "clases* de* álgebra*" para MATCH ... IN BOOLEAN MODE.
+        # Se quitan los operadores (+ - " ( ) ~ < > * @) para que el usuario no arme
+        # consultas raras, y cada palabra busca también sus continuaciones (álgebra*).
+        palabras = [p for p in re.findall(r"\w+", texto or "") if len(p) > 1]
+        return " ".join(f"{p}*" for p in palabras[:BUSQUEDA_MAX_PALABRAS])
+
+    @classmethod
+    def buscar(cls, texto, desde=None, hasta=None, pagina=1, tamano=TAMANO_PAGINA):
+        texto = cls.texto_busqueda(texto)
+        pagina = max(1, min(int(pagina), BUSQUEDA_MAX_PAGINAS))
+        tamano = max(1, min(int(tamano), TAMANO_MAXIMO))
+        if not texto:
+            return ResultadoBusqueda([], pagina, False)
 
-        # Convertimos cada fila en un objeto Asesoria.
-        lista_asesorias = []
-        if resultados:
-            for fila in resultados:
-                lista_asesorias.append(cls(fila))
-        return lista_asesorias
+        data = {"texto": texto, "limite": tamano + 1, "desplazamiento": (pagina - 1) * tamano}
+        fechas = ""
+        if desde:
+            fechas += " AND asesorias.fecha >= %(desde)s"
+            data["desde"] = desde
+        if hasta:
+            fechas += " AND asesorias.fecha <= %(hasta)s"
+            data["hasta"] = hasta
+        query = CONSULTA_BUSQUEDA.format(columnas=AsesoriaListado.columnas, fechas=fechas)
+        resultados = connectToMySQL(cls.db, lectura=True).fetch_all(query, data)
 
+        # Igual que en el listado: una fila de más indica que hay otra página.
+        return ResultadoBusqueda(
+            [AsesoriaListado(fila) for fila in resultados[:tamano]],
+            pagina,
+            len(resultados) > tamano,
+        )
+
+    # ----------------------------------------------------------------------
+    # Exportación: todas las asesorías (con nombres de creador y tutor) como un
+    # generador de diccionarios. Las filas se leen de a una desde MySQL, así la
+    # memoria usada no depende de cuántas asesorías haya.
+    # Filtros opcionales: desde / hasta (fechas 'YYYY-MM-DD') y tutor_id.
+    # ----------------------------------------------------------------------
     @classmethod
-    def obtener_una(cls, data):
-        # Trae una sola asesoría usando su ID.
-        # También hace JOIN para mostrar nombres completos.
-        query = """
-            SELECT asesorias.*, 
+    def exportar(cls, desde=None, hasta=None, tutor_id=None):
+        condiciones = []
+        data = {}
+        if desde:
+            condiciones.append("asesorias.fecha >= %(desde)s")
+            data["desde"] = desde
+        if hasta:
+            condiciones.append("asesorias.fecha <= %(hasta)s")
+            data["hasta"] = hasta
+        if tutor_id:
+            condiciones.append("asesorias.tutor_id = %(tutor_id)s")
+            data["tutor_id"] = tutor_id
+        where = ("WHERE " + " AND ".join(condiciones)) if condiciones else ""
+
+        query = f"""
+            SELECT asesorias.id, asesorias.tema, asesorias.fecha, asesorias.duracion,
+                   asesorias.notas, asesorias.usuario_id, asesorias.tutor_id,
                    CONCAT(creador.nombre, ' ', creador.apellido) as creador_nombre,
                    CONCAT(tutor.nombre, ' ', tutor.apellido) as tutor_nombre
             FROM asesorias
             JOIN usuarios as creador ON asesorias.usuario_id = creador.id
             LEFT JOIN usuarios as tutor ON asesorias.tutor_id = tutor.id
-            WHERE asesorias.id = %(id)s;
+            {where}
+            ORDER BY asesorias.fecha ASC, asesorias.id ASC;
         """
-        resultado = connectToMySQL(cls.db).query_db(query, data)
-        return cls(resultado[0])  # Creamos el objeto con la primera fila devuelta
+        return consulta_en_flujo(cls.db, query, data, lectura=True)
+
+    @classmethod
+    def clave_listado(cls, despues=None, antes=None, tamano=TAMANO_PAGINA, usuario_id=None, tutor_id=None):
+        # Clave de caché de una página del listado: versión de los datos + día de hoy
+        # (CURDATE() cambia a medianoche) + la página pedida (y el filtro, si hay).
+        hoy = datetime.now().strftime('%Y-%m-%d')
+        filtro = f"u{usuario_id or ''}t{tutor_id or ''}"
+        return f"listado:{cls.version_datos()}:{hoy}:{filtro}:{despues or ''}:{antes or ''}:{tamano}"
+
+    @classmethod
+    def obtener_pagina_futuras_en_cache(cls, despues=None, antes=None, tamano=TAMANO_PAGINA,
+                                        usuario_id=None, tutor_id=None):
+        # Igual que obtener_pagina_futuras, pero guarda el resultado en caché
+        # (compartido entre usuarios) hasta que cambien los datos o el día.
+        clave = cls.clave_listado(despues, antes, tamano, usuario_id, tutor_id)
+        guardado = cache.obtener(clave)
+        if guardado is None:
+            # De la primaria, como todo lo que se guarda en la caché compartida (ver ocupacion_tutores).
+            pagina = cls.obtener_pagina_futuras(despues=despues, antes=antes, tamano=tamano,
+                                                usuario_id=usuario_id, tutor_id=tutor_id, lectura=False)
+            guardado = {
+                "filas": [
+                    {campo: str(getattr(a, campo)) if campo == 'fecha' else getattr(a, campo)
+                     for campo in AsesoriaListado.__slots__}
+                    for a in pagina.asesorias
+                ],
+                "siguiente": pagina.siguiente,
+                "anterior": pagina.anterior,
+            }
+            cache.guardar(clave, guardado, TTL_LISTADO)
+        return PaginaAsesorias(
+            [AsesoriaListado(fila) for fila in guardado["filas"]],
+            guardado["siguiente"],
+            guardado["anterior"],
+        )
+
+    # ----------------------------------------------------------------------
+    # Carga de los tutores: asesorías y horas por tutor y por semana en las
+    # próximas SEMANAS_CARGA semanas. Lo suma MySQL (GROUP BY), no Python, y el
+    # resultado queda en caché hasta la próxima escritura o el cambio de día.
+    # ----------------------------------------------------------------------
+    @classmethod
+    def clave_carga(cls):
+        return f"carga_tutores:{cls.version_datos()}:{datetime.now().strftime('%Y-%m-%d')}"
+
+    @staticmethod
+    def _filas_carga(resultados):
+        # Listas (no diccionarios) para que se puedan guardar como JSON en la caché.
+        return [[fila['tutor_id'], fila['semana'], fila['sesiones'], int(fila['horas'])] for fila in resultados]
+
+    @classmethod
+    def carga_tutores(cls):
+        # Lista de CargaSemana ordenada por tutor y semana.
+        clave = cls.clave_carga()
+        filas = cache.obtener(clave)
+        if filas is None:
+            # De la primaria: el resultado se comparte en la caché (ver ocupacion_tutores).
+            resultados = connectToMySQL(cls.db).fetch_all(CONSULTA_CARGA_TUTORES, {"dias": SEMANAS_CARGA * 7})
+            filas = cls._filas_carga(resultados)
+            cache.guardar(clave, filas, TTL_LISTADO)
+        return [CargaSemana(dict(zip(CargaSemana.__slots__, fila))) for fila in filas]
+
+    @classmethod
+    async def carga_tutores_async(cls):
+        # Igual que carga_tutores, para vistas async.
+        clave = cls.clave_carga()
+        filas = cache.obtener(clave)
+        if filas is None:
+            resultados = await connectToMySQLAsync(cls.db, lectura=False).fetch_all(CONSULTA_CARGA_TUTORES, {"dias": SEMANAS_CARGA * 7})
+            filas = cls._filas_carga(resultados)
+            cache.guardar(clave, filas, TTL_LISTADO)
+        return [CargaSemana(dict(zip(CargaSemana.__slots__, fila))) for fila in filas]
+
+    @staticmethod
+    def resumen_carga(cargas):
+        # Total por tutor para los selectores: {tutor_id: {"sesiones": n, "horas": h}}
+        resumen = {}
+        for carga in cargas:
+            total = resumen.setdefault(carga.tutor_id, {"sesiones": 0, "horas": 0})
+            total["sesiones"] += carga.sesiones
+            total["horas"] += carga.horas
+        return resumen
+
+    @classmethod
+    def obtener_una(cls, data):
+        # Trae una sola asesoría usando su ID.
+        # También hace JOIN para mostrar nombres completos.
+        resultado = connectToMySQL(cls.db, lectura=True).fetch_one(CONSULTA_UNA, data)
+        # Creamos el objeto con la fila devuelta (None si la asesoría no existe)
+        return cls(resultado) if resultado else None
+
+    @classmethod
+    async def obtener_una_async(cls, data):
+        # Igual que obtener_una, para vistas async.
+        resultado = await connectToMySQLAsync(cls.db).fetch_one(CONSULTA_UNA, data)
+        return cls(resultado) if resultado else None
 
     @classmethod
     def actualizar(cls, data):
         # Actualiza TODOS los campos de una asesoría existente.
+        # Lanza TutorOcupado si con la nueva fecha/duración/tutor no hay lugar.
         query = """
             UPDATE asesorias 
             SET tema=%(tema)s, fecha=%(fecha)s, duracion=%(duracion)s, notas=%(notas)s, tutor_id=%(tutor_id)s
             WHERE id = %(id)s;
         """
-        return connectToMySQL(cls.db).query_db(query, data)
+        with transaccion(cls.db):
+            cls.revisar_disponibilidad(data['tutor_id'], data['fecha'], data['duracion'], excluir_id=data['id'])
+            resultado = connectToMySQL(cls.db).execute(query, data)
+        cls.marcar_cambio()
+        return resultado
 
     @classmethod
     def borrar(cls, data):
         # Elimina una asesoría por su ID.
         query = "DELETE FROM asesorias WHERE id = %(id)s;"
-        return connectToMySQL(cls.db).query_db(query, data)
+        resultado = connectToMySQL(cls.db).execute(query, data)
+        cls.marcar_cambio()
+        return resultado
 
     @classmethod
     def actualizar_tutor(cls, data):
         # Solo cambia el tutor asociado a la asesoría.
+        # data trae id, tutor_id y la fecha y duración actuales de la asesoría
+        # (para revisar que el nuevo tutor tenga lugar ese día).
         query = "UPDATE asesorias SET tutor_id=%(tutor_id)s WHERE id=%(id)s;"
-        return connectToMySQL(cls.db).query_db(query, data)
+        with transaccion(cls.db):
+            cls.revisar_disponibilidad(data['tutor_id'], data['fecha'], data['duracion'], excluir_id=data['id'])
+            resultado = connectToMySQL(cls.db).execute(query, data)
+        cls.marcar_cambio()
+        return resultado
+
+    @classmethod
+    def importar(cls, filas, tamano_lote=IMPORTACION_LOTE):
+        # Importación masiva: `filas` son pares (línea, dict) con tema, fecha,
+        # duracion, notas, usuario_id y tutor_id. Se valida con las mismas reglas
+        # del formulario, se revisa que los usuarios existan con un solo SELECT
+        # por lote y cada lote entra con un INSERT de varias filas.
+        resultado = ResultadoImportacion()
+
+        for lote in en_lotes(filas, tamano_lote):
+            validos = []
+            for linea, fila in lote:
+                datos = {campo: fila.get(campo, '') for campo in ('tema', 'fecha', 'duracion', 'notas', 'usuario_id', 'tutor_id')}
+                errores = errores_formato(fila) + cls.errores_asesoria(datos)
+                try:
+                    datos['usuario_id'] = int(datos['usuario_id'])
+                    datos['tutor_id'] = int(datos['tutor_id']) if datos['tutor_id'] else None
+                except ValueError:
+                    errores.append("usuario_id y tutor_id deben ser números.")
+                else:
+                    if datos['tutor_id'] == datos['usuario_id']:
+                        errores.append("El tutor no puede ser el creador.")
+                if errores:
+                    resultado.agregar_error(linea, errores)
+                    continue
+                datos['duracion'] = int(datos['duracion'])
+                # Siempre AAAA-MM-DD con ceros ("2030-1-5" -> "2030-01-05"): así
+                # coincide con las claves de horas_por_tutor_y_fecha.
+                datos['fecha'] = cls.leer_fecha(datos['fecha']).strftime('%Y-%m-%d')
+                validos.append((linea, datos))
+
+            ids = {datos['usuario_id'] for _, datos in validos} | {datos['tutor_id'] for _, datos in validos}
+            ids.discard(None)
+            existentes = Usuario.ids_existentes(ids)
+            nuevas = []
+            for linea, datos in validos:
+                faltan = [campo for campo in ('usuario_id', 'tutor_id') if datos[campo] not in existentes]
+                if faltan:
+                    resultado.agregar_error(linea, [f"No existe el usuario de {campo}." for campo in faltan])
+                else:
+                    nuevas.append((linea, datos))
+
+            if nuevas:
+                try:
+                    cls._importar_lote_con_reintento(nuevas, resultado)
+                except pymysql.err.DataError:
+                    # MySQL no aceptó algún valor: se deshizo el lote y se repite
+                    # fila por fila para saber cuál fue.
+                    for linea, datos in nuevas:
+                        try:
+                            cls._importar_lote_con_reintento([(linea, datos)], resultado)
+                        except pymysql.err.DataError as e:
+                            resultado.agregar_error(linea, [f"MySQL no aceptó la fila: {e.args[-1]}"])
+
+        return resultado
+
+    @classmethod
+    def _importar_lote_con_reintento(cls, nuevas, resultado):
+        # Si MySQL aborta el lote por un deadlock (ConflictoBloqueo) se repite una vez.
+        for intento in (1, 2):
+            try:
+                aceptadas, ocupados = cls._importar_lote(nuevas)
+                break
+            except ConflictoBloqueo:
+                if intento == 2:
+                    raise
+        for linea, error in ocupados:
+            resultado.agregar_error(linea, [error.mensaje()])
+        resultado.insertadas += len(aceptadas)
+
+    @classmethod
+    def _importar_lote(cls, nuevas):
+        # Inserta un lote ya validado en una transacción. Devuelve (aceptadas,
+        # [(línea, TutorOcupado)]) de las filas que no entraron por falta de lugar.
+        ocupados = []
+        with transaccion(cls.db):
+            # Horas ya ocupadas de todos los tutores/días del lote en una sola consulta;
+            # las filas del lote se van sumando para que tampoco choquen entre sí.
+            ocupadas = cls.horas_por_tutor_y_fecha(
+                {(datos['tutor_id'], datos['fecha']) for _, datos in nuevas if datos['tutor_id']}
+            )
+            aceptadas = []
+            for linea, datos in nuevas:
+                par = (datos['tutor_id'], datos['fecha'])
+                horas = ocupadas.get(par, 0)
+                if datos['tutor_id'] and horas + datos['duracion'] > HORAS_MAX_TUTOR_DIA:
+                    ocupados.append((linea, TutorOcupado(*par, horas)))
+                    continue
+                ocupadas[par] = horas + datos['duracion']
+                aceptadas.append(datos)
+            if aceptadas:
+                cls.guardar_muchas(aceptadas)
+        return aceptadas, ocupados
 
     @staticmethod
-    def validar_asesoria(formulario):
-        # Esta función valida los datos del formulario antes de guardar o actualizar.
-        es_valido = True
+    def errores_asesoria(formulario):
+        # Reglas de validación de una asesoría; devuelve la lista de errores.
+        # La usan el formulario (validar_asesoria) y la importación masiva.
+        errores = []
 
-        # Obtenemos la fecha actual en formato YYYY-MM-DD para comparar.
-        fecha_hoy = datetime.now().strftime('%Y-%m-%d')
+        # Fecha actual para comparar.
+        fecha_hoy = datetime.now().date()
 
         # Validación del tema (no vacío)
         if len(formulario['tema']) < 1:
-            flash("El tema es obligatorio.", "asesoria")
-            es_valido = False
+            errores.append("El tema es obligatorio.")
+        elif len(formulario['tema']) > TEMA_MAXIMO:
+            errores.append(f"El tema no puede tener más de {TEMA_MAXIMO} caracteres.")
         
         # Validación de fecha
+        fecha = Asesoria.leer_fecha(formulario['fecha'])
         if formulario['fecha'] == "":
-            flash("La fecha es obligatoria.", "asesoria")
-            es_valido = False
-        elif formulario['fecha'] < fecha_hoy:
+            errores.append("La fecha es obligatoria.")
+        elif fecha is None:
+            # Desde un CSV puede llegar cualquier texto (31/12/2099); MySQL lo rechazaría.
+            errores.append("La fecha debe tener el formato AAAA-MM-DD.")
+        elif fecha < fecha_hoy:
             # Validamos que la fecha no sea del pasado.
-            flash("Por favor, seleccione una fecha válida (futura o actual)", "asesoria")
-            es_valido = False
+            errores.append("Por favor, seleccione una fecha válida (futura o actual)")
         
         # Validación de duración
         if formulario['duracion'] == "":
-            flash("La duración es obligatoria.", "asesoria")
-            es_valido = False
+            errores.append("La duración es obligatoria.")
         else:
             # Convertimos duración a entero
-            dur = int(formulario['duracion'])
+            try:
+                dur = int(formulario['duracion'])
+            except ValueError:
+                dur = 0
             # Revisamos que esté entre 1 y 8 horas.
             if dur < 1 or dur > 8:
-                flash("La duración debe ser entre 1 y 8 horas.", "asesoria")
-                es_valido = False
+                errores.append("La duración debe ser entre 1 y 8 horas.")
         
         # Validación de notas
         if len(formulario['notas']) < 1:
-            flash("Las notas no pueden estar vacías.", "asesoria")
-            es_valido = False
+            errores.append("Las notas no pueden estar vacías.")
         elif len(formulario['notas']) > 50:
             # Máximo de caracteres permitido
-            flash("Las notas no pueden tener más de 50 caracteres.", "asesoria")
-            es_valido = False
+            errores.append("Las notas no pueden tener más de 50 caracteres.")
         
         # Validación del tutor seleccionado
         if formulario.get('tutor_id', '') == "":
-            flash("Debe elegir un tutor.", "asesoria")
-            es_valido = False
+            errores.append("Debe elegir un tutor.")
             
-        return es_valido
+        return errores
+
+    @staticmethod
+    def leer_fecha(texto):
+        # La fecha de un texto AAAA-MM-DD (acepta 2030-1-5), o None si no es válida.
+        try:
+            return datetime.strptime(texto, '%Y-%m-%d').date()
+        except ValueError:
+            return None
+
+    @staticmethod
+    def validar_asesoria(formulario):
+        # Esta función valida los datos del formulario antes de guardar o actualizar.
+        errores = Asesoria.errores_asesoria(formulario)
+        for error in errores:
+            flash(error, "asesoria")
+        return not errores
@@ -0,0 +1,59 @@
+# ----------------------------------------------------------------------
+# Modelos de solo lectura para listados
+# Son objetos pequeños con __slots__ (sin __dict__ por instancia) que llevan
+# solo las columnas que cada pantalla necesita. Cada uno trae la lista de
+# columnas que hay que pedir en el SELECT, así no se transfieren de MySQL
+# datos que no se usan (por ejemplo, el hash de la contraseña).
+# ----------------------------------------------------------------------
+
+
+class ModeloLectura:
+    __slots__ = ()
+
+    def __init__(self, fila):
+        # Recibe un diccionario (fila de la base) y copia solo los campos del modelo.
+        for campo in self.__slots__:
+            setattr(self, campo, fila[campo])
+
+    def __repr__(self):
+        campos = ", ".join(f"{campo}={getattr(self, campo)!r}" for campo in self.__slots__)
+        return f"{type(self).__name__}({campos})"
+
+    def __eq__(self, otro):
+        return type(self) is type(otro) and all(
+            getattr(self, campo) == getattr(otro, campo) for campo in self.__slots__
+        )
+
+
+class OpcionTutor(ModeloLectura):
+    # Una opción del selector de tutores (crear.html, editar.html, ver.html).
+    __slots__ = ('id', 'nombre')
+
+    def __init__(self, id, nombre):
+        self.id = id
+        self.nombre = nombre
+
+
+class Credenciales(ModeloLectura):
+    # Lo mínimo para iniciar sesión: id, nombre para la sesión y hash de la contraseña.
+    __slots__ = ('id', 'nombre', 'contrasena')
+    columnas = "id, nombre, contrasena"
+
+
+class Identidad(ModeloLectura):
+    # El usuario que inició sesión, tal como lo ven las vistas (g.usuario).
+    __slots__ = ('id', 'nombre')
+    columnas = "id, nombre"
+
+
+class AsesoriaListado(ModeloLectura):
+    # Una fila del listado de /inicio (no incluye notas ni tutor, que no se muestran).
+    __slots__ = ('id', 'tema', 'fecha', 'duracion', 'usuario_id', 'creador_nombre')
+    columnas = """asesorias.id, asesorias.tema, asesorias.fecha, asesorias.duracion,
+                   asesorias.usuario_id,
+                   CONCAT(creador.nombre, ' ', creador.apellido) as creador_nombre"""
+
+
+class CargaSemana(ModeloLectura):
+    # Asesorías y horas de un tutor en una semana (semana = YEARWEEK, p. ej. 202642).
+    __slots__ = ('tutor_id', 'semana', 'sesiones', 'horas')
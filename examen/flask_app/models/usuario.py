@@ -1,16 +1,39 @@
-from flask_app.config.mysqlconnection import connectToMySQL
-from flask import flash, os
+from flask_app.config.mysqlconnection import connectToMySQL, transaccion, RegistroDuplicado, al_confirmar
+from flask_app.config.mysqlconnection_async import connectToMySQLAsync
+import os
+import pymysql
+from flask import flash
 import re
 import datetime
-from werkzeug.security import generate_password_hash
+from flask_app.config.cache import cache
+from flask_app.config.hashing import servicio_hash
+from flask_app.config.importacion import ResultadoImportacion, en_lotes, errores_formato, IMPORTACION_LOTE
+from flask_app.models.lecturas import OpcionTutor, Credenciales, Identidad
 
 # Expresión regular para validar formato de email.
 EMAIL_REGEX = re.compile(r'^[a-zA-Z0-9.+_-]+@[a-zA-Z0-9._-]+\.[a-zA-Z]+$')
 
+# Largo máximo de cada columna (VARCHAR de esquema.sql). Se revisa al validar:
+# en modo estricto MySQL rechazaría el INSERT entero (error 1406).
+LARGO_MAXIMO = {"nombre": 45, "apellido": 45, "email": 255}
+
+# Clave y duración (segundos) del directorio de tutores en la caché.
+CLAVE_TUTORES = "directorio_tutores"
+TTL_TUTORES = int(os.environ.get("CACHE_TUTORES_TTL", 300))
+# Duración (segundos) de la identidad de cada usuario en la caché.
+TTL_IDENTIDAD = int(os.environ.get("CACHE_IDENTIDAD_TTL", 300))
+CONSULTA_DIRECTORIO_TUTORES = """
+    SELECT id, CONCAT(nombre, ' ', apellido) AS nombre
+    FROM usuarios WHERE es_tutor = 1 ORDER BY nombre;
+"""
+
 class Usuario:
     # Nombre de la base de datos
     db = os.environ.get("MYSQL_DB", "esquema_asesorias")
 
+    # Atributos fijos: sin __dict__ por objeto, cada usuario ocupa menos memoria.
+    __slots__ = ('id', 'nombre', 'apellido', 'email', 'contrasena')
+
     def __init__(self, data):
         # Constructor que recibe un diccionario con datos de la DB
         self.id = data['id']
@@ -21,83 +44,107 @@ class Usuario:
 
     # ----------------------------------------------------------------------
     # Crear un usuario normal
+    # El email tiene índice UNIQUE: si ya existe, MySQL rechaza el INSERT y
+    # se lanza RegistroDuplicado (una sola consulta, sin carrera entre dos registros).
     # ----------------------------------------------------------------------
     @classmethod
     def guardar(cls, data):
         query = "INSERT INTO usuarios (nombre, apellido, email, contrasena) VALUES (%(nombre)s, %(apellido)s, %(email)s, %(contrasena)s);"
-        return connectToMySQL(cls.db).query_db(query, data)
+        resultado = connectToMySQL(cls.db).insert(query, data)
+        cls.invalidar_tutores()
+        return resultado
 
     # ----------------------------------------------------------------------
-    # Buscar usuario por email (se usa para login y validación de registro)
+    # Datos para iniciar sesión: solo id, nombre y hash (búsqueda por el índice de email)
+    # Se lee siempre de la primaria: un usuario recién registrado tiene que poder
+    # entrar aunque la réplica todavía no tenga su fila.
     # ----------------------------------------------------------------------
     @classmethod
-    def obtener_por_email(cls, data):
-        query = "SELECT * FROM usuarios WHERE email = %(email)s;"
-        resultado = connectToMySQL(cls.db).query_db(query, data)
-        if len(resultado) < 1:
-            return False
-        return cls(resultado[0])
+    def obtener_credenciales(cls, data):
+        query = f"SELECT {Credenciales.columnas} FROM usuarios WHERE email = %(email)s LIMIT 1;"
+        resultado = connectToMySQL(cls.db).fetch_one(query, data)
+        return Credenciales(resultado) if resultado else None
 
     # ----------------------------------------------------------------------
-    # Obtener usuario por ID
+    # Identidad del usuario con sesión iniciada (id y nombre), desde la caché.
+    # La usa login_required una vez por petición en vez de guardar el nombre
+    # en la cookie. Si el usuario ya no existe devuelve None.
     # ----------------------------------------------------------------------
     @classmethod
-    def obtener_por_id(cls, data):
-        query = "SELECT * FROM usuarios WHERE id = %(id)s;"
-        resultado = connectToMySQL(cls.db).query_db(query, data)
-        return cls(resultado[0])
-    
-    # ----------------------------------------------------------------------
-    # Obtener todos los usuarios (útil para el selector de tutores)
-    # ----------------------------------------------------------------------
+    def identidad(cls, usuario_id):
+        clave = f"identidad:{usuario_id}"
+        fila = cache.obtener(clave)
+        if fila is None:
+            query = f"SELECT {Identidad.columnas} FROM usuarios WHERE id = %(id)s;"
+            # De la primaria: lo que se guarda en la caché compartida no puede
+            # venir de una réplica atrasada (p. ej. un nombre recién cambiado).
+            fila = connectToMySQL(cls.db).fetch_one(query, {"id": usuario_id})
+            if fila is None:
+                return None
+            cache.guardar(clave, fila, TTL_IDENTIDAD)
+        return Identidad(fila)
+
     @classmethod
-    def obtener_todos(cls):
-        query = "SELECT * FROM usuarios;"
-        resultados = connectToMySQL(cls.db).query_db(query)
-        usuarios = []
-        for fila in resultados:
-            usuarios.append(cls(fila))
-        return usuarios
+    def recordar_identidad(cls, credenciales):
+        # El login ya leyó id y nombre: se guardan para no consultarlos otra vez.
+        cache.guardar(f"identidad:{credenciales.id}", {"id": credenciales.id, "nombre": credenciales.nombre}, TTL_IDENTIDAD)
+
+    @classmethod
+    def invalidar_identidad(cls, usuario_id):
+        # Llamar cuando cambian los datos del usuario (o para forzar que se relean).
+        al_confirmar(cls.db, lambda: cache.borrar(f"identidad:{usuario_id}"))
 
     # ----------------------------------------------------------------------
-    # Verifica si la columna 'es_tutor' existe; si no, la añade automáticamente
+    # Cambiar el hash de la contraseña (se usa al recalcularlo con nuevos parámetros)
     # ----------------------------------------------------------------------
     @classmethod
-    def ensure_tutor_column(cls):
-        try:
-            check = connectToMySQL(cls.db).query_db(
-                "SELECT COUNT(*) AS c FROM information_schema.columns WHERE table_schema=%(schema)s AND table_name='usuarios' AND column_name='es_tutor';",
-                {"schema": cls.db}
-            )
-            # Si no existe, agregar la columna
-            if not check or check[0]["c"] == 0:
-                connectToMySQL(cls.db).query_db("ALTER TABLE usuarios ADD COLUMN es_tutor TINYINT(1) NOT NULL DEFAULT 0;")
-        except:
-            # En caso de error, simplemente ignora (no rompe la app)
-            pass
+    def actualizar_contrasena(cls, data):
+        query = "UPDATE usuarios SET contrasena = %(contrasena)s WHERE id = %(id)s;"
+        return connectToMySQL(cls.db).execute(query, data)
 
     # ----------------------------------------------------------------------
     # Obtener lista de tutores, excluyendo al usuario actual
     # ----------------------------------------------------------------------
     @classmethod
     def obtener_tutores_excepto(cls, data):
-        cls.ensure_tutor_column()
-        query = "SELECT * FROM usuarios WHERE es_tutor = 1 AND id != %(id)s;"
-        resultados = connectToMySQL(cls.db).query_db(query, data)
-        usuarios = []
-        for fila in resultados or []:
-            usuarios.append(cls(fila))
-        return usuarios
+        # El directorio sale de la caché; quitar al usuario actual se hace en memoria.
+        return cls.tutores_excepto(cls.directorio_tutores(), data['id'])
 
     # ----------------------------------------------------------------------
-    # Contar cuántos tutores existen, excluyendo al usuario actual
+    # Directorio de tutores en caché: [[id, "Nombre Apellido"], ...]
+    # Solo cambia cuando se crea un usuario, por eso se guarda por TTL_TUTORES
+    # segundos y se invalida en guardar() y guardar_tutor().
     # ----------------------------------------------------------------------
     @classmethod
-    def contar_tutores_excepto(cls, data):
-        cls.ensure_tutor_column()
-        query = "SELECT COUNT(*) AS c FROM usuarios WHERE es_tutor = 1 AND id != %(id)s;"
-        res = connectToMySQL(cls.db).query_db(query, data)
-        return res[0]['c'] if res else 0
+    def directorio_tutores(cls):
+        directorio = cache.obtener(CLAVE_TUTORES)
+        if directorio is None:
+            # De la primaria: con una réplica atrasada, un tutor recién creado
+            # quedaría fuera del directorio guardado hasta TTL_TUTORES.
+            resultados = connectToMySQL(cls.db).fetch_all(CONSULTA_DIRECTORIO_TUTORES)
+            directorio = [[fila['id'], fila['nombre']] for fila in resultados]
+            cache.guardar(CLAVE_TUTORES, directorio, TTL_TUTORES)
+        return directorio
+
+    @classmethod
+    async def directorio_tutores_async(cls):
+        # Igual que directorio_tutores, para vistas async.
+        directorio = cache.obtener(CLAVE_TUTORES)
+        if directorio is None:
+            resultados = await connectToMySQLAsync(cls.db, lectura=False).fetch_all(CONSULTA_DIRECTORIO_TUTORES)
+            directorio = [[fila['id'], fila['nombre']] for fila in resultados]
+            cache.guardar(CLAVE_TUTORES, directorio, TTL_TUTORES)
+        return directorio
+
+    @staticmethod
+    def tutores_excepto(directorio, usuario_id):
+        # Quita del directorio al usuario indicado (no se puede ser tutor de uno mismo).
+        return [OpcionTutor(id, nombre) for id, nombre in directorio if id != int(usuario_id)]
+
+    @classmethod
+    def invalidar_tutores(cls):
+        # Si estamos dentro de una transacción, se borra recién después del COMMIT.
+        al_confirmar(cls.db, lambda: cache.borrar(CLAVE_TUTORES))
 
     # ----------------------------------------------------------------------
     # Crear un usuario tutor (es_tutor = 1)
@@ -105,21 +152,29 @@ class Usuario:
     @classmethod
     def guardar_tutor(cls, data):
         query = "INSERT INTO usuarios (nombre, apellido, email, contrasena, es_tutor) VALUES (%(nombre)s, %(apellido)s, %(email)s, %(contrasena)s, 1);"
-        return connectToMySQL(cls.db).query_db(query, data)
+        resultado = connectToMySQL(cls.db).insert(query, data)
+        cls.invalidar_tutores()
+        return resultado
+
+    # ----------------------------------------------------------------------
+    # Crear varios tutores con un solo INSERT de varias filas
+    # ----------------------------------------------------------------------
+    @classmethod
+    def guardar_tutores(cls, lista_data):
+        query = "INSERT INTO usuarios (nombre, apellido, email, contrasena, es_tutor) VALUES (%(nombre)s, %(apellido)s, %(email)s, %(contrasena)s, 1);"
+        resultado = connectToMySQL(cls.db).execute_many(query, lista_data)
+        cls.invalidar_tutores()
+        return resultado
 
     # ----------------------------------------------------------------------
     # Se asegura que existan al menos N tutores (útil para que el sistema no quede vacío)
     # Genera tutores falsos si el número es menor al mínimo requerido.
+    # Es idempotente: se puede correr muchas veces y solo crea los que falten.
+    # Se ejecuta con `flask sembrar-tutores` o al arrancar (SEMBRAR_TUTORES=N),
+    # nunca dentro de una petición, porque generar hashes es lento a propósito.
     # ----------------------------------------------------------------------
     @classmethod
-    def sembrar_tutores_si_faltan(cls, exclude_id, minimo=3):
-        cls.ensure_tutor_column()
-        actual = cls.contar_tutores_excepto({'id': exclude_id})
-
-        # Si ya hay suficientes tutores, no hacer nada
-        if actual >= minimo:
-            return
-
+    def sembrar_tutores_si_faltan(cls, minimo=3):
         # Nombres base para crear tutores automáticos
         base = [
             ("Juan", "Pérez"),
@@ -129,59 +184,166 @@ class Usuario:
             ("Pedro", "López"),
             ("Ana", "Torres")
         ]
-        faltan = minimo - actual
 
-        # Se usa timestamp para evitar colisiones de correo
-        ts = int(datetime.datetime.utcnow().timestamp())
+        # El conteo y los INSERT van en una sola transacción: el FOR UPDATE evita
+        # que dos procesos arrancando a la vez creen tutores de más.
+        with transaccion(cls.db):
+            res = connectToMySQL(cls.db).fetch_one(
+                "SELECT COUNT(*) AS c FROM usuarios WHERE es_tutor = 1 FOR UPDATE;"
+            )
+            actual = res['c'] if res else 0
+
+            # Si ya hay suficientes tutores, no hacer nada
+            if actual >= minimo:
+                return 0
+            faltan = minimo - actual
+
+            # Se usa timestamp para evitar colisiones de correo
+            ts = int(datetime.datetime.utcnow().timestamp())
+
+            # Los hashes se calculan en paralelo en el servicio de hash.
+            hashes = servicio_hash.generar_muchos(['123456'] * faltan)
 
-        for i in range(faltan):
-            nombre, apellido = base[i % len(base)]
-            email = f"tutor_{ts}_{i}@ejemplo.com"
-            data = {
-                'nombre': nombre,
-                'apellido': apellido,
-                'email': email,
-                'contrasena': generate_password_hash('123456')
-            }
-            cls.guardar_tutor(data)
+            nuevos = []
+            for i in range(faltan):
+                nombre, apellido = base[i % len(base)]
+                email = f"tutor_{ts}_{i}@ejemplo.com"
+                nuevos.append({
+                    'nombre': nombre,
+                    'apellido': apellido,
+                    'email': email,
+                    'contrasena': hashes[i]
+                })
+            # Todos los tutores en un solo viaje a la base de datos.
+            cls.guardar_tutores(nuevos)
+        return faltan
 
     # ----------------------------------------------------------------------
-    # Validación del formulario de registro
-    # Se dispara antes de guardar un usuario nuevo.
+    # Cuáles de estos emails / ids ya existen (una sola consulta por lote)
+    # ----------------------------------------------------------------------
+    @classmethod
+    def emails_existentes(cls, emails):
+        if not emails:
+            return set()
+        query = "SELECT email FROM usuarios WHERE email IN %(emails)s;"
+        filas = connectToMySQL(cls.db).fetch_all(query, {'emails': list(emails)})
+        return {fila['email'].lower() for fila in filas}
+
+    @classmethod
+    def ids_existentes(cls, ids):
+        if not ids:
+            return set()
+        query = "SELECT id FROM usuarios WHERE id IN %(ids)s;"
+        filas = connectToMySQL(cls.db).fetch_all(query, {'ids': list(ids)})
+        return {fila['id'] for fila in filas}
+
+    # ----------------------------------------------------------------------
+    # Importación masiva de usuarios
+    # `filas` son pares (línea, dict) con nombre, apellido, email, contrasena
+    # y opcionalmente es_tutor (1/0). Se valida con las mismas reglas del
+    # registro, los hashes se calculan en paralelo y cada lote se inserta con
+    # un solo INSERT de varias filas en una transacción.
+    # ----------------------------------------------------------------------
+    @classmethod
+    def importar(cls, filas, tamano_lote=IMPORTACION_LOTE):
+        query = "INSERT INTO usuarios (nombre, apellido, email, contrasena, es_tutor) VALUES (%(nombre)s, %(apellido)s, %(email)s, %(contrasena)s, %(es_tutor)s);"
+        resultado = ResultadoImportacion()
+        vistos = set()
+
+        for lote in en_lotes(filas, tamano_lote):
+            validos = []
+            for linea, fila in lote:
+                datos = {campo: fila.get(campo, '') for campo in ('nombre', 'apellido', 'email', 'contrasena')}
+                datos['es_tutor'] = 1 if fila.get('es_tutor', '').lower() in ('1', 'si', 'sí', 'true') else 0
+                errores = errores_formato(fila) + cls.errores_registro(datos, confirmar=False)
+                email = datos['email'].lower()
+                if not errores and email in vistos:
+                    errores.append("Email repetido en el archivo.")
+                if errores:
+                    resultado.agregar_error(linea, errores)
+                    continue
+                vistos.add(email)
+                validos.append((linea, datos))
+
+            # Un solo SELECT para saber qué emails del lote ya están registrados.
+            existentes = cls.emails_existentes([datos['email'] for _, datos in validos])
+            nuevos = []
+            for linea, datos in validos:
+                if datos['email'].lower() in existentes:
+                    resultado.agregar_error(linea, ["Ese email ya está registrado."])
+                else:
+                    nuevos.append((linea, datos))
+            if not nuevos:
+                continue
+
+            hashes = servicio_hash.generar_muchos([datos['contrasena'] for _, datos in nuevos])
+            for (_, datos), hash_contrasena in zip(nuevos, hashes):
+                datos['contrasena'] = hash_contrasena
+
+            try:
+                with transaccion(cls.db):
+                    connectToMySQL(cls.db).execute_many(query, [datos for _, datos in nuevos])
+                resultado.insertadas += len(nuevos)
+            except (RegistroDuplicado, pymysql.err.DataError):
+                # Alguien registró uno de estos emails mientras importábamos, o
+                # MySQL no aceptó algún valor: se reintenta fila por fila para saber cuál fue.
+                for linea, datos in nuevos:
+                    try:
+                        connectToMySQL(cls.db).insert(query, datos)
+                        resultado.insertadas += 1
+                    except RegistroDuplicado:
+                        resultado.agregar_error(linea, ["Ese email ya está registrado."])
+                    except pymysql.err.DataError as e:
+                        resultado.agregar_error(linea, [f"MySQL no aceptó la fila: {e.args[-1]}"])
+
+        cls.invalidar_tutores()
+        return resultado
+
+    # ----------------------------------------------------------------------
+    # Reglas de validación de un usuario nuevo.
+    # Devuelve la lista de mensajes de error (vacía si todo está bien).
+    # La usan el formulario de registro y la importación masiva.
     # ----------------------------------------------------------------------
     @staticmethod
-    def validar_registro(usuario):
-        es_valido = True
+    def errores_registro(usuario, confirmar=True):
+        errores = []
 
         # Nombre mínimo 1 carácter
         if len(usuario['nombre']) < 1:
-            flash("El nombre debe tener al menos 1 caracteres.", "registro")
-            es_valido = False
+            errores.append("El nombre debe tener al menos 1 caracteres.")
 
         # Apellido mínimo 2 caracteres
         if len(usuario['apellido'].strip()) < 2:
-            flash("El apellido debe tener al menos 2 caracteres.", "registro")
-            es_valido = False
+            errores.append("El apellido debe tener al menos 2 caracteres.")
 
         # Email con regex
         if not EMAIL_REGEX.match(usuario['email']):
-            flash("Email inválido.", "registro")
-            es_valido = False
+            errores.append("Email inválido.")
+
+        # Que el email no esté repetido lo revisa el índice UNIQUE al guardar().
 
-        # Validar que el email no esté ya registrado
-        datos_email = {'email': usuario['email']}
-        if Usuario.obtener_por_email(datos_email):
-            flash("Ese email ya está registrado.", "registro")
-            es_valido = False
+        # Que quepan en las columnas de la tabla
+        for campo, maximo in LARGO_MAXIMO.items():
+            if len(usuario[campo]) > maximo:
+                errores.append(f"El campo {campo} no puede tener más de {maximo} caracteres.")
 
         # Contraseña mínima 3 caracteres
         if len(usuario['contrasena']) < 3:
-            flash("La contraseña debe tener al menos 3 caracteres.", "registro")
-            es_valido = False
+            errores.append("La contraseña debe tener al menos 3 caracteres.")
 
         # Contraseña debe coincidir con confirmación
-        if usuario['contrasena'] != usuario['confirmar_contrasena']:
-            flash("Las contraseñas no coinciden.", "registro")
-            es_valido = False
+        if confirmar and usuario['contrasena'] != usuario['confirmar_contrasena']:
+            errores.append("Las contraseñas no coinciden.")
+
+        return errores
 
-        return es_valido
+    # ----------------------------------------------------------------------
+    # Validación del formulario de registro
+    # Se dispara antes de guardar un usuario nuevo.
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def validar_registro(usuario):
+        errores = Usuario.errores_registro(usuario)
+        for error in errores:
+            flash(error, "registro")
+        return not errores
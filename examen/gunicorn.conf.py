@@ -0,0 +1,95 @@
+import multiprocessing, os
+
+# ----------------------------------------------------------------------
+# Configuración de gunicorn para producción
+# Uso (desde la raíz del repositorio, como en el Procfile):
+#     gunicorn -c examen/gunicorn.conf.py
+# Todo se puede ajustar con variables de entorno sin tocar este archivo.
+# ----------------------------------------------------------------------
+
+# Carpeta donde está app.py (así funciona sin importar desde dónde se lance).
+chdir = os.path.dirname(os.path.abspath(__file__))
+wsgi_app = "app:app"
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:" + os.environ.get("PORT", "8000"))
+
+# Procesos: por defecto 2 por CPU + 1 (la recomendación de gunicorn).
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+# Hilos por proceso: mientras un hilo espera a MySQL, otro atiende otra petición.
+# Cada hilo puede usar una conexión, así que workers * threads no debería pasar
+# de MYSQL_POOL_MAX * workers ni del max_connections del servidor.
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_class = "gthread" if threads > 1 else "sync"
+
+# Con varios procesos las sesiones tienen que estar en un almacén compartido:
+# con SESION_BACKEND=memoria cada worker tendría las suyas (un login hecho en
+# un worker no existiría en los otros y `revocar-sesiones` no revocaría nada).
+# Por eso aquí el valor por defecto es sqlite (sesiones_app.sqlite3 en esta carpeta).
+if workers > 1:
+    os.environ.setdefault("SESION_BACKEND", "sqlite")
+    if os.environ["SESION_BACKEND"] == "memoria":
+        raise RuntimeError("SESION_BACKEND=memoria solo sirve con un worker (WEB_CONCURRENCY=1)")
+    # Lo mismo con la caché: el contador de versión de los datos (que invalida el
+    # listado, los ETag de /inicio, la ocupación y el directorio de tutores) tiene
+    # que ser uno solo; en memoria una escritura solo lo subiría en su worker.
+    os.environ.setdefault("CACHE_BACKEND", "sqlite")
+    if os.environ["CACHE_BACKEND"] == "memoria":
+        raise RuntimeError("CACHE_BACKEND=memoria solo sirve con un worker (WEB_CONCURRENCY=1)")
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+# Segundos que tiene un worker para terminar sus peticiones al apagarse.
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+# Reiniciar cada worker tras N peticiones (con algo de azar para que no
+# se reinicien todos a la vez). 0 = nunca.
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", max_requests // 10))
+
+# La app se carga una sola vez en el proceso principal y los workers la
+# heredan ya importada (rutas registradas, plantillas compiladas).
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+# Con preload, create_app compila todas las plantillas antes de crear los workers.
+# Sin preload cada worker las lee de la caché en disco (PLANTILLAS_CACHE) a medida que las usa.
+if preload_app:
+    os.environ.setdefault("PRECARGAR_PLANTILLAS", "1")
+
+accesslog = os.environ.get("GUNICORN_ACCESSLOG", "-")
+loglevel = os.environ.get("GUNICORN_LOGLEVEL", "info")
+
+
+def when_ready(server):
+    # Con preload_app la app ya está creada: dejamos en el log cuánto tardó su arranque.
+    if not preload_app:
+        return
+    perfil = server.app.wsgi().extensions["perfil_arranque"]
+    server.log.info("App creada en %s ms: %s", perfil["total_ms"], perfil["fases"])
+
+
+def post_fork(server, worker):
+    # Lo que el proceso principal haya abierto (conexiones MySQL de las
+    # migraciones, hilos de hash, SQLite de la caché) no se comparte con los
+    # workers: cada uno empieza con sus propios pools.
+    from flask_app.config.mysqlconnection import reiniciar_pools_tras_fork
+    from flask_app.config.mysqlconnection_async import reiniciar_pools_async_tras_fork
+    from flask_app.config.hashing import servicio_hash
+    from flask_app.config.cache import cache
+    reiniciar_pools_tras_fork()
+    reiniciar_pools_async_tras_fork()
+    servicio_hash.reiniciar_tras_fork()
+    cache.reiniciar_tras_fork()
+    if preload_app:
+        # La app heredada del proceso principal (la misma que sirve gunicorn).
+        server.app.wsgi().session_interface.almacen.reiniciar_tras_fork()
+
+
+def worker_exit(server, worker):
+    # Apagado ordenado: gunicorn ya esperó las peticiones en curso
+    # (graceful_timeout); cerramos las conexiones libres de los pools.
+    from flask_app.config.mysqlconnection import cerrar_pools, estadisticas_pools
+    from flask_app.config.mysqlconnection_async import cerrar_pools_async
+    from flask_app.config.hashing import servicio_hash
+    server.log.info("Worker %s cerrando pools: %s", worker.pid, estadisticas_pools())
+    cerrar_pools()
+    cerrar_pools_async()
+    servicio_hash.cerrar()
@@ -0,0 +1,42 @@
+import pytest
+from flask_app.models.asesoria import Asesoria, BUSQUEDA_MAX_PALABRAS
+
+# ----------------------------------------------------------------------
+# Texto de la búsqueda de texto completo (MATCH ... IN BOOLEAN MODE).
+# ----------------------------------------------------------------------
+
+
+def test_cada_palabra_busca_sus_continuaciones():
+    assert Asesoria.texto_busqueda("Clases de álgebra") == "Clases* de* álgebra*"
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ('+física -química', "física* química*"),
+    ('>repaso <examen', "repaso* examen*"),
+    ('(cálculo) ~integral', "cálculo* integral*"),
+    ('"derivadas parciales"', "derivadas* parciales*"),
+    ("prob* estad*", "prob* estad*"),
+    ("ana@correo.cl", "ana* correo* cl*"),
+    ('+-><()~*"@', ""),
+])
+def test_quita_los_operadores(texto, esperado):
+    assert Asesoria.texto_busqueda(texto) == esperado
+
+
+def test_descarta_palabras_de_una_letra():
+    assert Asesoria.texto_busqueda("a y o geometría x") == "geometría*"
+
+
+@pytest.mark.parametrize("texto", [None, "", "   ", "a b c"])
+def test_texto_vacio(texto):
+    assert Asesoria.texto_busqueda(texto) == ""
+
+
+def test_limita_la_cantidad_de_palabras():
+    texto = " ".join(f"palabra{n}" for n in range(BUSQUEDA_MAX_PALABRAS + 5))
+    assert len(Asesoria.texto_busqueda(texto).split()) == BUSQUEDA_MAX_PALABRAS
+
+
+def test_buscar_sin_palabras_no_consulta_la_base():
+    # Sin MySQL: si llegara a consultar, fallaría al conectarse.
+    assert Asesoria.buscar("+ - ~", pagina=3) == ([], 3, False)
@@ -0,0 +1,156 @@
+from types import SimpleNamespace
+import pytest
+from flask_app import create_app
+from flask_app.config import mysqlconnection
+from flask_app.config.cache import cache
+from flask_app.controllers import agenda
+from flask_app.models import asesoria
+from flask_app.models.asesoria import Asesoria, TutorOcupado, CONSULTA_HORAS_TUTOR, CONSULTA_OCUPACION_FECHA
+from flask_app.models.usuario import Usuario, CONSULTA_DIRECTORIO_TUTORES
+
+# ----------------------------------------------------------------------
+# Tope de horas por tutor y día, y el JSON de /tutores/libres, con una
+# base falsa que responde las consultas de disponibilidad en memoria.
+# ----------------------------------------------------------------------
+
+FECHA = "2030-03-15"
+# Tope de horas con el que están pensados los datos (el de verdad sale de HORAS_MAX_TUTOR_DIA).
+TOPE = 8
+TUTORES = [{"id": 3, "nombre": "Ana Pérez"}, {"id": 4, "nombre": "Luis Soto"}]
+# Asesorías del tutor 3 ese día: 4 + 2 horas.
+ASESORIAS = [
+    {"id": 10, "tutor_id": 3, "fecha": FECHA, "duracion": 4},
+    {"id": 11, "tutor_id": 3, "fecha": FECHA, "duracion": 2},
+    {"id": 12, "tutor_id": 4, "fecha": "2030-03-16", "duracion": 8},
+]
+
+
+def _horas(tutor_id, fecha, excluir):
+    return sum(a["duracion"] for a in ASESORIAS
+               if a["tutor_id"] == tutor_id and a["fecha"] == fecha and a["id"] != excluir)
+
+
+def responder(query, data):
+    if query == CONSULTA_HORAS_TUTOR:
+        return [{"horas": _horas(data["tutor_id"], data["fecha"], data["excluir"])}]
+    if query == CONSULTA_OCUPACION_FECHA:
+        ids = sorted({a["tutor_id"] for a in ASESORIAS})
+        return [{"tutor_id": t, "horas": _horas(t, data["fecha"], data["excluir"])}
+                for t in ids if _horas(t, data["fecha"], data["excluir"])]
+    if query == CONSULTA_DIRECTORIO_TUTORES:
+        return TUTORES
+    raise AssertionError(f"Consulta inesperada: {query}")
+
+
+class CursorFalso:
+    rowcount = 0
+    lastrowid = None
+
+    def __init__(self, consultas):
+        self.consultas = consultas
+        self.filas = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        return False
+
+    def execute(self, query, data=None):
+        self.consultas.append(query)
+        self.filas = responder(query, data)
+
+    def fetchall(self):
+        return self.filas
+
+    def fetchone(self):
+        return self.filas[0] if self.filas else None
+
+
+class ConexionFalsa:
+    def __init__(self, consultas):
+        self.open = True
+        self.consultas = consultas
+
+    def ping(self, reconnect=False):
+        pass
+
+    def cursor(self):
+        return CursorFalso(self.consultas)
+
+    def close(self):
+        self.open = False
+
+
+@pytest.fixture
+def consultas(monkeypatch):
+    lista = []
+    monkeypatch.setattr(mysqlconnection, "_pools", {})
+    monkeypatch.setattr(mysqlconnection, "crear_conexion", lambda db, servidor=None: ConexionFalsa(lista))
+    monkeypatch.setattr(asesoria, "HORAS_MAX_TUTOR_DIA", TOPE)
+    monkeypatch.setattr(agenda, "HORAS_MAX_TUTOR_DIA", TOPE)
+    cache.limpiar()
+    yield lista
+    cache.limpiar()
+
+
+def test_entra_justo_hasta_el_tope(consultas):
+    # 6 horas ocupadas + 2 = el tope.
+    Asesoria.revisar_disponibilidad(3, FECHA, 2)
+    assert consultas == [CONSULTA_HORAS_TUTOR]
+
+
+def test_pasarse_del_tope_es_tutor_ocupado(consultas):
+    with pytest.raises(TutorOcupado) as error:
+        Asesoria.revisar_disponibilidad(3, FECHA, 3)
+    assert error.value.horas_ocupadas == 6
+    assert "le quedan 2" in error.value.mensaje()
+
+
+def test_al_editar_no_cuenta_la_propia_asesoria(consultas):
+    # La asesoría 10 (4 horas) pasa a 6 horas: 2 de la otra + 6 = 8.
+    Asesoria.revisar_disponibilidad(3, FECHA, 6, excluir_id=10)
+    with pytest.raises(TutorOcupado):
+        Asesoria.revisar_disponibilidad(3, FECHA, 6)
+
+
+def test_sin_tutor_no_consulta(consultas):
+    Asesoria.revisar_disponibilidad(None, FECHA, 8)
+    assert consultas == []
+
+
+@pytest.fixture
+def cliente(consultas):
+    app = create_app({"CONSTRUIR_RECURSOS": False, "PLANTILLAS_CACHE": ""})
+    cliente = app.test_client()
+    Usuario.recordar_identidad(SimpleNamespace(id=7, nombre="Eva"))
+    with cliente.session_transaction() as sesion:
+        sesion["usuario_id"] = 7
+    return cliente
+
+
+def test_tutores_libres(cliente):
+    datos = cliente.get(f"/tutores/libres?fecha={FECHA}&duracion=3").get_json()
+    assert datos == {
+        "fecha": FECHA,
+        "duracion": 3,
+        "horas_max": TOPE,
+        "libres": [{"id": 4, "nombre": "Luis Soto", "horas_ocupadas": 0}],
+        "sin_lugar": [3],
+    }
+
+
+def test_tutores_libres_sin_contar_la_asesoria_editada(cliente):
+    datos = cliente.get(f"/tutores/libres?fecha={FECHA}&duracion=3&excluir=10").get_json()
+    assert datos["sin_lugar"] == []
+    assert {"id": 3, "nombre": "Ana Pérez", "horas_ocupadas": 2} in datos["libres"]
+
+
+def test_tutores_libres_fecha_invalida(cliente):
+    assert cliente.get("/tutores/libres?fecha=15-03-2030").status_code == 400
+
+
+def test_tutores_libres_pide_sesion(consultas):
+    app = create_app({"CONSTRUIR_RECURSOS": False, "PLANTILLAS_CACHE": ""})
+    respuesta = app.test_client().get(f"/tutores/libres?fecha={FECHA}")
+    assert respuesta.status_code == 302
@@ -0,0 +1,93 @@
+import io
+from datetime import date, timedelta
+from flask_app.config.importacion import leer_csv, errores_formato, en_lotes
+from flask_app.models.asesoria import Asesoria
+from flask_app.models.usuario import Usuario
+
+# ----------------------------------------------------------------------
+# Lectura del CSV y validación de filas de la importación masiva
+# (no necesitan MySQL).
+# ----------------------------------------------------------------------
+
+
+def _filas(texto):
+    return list(leer_csv(io.BytesIO(texto.encode("utf-8"))))
+
+
+def test_leer_csv_binario_con_bom_y_espacios():
+    filas = _filas("﻿nombre , email\n Ana , ana@correo.cl \n")
+    assert filas == [(2, {"nombre": "Ana", "email": "ana@correo.cl"})]
+
+
+def test_leer_csv_en_modo_texto():
+    filas = list(leer_csv(io.StringIO("a,b\n1,2\n")))
+    assert filas == [(2, {"a": "1", "b": "2"})]
+
+
+def test_fila_con_columnas_de_mas_es_error_de_la_fila():
+    (linea, fila), (linea2, fila2) = _filas("a,b\n1,2,3,4\n5,6\n")
+    assert linea == 2
+    assert fila["a"] == "1" and fila["b"] == "2"
+    assert errores_formato(fila) == ["La fila tiene 2 columna(s) de más."]
+    assert (linea2, errores_formato(fila2)) == (3, [])
+
+
+def test_fila_con_columnas_de_menos_queda_vacia():
+    [(_, fila)] = _filas("a,b\n1\n")
+    assert fila == {"a": "1", "b": ""}
+    assert errores_formato(fila) == []
+
+
+def test_en_lotes():
+    assert list(en_lotes(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(en_lotes([], 2)) == []
+
+
+def _asesoria(**cambios):
+    formulario = {"tema": "Álgebra", "fecha": (date.today() + timedelta(days=7)).isoformat(),
+                  "duracion": "2", "notas": "Repaso", "tutor_id": "3"}
+    formulario.update(cambios)
+    return formulario
+
+
+def test_asesoria_valida():
+    assert Asesoria.errores_asesoria(_asesoria()) == []
+
+
+def test_fecha_con_otro_formato_es_error():
+    assert Asesoria.errores_asesoria(_asesoria(fecha="31/12/2099")) == ["La fecha debe tener el formato AAAA-MM-DD."]
+
+
+def test_fecha_pasada_es_error():
+    errores = Asesoria.errores_asesoria(_asesoria(fecha="2000-01-01"))
+    assert errores == ["Por favor, seleccione una fecha válida (futura o actual)"]
+
+
+def test_leer_fecha_acepta_sin_ceros():
+    assert Asesoria.leer_fecha("2030-1-5") == date(2030, 1, 5)
+    assert Asesoria.leer_fecha("2030-02-30") is None
+    assert Asesoria.leer_fecha("") is None
+
+
+def test_tema_demasiado_largo_es_error():
+    assert Asesoria.errores_asesoria(_asesoria(tema="x" * 101)) == ["El tema no puede tener más de 100 caracteres."]
+    assert Asesoria.errores_asesoria(_asesoria(tema="x" * 100)) == []
+
+
+def _usuario(**cambios):
+    usuario = {"nombre": "Ana", "apellido": "Pérez", "email": "ana@correo.cl", "contrasena": "secreta"}
+    usuario.update(cambios)
+    return usuario
+
+
+def test_usuario_valido():
+    assert Usuario.errores_registro(_usuario(), confirmar=False) == []
+
+
+def test_usuario_con_campos_demasiado_largos():
+    usuario = _usuario(nombre="a" * 46, apellido="b" * 46, email="a" * 250 + "@correo.cl")
+    assert Usuario.errores_registro(usuario, confirmar=False) == [
+        "El campo nombre no puede tener más de 45 caracteres.",
+        "El campo apellido no puede tener más de 45 caracteres.",
+        "El campo email no puede tener más de 255 caracteres.",
+    ]
@@ -0,0 +1,126 @@
+from types import SimpleNamespace
+import pytest
+from flask_app import create_app
+from flask_app.config import mysqlconnection
+from flask_app.config.cache import cache, CacheMemoria
+from flask_app.models.asesoria import Asesoria, CLAVE_VERSION
+from flask_app.models.usuario import Usuario
+
+# ----------------------------------------------------------------------
+# ETag de /inicio: cambia con cada escritura y, si el navegador ya tiene
+# la versión, se responde 304 sin consultar la base (conexiones falsas).
+# ----------------------------------------------------------------------
+
+
+# Filas que devuelve cualquier SELECT (el listado de /inicio).
+FILAS = []
+
+
+class CursorFalso:
+    rowcount = 0
+    lastrowid = None
+
+    def __init__(self, consultas):
+        self.consultas = consultas
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        return False
+
+    def execute(self, query, data=None):
+        self.consultas.append(query)
+
+    def fetchall(self):
+        return list(FILAS)
+
+    def fetchone(self):
+        return None
+
+
+class ConexionFalsa:
+    def __init__(self, consultas):
+        self.open = True
+        self.consultas = consultas
+
+    def ping(self, reconnect=False):
+        pass
+
+    def cursor(self):
+        return CursorFalso(self.consultas)
+
+    def close(self):
+        self.open = False
+
+
+@pytest.fixture
+def consultas(monkeypatch):
+    lista = []
+    monkeypatch.setattr(mysqlconnection, "_pools", {})
+    monkeypatch.setattr(mysqlconnection, "crear_conexion", lambda db, servidor=None: ConexionFalsa(lista))
+    return lista
+
+
+@pytest.fixture
+def cliente(consultas):
+    cache.limpiar()
+    app = create_app({"CONSTRUIR_RECURSOS": False, "PLANTILLAS_CACHE": ""})
+    cliente = app.test_client()
+    # Sesión iniciada: el usuario 7 con su identidad ya en la caché.
+    Usuario.recordar_identidad(SimpleNamespace(id=7, nombre="Ana"))
+    with cliente.session_transaction() as sesion:
+        sesion["usuario_id"] = 7
+    yield cliente
+    cache.limpiar()
+
+
+def test_con_el_mismo_etag_responde_304_sin_consultas(cliente, consultas):
+    primera = cliente.get("/inicio")
+    assert primera.status_code == 200
+    assert consultas
+    consultas.clear()
+    segunda = cliente.get("/inicio", headers={"If-None-Match": primera.headers["ETag"]})
+    assert segunda.status_code == 304
+    assert segunda.headers["ETag"] == primera.headers["ETag"]
+    assert consultas == []
+
+
+def test_una_escritura_cambia_el_etag(cliente):
+    etag = cliente.get("/inicio").headers["ETag"]
+    Asesoria.marcar_cambio()
+    respuesta = cliente.get("/inicio", headers={"If-None-Match": etag})
+    assert respuesta.status_code == 200
+    assert respuesta.headers["ETag"] != etag
+
+
+def test_los_enlaces_de_pagina_conservan_el_tamano(cliente, monkeypatch):
+    filas = [{"id": n, "tema": f"Tema {n}", "fecha": "2030-01-0%d" % n, "duracion": 1,
+              "usuario_id": 7, "creador_nombre": "Ana Pérez"} for n in range(1, 4)]
+    monkeypatch.setitem(globals(), "FILAS", filas)
+    html = cliente.get("/inicio?tamano=2").text
+    assert "/inicio?despues=2030-01-02_2&amp;tamano=2" in html
+
+
+def test_la_version_no_se_pierde_al_recortar_la_cache():
+    almacen = CacheMemoria(max_entradas=3)
+    almacen.incrementar(CLAVE_VERSION)
+    for numero in range(10):
+        almacen.guardar(f"otra:{numero}", numero)
+    assert almacen.obtener(CLAVE_VERSION) == 1
+    assert almacen.obtener("otra:0") is None
+
+
+def test_la_version_no_se_repite_si_se_pierde(consultas, monkeypatch):
+    almacen = CacheMemoria()
+    monkeypatch.setattr("flask_app.models.asesoria.cache", almacen)
+    vistas = {Asesoria.version_datos()}
+    for _ in range(3):
+        Asesoria.marcar_cambio()
+        vistas.add(Asesoria.version_datos())
+    # Se vacía la caché (como al reiniciar el proceso): cada versión nueva es otra.
+    for _ in range(2):
+        almacen.limpiar()
+        Asesoria.marcar_cambio()
+        assert Asesoria.version_datos() not in vistas
+        vistas.add(Asesoria.version_datos())
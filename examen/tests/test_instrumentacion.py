@@ -0,0 +1,41 @@
+import pytest
+from flask import Flask
+from flask_app.config.instrumentacion import agregar_cabeceras_consultas, registrar_consulta
+
+# ----------------------------------------------------------------------
+# Cabeceras con el conteo de consultas de cada petición.
+# ----------------------------------------------------------------------
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.after_request(agregar_cabeceras_consultas)
+
+    @app.route("/dos")
+    def dos():
+        registrar_consulta("SELECT 1;", 0.001, 1)
+        registrar_consulta("SELECT 2;", 0.002, 1)
+        return "ok"
+
+    return app
+
+
+def test_sin_debug_no_manda_cabeceras(app, monkeypatch):
+    monkeypatch.delenv("DEBUG_CONSULTAS", raising=False)
+    respuesta = app.test_client().get("/dos")
+    assert "X-Consultas-DB" not in respuesta.headers
+    assert "X-Tiempo-DB-ms" not in respuesta.headers
+
+
+def test_con_debug_consultas_manda_cabeceras(app, monkeypatch):
+    monkeypatch.setenv("DEBUG_CONSULTAS", "1")
+    respuesta = app.test_client().get("/dos")
+    assert respuesta.headers["X-Consultas-DB"] == "2"
+    assert float(respuesta.headers["X-Tiempo-DB-ms"]) == 3.0
+
+
+def test_en_modo_debug_manda_cabeceras(app, monkeypatch):
+    monkeypatch.delenv("DEBUG_CONSULTAS", raising=False)
+    app.debug = True
+    assert app.test_client().get("/dos").headers["X-Consultas-DB"] == "2"
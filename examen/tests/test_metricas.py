@@ -0,0 +1,108 @@
+import time
+import pytest
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+from flask_app.config.metricas import MiddlewareMetricas, CLAVE_RUTA
+
+# ----------------------------------------------------------------------
+# Middleware de métricas y texto de /metrics, con una app WSGI mínima.
+# ----------------------------------------------------------------------
+
+
+def app_prueba(environ, start_response):
+    # Hace de Flask: anota la "regla" de la ruta y responde según la URL.
+    ruta = environ["PATH_INFO"]
+    environ[CLAVE_RUTA] = "/ver/<int:id>" if ruta.startswith("/ver/") else ruta
+    if ruta == "/falla":
+        raise RuntimeError("falla")
+    codigo = 500 if ruta == "/error" else 200
+    return Response("ok", status=codigo)(environ, start_response)
+
+
+def _cliente(**opciones):
+    metricas = MiddlewareMetricas(app_prueba, **opciones)
+    return metricas, Client(metricas)
+
+
+def _pedir(cliente, ruta, metodo="GET"):
+    # Como un servidor WSGI: la respuesta se cierra al terminar de enviarla
+    # (recién ahí el middleware da la petición por terminada).
+    with cliente.open(ruta, method=metodo) as respuesta:
+        return respuesta
+
+
+def test_histograma_por_regla_de_ruta():
+    metricas, cliente = _cliente()
+    _pedir(cliente, "/ver/1")
+    _pedir(cliente, "/ver/2")
+    _pedir(cliente, "/ver/3", "POST")
+    texto = metricas.exposicion()
+    assert 'http_request_duration_seconds_count{ruta="/ver/<int:id>",metodo="GET"} 2' in texto
+    assert 'http_request_duration_seconds_bucket{ruta="/ver/<int:id>",metodo="GET",le="+Inf"} 2' in texto
+    assert 'http_requests_total{ruta="/ver/<int:id>",metodo="POST",estado="2xx"} 1' in texto
+    assert "http_requests_in_flight 0" in texto
+
+
+def test_metodos_desconocidos_se_cuentan_como_otro():
+    metricas, cliente = _cliente()
+    _pedir(cliente, "/ver/1", "INVENTADO")
+    _pedir(cliente, "/ver/1", "OTRO-MAS")
+    texto = metricas.exposicion()
+    assert 'http_requests_total{ruta="/ver/<int:id>",metodo="otro",estado="2xx"} 2' in texto
+    assert "INVENTADO" not in texto
+
+
+def test_baldes_acumulados():
+    metricas, cliente = _cliente()
+    _pedir(cliente, "/ver/1")
+    baldes = [int(linea.rsplit(" ", 1)[1]) for linea in metricas.exposicion().splitlines()
+              if linea.startswith("http_request_duration_seconds_bucket")]
+    assert baldes == sorted(baldes) and baldes[-1] == 1
+
+
+def test_errores_5xx_y_excepciones():
+    metricas, cliente = _cliente()
+    _pedir(cliente, "/error")
+    with pytest.raises(RuntimeError):
+        _pedir(cliente, "/falla")
+    texto = metricas.exposicion()
+    assert 'http_request_errors_total{ruta="/error",metodo="GET"} 1' in texto
+    assert 'http_request_errors_total{ruta="/falla",metodo="GET"} 1' in texto
+    assert metricas.en_curso == 0
+
+
+def test_rechazo_por_peticiones_en_curso():
+    metricas, cliente = _cliente(max_en_curso=1, retry_after=7)
+    metricas.en_curso = 1   # otra petición todavía sin terminar
+    respuesta = _pedir(cliente, "/ver/1")
+    assert respuesta.status_code == 503
+    assert respuesta.headers["Retry-After"] == "7"
+    # El monitoreo nunca se rechaza.
+    assert _pedir(cliente, "/estado/pool").status_code == 200
+    assert 'http_requests_shed_total{motivo="en_curso"} 1' in metricas.exposicion()
+
+
+def test_rechazo_por_espera_del_pool(monkeypatch):
+    from flask_app.config import metricas as modulo
+    metricas, cliente = _cliente(max_espera_pool_ms=50)
+    monkeypatch.setattr(modulo, "espera_conexion_reciente", lambda: 0.2)
+    assert _pedir(cliente, "/ver/1").status_code == 503
+    monkeypatch.setattr(modulo, "espera_conexion_reciente", lambda: 0.01)
+    assert _pedir(cliente, "/ver/1").status_code == 200
+
+
+def test_escapa_etiquetas_y_muestra_pools():
+    metricas, _ = _cliente()
+    texto = metricas.exposicion([{"db": 'base"rara', "servidor": "primaria", "en_uso": 2, "libres": 3}])
+    assert 'db_pool_connections{db="base\\"rara",servidor="primaria",estado="en_uso"} 2' in texto
+
+
+def test_espera_del_pool_se_olvida_sola(monkeypatch):
+    from flask_app.config import instrumentacion
+    monkeypatch.setattr(instrumentacion, "ESPERA_VIDA_MEDIA_S", 0.01)
+    monkeypatch.setitem(instrumentacion._espera_pool, "media_s", 0.0)
+    for _ in range(5):
+        instrumentacion.registrar_espera_conexion(1.0)
+    assert instrumentacion.espera_conexion_reciente() > 0.5
+    time.sleep(0.2)
+    assert instrumentacion.espera_conexion_reciente() < 0.01
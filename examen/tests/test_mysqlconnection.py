@@ -0,0 +1,111 @@
+import pymysql
+import pytest
+from flask_app.config import mysqlconnection
+from flask_app.config.mysqlconnection import connectToMySQL, RegistroDuplicado, ConflictoBloqueo
+
+# ----------------------------------------------------------------------
+# MySQLConnection con un cursor falso (sin MySQL): qué devuelve query_db
+# según la sentencia y cómo se traducen los errores de PyMySQL.
+# ----------------------------------------------------------------------
+
+
+class CursorFalso:
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self.rowcount = 3
+        self.lastrowid = 42
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        return False
+
+    def execute(self, query, data=None):
+        if self.conexion.error is not None:
+            raise self.conexion.error
+
+    def fetchall(self):
+        return ({"id": 1}, {"id": 2})
+
+    def fetchone(self):
+        return {"id": 1}
+
+
+class ConexionFalsa:
+    def __init__(self):
+        self.open = True
+        self.error = None   # excepción que lanzará la próxima consulta
+
+    def ping(self, reconnect=False):
+        pass
+
+    def cursor(self):
+        return CursorFalso(self)
+
+    def close(self):
+        self.open = False
+
+
+@pytest.fixture
+def conexion(monkeypatch):
+    # Pool nuevo con una sola conexión falsa, siempre la misma.
+    monkeypatch.setattr(mysqlconnection, "_pools", {})
+    monkeypatch.setattr(mysqlconnection, "crear_conexion", lambda db, servidor=None: ConexionFalsa())
+    pool = mysqlconnection.obtener_pool("prueba")
+    unica = pool.obtener()
+    pool.devolver(unica)
+    return unica
+
+
+def _pool():
+    return mysqlconnection.obtener_pool("prueba")
+
+
+@pytest.mark.parametrize("query, esperado", [
+    ("SELECT * FROM usuarios;", [{"id": 1}, {"id": 2}]),
+    ("  select id FROM usuarios;", [{"id": 1}, {"id": 2}]),
+    ("WITH t AS (SELECT 1) SELECT * FROM t;", [{"id": 1}, {"id": 2}]),
+    ("INSERT INTO usuarios (nombre) VALUES ('select');", 42),
+    ("UPDATE usuarios SET nombre = 'insert';", 3),
+    ("DELETE FROM usuarios WHERE id = 1;", 3),
+])
+def test_query_db_elige_por_la_primera_palabra(conexion, query, esperado):
+    assert connectToMySQL("prueba").query_db(query) == esperado
+    assert _pool().estadisticas()["en_uso"] == 0
+
+
+def test_registro_duplicado(conexion):
+    conexion.error = pymysql.err.IntegrityError(1062, "Duplicate entry 'a@b.cl' for key 'email'")
+    with pytest.raises(RegistroDuplicado):
+        connectToMySQL("prueba").insert("INSERT INTO usuarios (email) VALUES ('a@b.cl');")
+    # La conexión está bien: vuelve al pool.
+    assert _pool().estadisticas()["descartadas"] == 0
+    assert conexion.open
+
+
+def test_otro_error_de_integridad_no_es_duplicado(conexion):
+    conexion.error = pymysql.err.IntegrityError(1452, "Cannot add or update a child row")
+    with pytest.raises(pymysql.err.IntegrityError) as error:
+        connectToMySQL("prueba").insert("INSERT INTO asesorias (tutor_id) VALUES (999);")
+    assert not isinstance(error.value, RegistroDuplicado)
+
+
+@pytest.mark.parametrize("errno", [1205, 1213])
+def test_deadlock_y_espera_de_bloqueo_son_conflicto(conexion, errno):
+    conexion.error = pymysql.err.OperationalError(errno, "Deadlock found when trying to get lock")
+    with pytest.raises(ConflictoBloqueo):
+        connectToMySQL("prueba").execute("UPDATE usuarios SET nombre = 'x';")
+    # Un choque de bloqueos no rompe la conexión: no se descarta.
+    datos = _pool().estadisticas()
+    assert (datos["en_uso"], datos["descartadas"], datos["abiertas"]) == (0, 0, 1)
+    assert conexion.open
+
+
+def test_error_de_conexion_descarta_la_conexion(conexion):
+    conexion.error = pymysql.err.OperationalError(2013, "Lost connection to MySQL server during query")
+    with pytest.raises(pymysql.err.OperationalError):
+        connectToMySQL("prueba").execute("UPDATE usuarios SET nombre = 'x';")
+    datos = _pool().estadisticas()
+    assert (datos["en_uso"], datos["descartadas"], datos["abiertas"]) == (0, 1, 0)
+    assert not conexion.open
@@ -0,0 +1,18 @@
+from types import SimpleNamespace
+import pytest
+from flask_app.models.asesoria import Asesoria
+
+# ----------------------------------------------------------------------
+# Cursores del listado paginado por keyset ("fecha_id").
+# ----------------------------------------------------------------------
+
+
+def test_cursor_ida_y_vuelta():
+    cursor = Asesoria.crear_cursor(SimpleNamespace(fecha="2025-01-31", id=15))
+    assert cursor == "2025-01-31_15"
+    assert Asesoria.leer_cursor(cursor) == {"fecha": "2025-01-31", "id": 15}
+
+
+@pytest.mark.parametrize("cursor", [None, "", "2025-01-31", "2025-13-01_4", "2025-01-31_x", "a_b_c"])
+def test_cursor_invalido(cursor):
+    assert Asesoria.leer_cursor(cursor) is None
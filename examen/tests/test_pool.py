@@ -0,0 +1,97 @@
+import threading, time
+import pytest
+from flask_app.config import mysqlconnection
+from flask_app.config.mysqlconnection import PoolConexiones, PoolAgotado
+
+# ----------------------------------------------------------------------
+# Cuentas del pool de conexiones, con conexiones falsas (sin MySQL).
+# ----------------------------------------------------------------------
+
+
+class ConexionFalsa:
+    def __init__(self):
+        self.open = True
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        self.open = False
+
+
+@pytest.fixture
+def abiertas(monkeypatch):
+    # Lista de las conexiones que abrió el pool.
+    lista = []
+
+    def crear(db, servidor=None):
+        lista.append(ConexionFalsa())
+        return lista[-1]
+
+    monkeypatch.setattr(mysqlconnection, "crear_conexion", crear)
+    return lista
+
+
+def test_abre_el_minimo_y_reutiliza(abiertas):
+    pool = PoolConexiones("prueba", minimo=2, maximo=3)
+    assert len(abiertas) == 2
+    conexion = pool.obtener()
+    pool.devolver(conexion)
+    # LIFO: la misma conexión vuelve a salir.
+    assert pool.obtener() is conexion
+    datos = pool.estadisticas()
+    assert (datos["abiertas"], datos["libres"], datos["en_uso"], datos["prestamos"]) == (2, 1, 1, 2)
+
+
+def test_lleno_espera_y_se_rinde(abiertas):
+    pool = PoolConexiones("prueba", minimo=0, maximo=1, timeout=0.05)
+    pool.obtener()
+    with pytest.raises(PoolAgotado):
+        pool.obtener()
+    datos = pool.estadisticas()
+    assert (datos["esperas"], datos["timeouts"], datos["abiertas"]) == (1, 1, 1)
+
+
+def test_devolver_despierta_al_que_espera(abiertas):
+    pool = PoolConexiones("prueba", minimo=0, maximo=1, timeout=2)
+    conexion = pool.obtener()
+    threading.Timer(0.05, pool.devolver, [conexion]).start()
+    assert pool.obtener() is conexion
+
+
+def test_descartar_y_conexion_cerrada_liberan_el_lugar(abiertas):
+    pool = PoolConexiones("prueba", minimo=0, maximo=2)
+    primera, segunda = pool.obtener(), pool.obtener()
+    pool.descartar(primera)
+    segunda.close()
+    pool.devolver(segunda)
+    datos = pool.estadisticas()
+    assert (datos["abiertas"], datos["en_uso"], datos["descartadas"]) == (0, 0, 2)
+    assert not primera.open
+
+
+def test_recicla_las_viejas(abiertas):
+    pool = PoolConexiones("prueba", minimo=1, maximo=1, reciclar=0)
+    vieja = abiertas[0]
+    time.sleep(0.01)
+    assert pool.obtener() is not vieja
+    assert not vieja.open
+    assert pool.estadisticas()["recicladas"] == 1
+
+
+def test_cerrar(abiertas):
+    pool = PoolConexiones("prueba", minimo=2, maximo=2)
+    prestada = pool.obtener()
+    pool.cerrar()
+    pool.devolver(prestada)
+    assert all(not c.open for c in abiertas)
+    assert pool.estadisticas()["abiertas"] == 0
+    with pytest.raises(PoolAgotado):
+        pool.obtener()
+
+
+def test_sin_calentar_no_abre_hasta_calentar(abiertas):
+    pool = PoolConexiones("prueba", minimo=2, maximo=3, calentar=False)
+    assert abiertas == []
+    pool.calentar()
+    assert pool.estadisticas()["libres"] == 2
@@ -0,0 +1,47 @@
+from werkzeug.http import parse_accept_header
+from flask_app.config import recursos
+from flask_app.config.recursos import minificar_css, archivo_comprimido
+
+# ----------------------------------------------------------------------
+# Minificación de las hojas de estilo y elección de la versión comprimida.
+# ----------------------------------------------------------------------
+
+
+def test_minificar_quita_comentarios_y_espacios():
+    css = """
+    /* título
+       de varias líneas */
+    body ,  h1 > a {
+        color: red ;
+        margin: 0 auto;
+    }
+    """
+    assert minificar_css(css) == "body,h1>a{color:red;margin:0 auto}"
+
+
+def test_minificar_no_junta_el_espacio_antes_de_dos_puntos():
+    # "a :hover" (cualquier hijo de a con hover) no es lo mismo que "a:hover".
+    assert minificar_css("nav :hover { color: red; }") == "nav :hover{color:red}"
+
+
+def test_minificar_conserva_los_valores_con_espacios():
+    assert minificar_css('a { font-family: "Open Sans", sans-serif; }') == 'a{font-family:"Open Sans",sans-serif}'
+
+
+def _archivos(carpeta, *nombres):
+    for nombre in nombres:
+        (carpeta / nombre).write_bytes(b"x")
+
+
+def test_elige_br_luego_gzip_luego_sin_comprimir(tmp_path, monkeypatch):
+    monkeypatch.setattr(recursos, "CARPETA_DIST", str(tmp_path))
+    _archivos(tmp_path, "base.1.css", "base.1.css.gz", "base.1.css.br")
+    assert archivo_comprimido("base.1.css", parse_accept_header("gzip, br")) == ("base.1.css.br", "br")
+    assert archivo_comprimido("base.1.css", parse_accept_header("gzip, br;q=0")) == ("base.1.css.gz", "gzip")
+    assert archivo_comprimido("base.1.css", parse_accept_header("")) == ("base.1.css", None)
+
+
+def test_sin_archivo_br_usa_gzip(tmp_path, monkeypatch):
+    monkeypatch.setattr(recursos, "CARPETA_DIST", str(tmp_path))
+    _archivos(tmp_path, "base.1.css", "base.1.css.gz")
+    assert archivo_comprimido("base.1.css", parse_accept_header("br, gzip")) == ("base.1.css.gz", "gzip")
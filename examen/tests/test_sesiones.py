@@ -0,0 +1,98 @@
+import pytest
+from flask import Flask, session
+from flask_app.config.cache import CacheMemoria
+from flask_app.config.sesiones import InterfazSesionServidor
+
+# ----------------------------------------------------------------------
+# Sesiones guardadas en el servidor, con el almacén en memoria.
+# ----------------------------------------------------------------------
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.secret_key = "prueba"
+    app.session_interface = InterfazSesionServidor(CacheMemoria())
+
+    @app.route("/entrar/<int:usuario_id>")
+    def entrar(usuario_id):
+        session.regenerar()
+        session["usuario_id"] = usuario_id
+        return "ok"
+
+    @app.route("/quien")
+    def quien():
+        return str(session.get("usuario_id"))
+
+    @app.route("/salir")
+    def salir():
+        session.clear()
+        return "ok"
+
+    @app.route("/con_sesion")
+    def con_sesion():
+        return "si" if "usuario_id" in session else "no"
+
+    @app.route("/publica")
+    def publica():
+        return "ok"
+
+    return app
+
+
+def _sid(cliente):
+    return cliente.get_cookie("session").value
+
+
+def test_la_cookie_solo_lleva_el_identificador(app):
+    cliente = app.test_client()
+    cliente.get("/entrar/7")
+    sid = _sid(cliente)
+    # Un identificador aleatorio, no datos firmados (la cookie de Flask sería "eyJ1c3...").
+    assert len(sid) > 30 and "." not in sid
+    assert app.session_interface.almacen.obtener(f"sesion:{sid}")["datos"] == {"usuario_id": 7}
+    assert cliente.get("/quien").text == "7"
+
+
+def test_login_cambia_el_identificador(app):
+    cliente = app.test_client()
+    cliente.get("/entrar/7")
+    antes = _sid(cliente)
+    cliente.get("/entrar/8")
+    assert _sid(cliente) != antes
+    assert app.session_interface.almacen.obtener(f"sesion:{antes}") is None
+
+
+def test_vary_cookie_solo_si_se_uso_la_sesion(app):
+    cliente = app.test_client()
+    cliente.get("/entrar/7")
+    assert "Cookie" in cliente.get("/quien").vary
+    assert "Cookie" not in cliente.get("/publica").vary
+
+
+def test_preguntar_si_hay_sesion_tambien_agrega_vary(app):
+    cliente = app.test_client()
+    cliente.get("/entrar/7")
+    respuesta = cliente.get("/con_sesion")
+    assert respuesta.text == "si"
+    assert "Cookie" in respuesta.vary
+
+
+def test_salir_borra_la_sesion(app):
+    cliente = app.test_client()
+    cliente.get("/entrar/7")
+    sid = _sid(cliente)
+    cliente.get("/salir")
+    assert app.session_interface.almacen.obtener(f"sesion:{sid}") is None
+    assert cliente.get("/quien").text == "None"
+
+
+def test_revocar_sesiones_cierra_todas_las_del_usuario(app):
+    uno, otro, ajeno = app.test_client(), app.test_client(), app.test_client()
+    uno.get("/entrar/7")
+    otro.get("/entrar/7")
+    ajeno.get("/entrar/8")
+    assert app.session_interface.revocar_sesiones(7) == 2
+    assert uno.get("/quien").text == "None"
+    assert otro.get("/quien").text == "None"
+    assert ajeno.get("/quien").text == "8"
@@ -0,0 +1,117 @@
+import pytest
+from flask_app.config import mysqlconnection
+from flask_app.config.mysqlconnection import transaccion, al_confirmar, connectToMySQL
+
+# ----------------------------------------------------------------------
+# transaccion() y al_confirmar() con conexiones falsas (sin MySQL):
+# anidamiento, ROLLBACK si algo falla y hooks después del COMMIT.
+# ----------------------------------------------------------------------
+
+
+class CursorFalso:
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self.rowcount = 1
+        self.lastrowid = 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        return False
+
+    def execute(self, query, data=None):
+        self.conexion.registro.append(query)
+
+
+class ConexionFalsa:
+    def __init__(self, registro):
+        self.open = True
+        self.registro = registro   # compartido: el orden de todo lo que pasó
+
+    def ping(self, reconnect=False):
+        pass
+
+    def cursor(self):
+        return CursorFalso(self)
+
+    def begin(self):
+        self.registro.append("BEGIN")
+
+    def commit(self):
+        self.registro.append("COMMIT")
+
+    def rollback(self):
+        self.registro.append("ROLLBACK")
+
+    def close(self):
+        self.open = False
+
+
+@pytest.fixture
+def registro(monkeypatch):
+    # Pools nuevos para cada test, con conexiones que anotan en `lista`.
+    lista = []
+    monkeypatch.setattr(mysqlconnection, "_pools", {})
+    monkeypatch.setattr(mysqlconnection, "crear_conexion", lambda db, servidor=None: ConexionFalsa(lista))
+    return lista
+
+
+def _pool():
+    return mysqlconnection.obtener_pool("prueba")
+
+
+def test_transacciones_anidadas_confirman_una_vez(registro):
+    with transaccion("prueba") as externa:
+        connectToMySQL("prueba").execute("UPDATE a;")
+        with transaccion("prueba") as interna:
+            assert interna is externa
+            connectToMySQL("prueba").execute("UPDATE b;")
+        # Al cerrar la interna todavía no se confirma nada.
+        assert "COMMIT" not in registro
+    assert registro == ["BEGIN", "UPDATE a;", "UPDATE b;", "COMMIT"]
+    assert _pool().estadisticas()["en_uso"] == 0
+
+
+def test_error_en_la_interna_deshace_todo(registro):
+    with pytest.raises(ValueError):
+        with transaccion("prueba"):
+            connectToMySQL("prueba").execute("UPDATE a;")
+            with transaccion("prueba"):
+                raise ValueError("falla")
+    assert registro == ["BEGIN", "UPDATE a;", "ROLLBACK"]
+    datos = _pool().estadisticas()
+    assert (datos["en_uso"], datos["descartadas"]) == (0, 0)
+
+
+def test_si_falla_el_rollback_la_conexion_se_descarta(registro, monkeypatch):
+    def rollback_roto():
+        raise OSError("sin conexión")
+
+    with pytest.raises(ValueError):
+        with transaccion("prueba") as contexto:
+            monkeypatch.setattr(contexto.conexion, "rollback", rollback_roto)
+            raise ValueError("falla")
+    assert not contexto.conexion.open
+    assert _pool().estadisticas()["en_uso"] == 0
+
+
+def test_al_confirmar_espera_el_commit_de_la_externa(registro):
+    with transaccion("prueba"):
+        with transaccion("prueba"):
+            al_confirmar("prueba", lambda: registro.append("hook"))
+        assert "hook" not in registro
+    assert registro == ["BEGIN", "COMMIT", "hook"]
+
+
+def test_al_confirmar_se_descarta_con_rollback(registro):
+    with pytest.raises(ValueError):
+        with transaccion("prueba"):
+            al_confirmar("prueba", lambda: registro.append("hook"))
+            raise ValueError("falla")
+    assert registro == ["BEGIN", "ROLLBACK"]
+
+
+def test_al_confirmar_sin_transaccion_corre_enseguida(registro):
+    al_confirmar("prueba", lambda: registro.append("hook"))
+    assert registro == ["hook"]